@@ -0,0 +1,505 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+"""The :mod:`slave.acquisition` module runs drivers in worker processes.
+
+A single python process can not keep several fast instruments busy while it
+writes and analyses the data as well, because of the global interpreter lock
+and the blocking transports. A :class:`Worker` constructs its driver in a
+separate process from a picklable :class:`TransportSpec` and repeatedly calls
+an acquisition function. The returned records are streamed into a
+:class:`SharedRingBuffer`, which the consumer reads without copying as numpy
+views. E.g.::
+
+    import time
+    from slave.acquisition import Acquisition, TransportSpec, Worker
+
+    def acquire(lockin):
+        # Called in the worker process, returns one or several records.
+        return time.time(), lockin.x, lockin.y
+
+    lockin = Worker(
+        'slave.signal_recovery.SR7230',
+        TransportSpec('slave.transport.Socket', ('192.168.178.1', 50000)),
+        acquire, [('t', float), ('x', float), ('y', float)], size=65536,
+    )
+    with Acquisition([lockin]) as acquisition:
+        while measuring:
+            for view in lockin.buffer.views():
+                analyse(view['x'])
+            lockin.buffer.release()
+
+    print(lockin.buffer.written, lockin.buffer.dropped)
+
+If the consumer falls behind, a blocking worker waits until space is
+released, a non-blocking one drops the records that do not fit and counts
+them in :attr:`SharedRingBuffer.dropped`.
+
+.. note:: Shared memory requires python 3.8 or later.
+
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+import importlib
+import logging
+import multiprocessing
+import time
+import traceback
+import weakref
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+def _resolve(obj):
+    """Imports an object given by its dotted path, e.g.
+    `'slave.transport.Socket'`. Other objects are returned unchanged.
+    """
+    if not isinstance(obj, str):
+        return obj
+    module, _, name = obj.rpartition('.')
+    return getattr(importlib.import_module(module), name)
+
+
+class TransportSpec(object):
+    """A picklable description of a transport.
+
+    :param cls: The transport class or its dotted path, e.g.
+        `'slave.transport.Serial'`.
+    :param args: Positional arguments of the transport constructor.
+    :param kw: Keyword arguments of the transport constructor.
+
+    """
+    def __init__(self, cls, *args, **kw):
+        self.cls = cls
+        self.args = args
+        self.kw = kw
+
+    def create(self):
+        """Constructs the transport."""
+        return _resolve(self.cls)(*self.args, **self.kw)
+
+    def __repr__(self):
+        return '<TransportSpec({0!r}, args={1!r}, kw={2!r})>'.format(
+            self.cls, self.args, self.kw)
+
+
+class SharedRingBuffer(object):
+    """A ring buffer of numpy records in shared memory, with a single writer
+    and a single reader.
+
+    :param size: The maximum number of unread records.
+    :param dtype: The numpy dtype of a record.
+    :param context: The multiprocessing context of the processes sharing the
+        buffer, e.g. `multiprocessing.get_context('spawn')`. By default, the
+        default context is used.
+
+    The buffer is passed to a child process as a process argument. Only the
+    creating process unlinks the shared memory in :meth:`.unlink`.
+
+    """
+    #: The size of the header holding the counters in bytes.
+    HEADER = 64
+
+    def __init__(self, size, dtype, context=None):
+        if shared_memory is None:
+            raise RuntimeError('Shared memory is not supported.')
+        if size < 1:
+            raise ValueError('size < 1')
+        self.size = int(size)
+        self.dtype = np.dtype(dtype)
+        self._condition = (context or multiprocessing).Condition()
+        self._owner = True
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=self.HEADER + self.size * self.dtype.itemsize)
+        self._attach()
+        self._counters[:] = 0
+
+    def _attach(self):
+        buf = self._shm.buf
+        # The written, read and dropped counters.
+        self._counters = np.ndarray(3, dtype=np.int64, buffer=buf)
+        self._data = np.ndarray(self.size, dtype=self.dtype, buffer=buf,
+                                offset=self.HEADER)
+        # The number of records returned by the last views() call.
+        self._viewed = 0
+
+    def _check(self):
+        if self._data is None:
+            raise ValueError('The shared ring buffer is closed.')
+
+    def __getstate__(self):
+        return {
+            'name': self._shm.name, 'size': self.size, 'dtype': self.dtype,
+            'condition': self._condition,
+        }
+
+    def __setstate__(self, state):
+        self.size = state['size']
+        self.dtype = state['dtype']
+        self._condition = state['condition']
+        self._owner = False
+        self._shm = shared_memory.SharedMemory(name=state['name'])
+        self._attach()
+
+    @property
+    def name(self):
+        """The name of the shared memory block."""
+        return self._shm.name
+
+    @property
+    def written(self):
+        """The number of records written in total."""
+        return int(self._counters[0])
+
+    @property
+    def read(self):
+        """The number of records released by the reader in total."""
+        return int(self._counters[1])
+
+    @property
+    def dropped(self):
+        """The number of records dropped, because the buffer was full."""
+        return int(self._counters[2])
+
+    def __len__(self):
+        """The number of unread records."""
+        with self._condition:
+            return int(self._counters[0] - self._counters[1])
+
+    def _records(self, records):
+        if isinstance(records, tuple):
+            records = [records]
+        return np.array(records, dtype=self.dtype, ndmin=1)
+
+    def write(self, records, timeout=None):
+        """Writes as many records as fit, waiting for free space.
+
+        :param records: A record or a sequence of records.
+        :param timeout: The time in seconds to wait for free space. `None`
+            waits until all records are written, zero does not wait.
+        :returns: The number of records written.
+
+        """
+        self._check()
+        records = self._records(records)
+        deadline = None if timeout is None else time.time() + timeout
+        count = 0
+        with self._condition:
+            while count < len(records):
+                written, read = self._counters[0], self._counters[1]
+                free = self.size - int(written - read)
+                if not free:
+                    remaining = None
+                    if deadline is not None:
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            break
+                    self._condition.wait(remaining)
+                    continue
+                n = min(free, len(records) - count)
+                start = int(written % self.size)
+                head = min(n, self.size - start)
+                self._data[start:start + head] = records[count:count + head]
+                self._data[:n - head] = records[count + head:count + n]
+                count += n
+                self._counters[0] += n
+                self._condition.notify_all()
+        return count
+
+    def put(self, records, block=True, timeout=None):
+        """Writes records, dropping the ones not fitting into the buffer.
+
+        :param records: A record or a sequence of records.
+        :param block: If `True`, waits for free space, otherwise records not
+            fitting into the buffer are dropped immediately.
+        :param timeout: The maximum time in seconds to wait.
+        :returns: The number of records written.
+
+        """
+        records = self._records(records)
+        count = self.write(records, timeout if block else 0)
+        if count < len(records):
+            self.drop(len(records) - count)
+        return count
+
+    def drop(self, count):
+        """Adds `count` to the dropped counter."""
+        self._check()
+        with self._condition:
+            self._counters[2] += count
+
+    def wait(self, count=1, timeout=None):
+        """Waits until at least `count` records are unread.
+
+        :returns: `True` if enough records are available, `False` if the
+            timeout expired.
+
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._counters[0] - self._counters[1] >= count,
+                timeout)
+
+    def views(self, count=None):
+        """Returns the oldest unread records without copying them.
+
+        :param count: The maximum number of records, `None` means all.
+        :returns: A list of up to two numpy arrays viewing the shared memory,
+            in chronological order. There are two views if the records wrap
+            around the end of the buffer.
+
+        The views remain valid until the records are released with
+        :meth:`.release`. If views are still referenced when the buffer is
+        closed, the shared memory stays mapped until they are garbage
+        collected.
+
+        """
+        self._check()
+        with self._condition:
+            written, read = int(self._counters[0]), int(self._counters[1])
+        available = written - read
+        count = available if count is None else min(count, available)
+        start = read % self.size
+        head = min(count, self.size - start)
+        views = [self._data[start:start + head]]
+        if count > head:
+            views.append(self._data[:count - head])
+        self._viewed = count
+        return [x for x in views if len(x)]
+
+    def release(self, count=None):
+        """Marks records as read, freeing their space for the writer.
+
+        :param count: The number of records. `None` releases the records
+            returned by the last :meth:`.views` call, records written since
+            remain unread.
+        :returns: The number of released records.
+
+        """
+        self._check()
+        with self._condition:
+            available = int(self._counters[0] - self._counters[1])
+            if count is None:
+                count = self._viewed
+            count = min(count, available)
+            self._counters[1] += count
+            self._condition.notify_all()
+        self._viewed = max(self._viewed - count, 0)
+        return count
+
+    def get(self, count=None):
+        """Returns a copy of the oldest unread records and releases them."""
+        views = self.views(count)
+        records = (np.concatenate(views) if views else
+                   np.zeros(0, dtype=self.dtype))
+        self.release(len(records))
+        return records
+
+    def close(self):
+        """Closes the shared memory in this process.
+
+        The final counters remain readable. Views still referenced keep the
+        shared memory mapped, it is closed when the last one is garbage
+        collected.
+
+        """
+        if self._data is None:
+            return
+        self._counters = self._counters.copy()
+        # All views are based on the data array, it is alive as long as one
+        # of them is referenced.
+        data, self._data = weakref.ref(self._data), None
+        if data() is None:
+            self._shm.close()
+        else:
+            logger.debug('Deferring the close of %r, views are referenced.',
+                         self._shm.name)
+            weakref.finalize(data(), self._shm.close)
+
+    def unlink(self):
+        """Closes and removes the shared memory block, if it was created by
+        this process.
+        """
+        self.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+def _run(driver, transport, acquire, buffer, block, interval, kw, stop,
+         errors):
+    try:
+        instrument = _resolve(driver)(transport.create(), **kw)
+        acquire = _resolve(acquire)
+        while not stop.is_set():
+            records = buffer._records(acquire(instrument))
+            if block:
+                count = 0
+                while count < len(records) and not stop.is_set():
+                    count += buffer.write(records[count:], timeout=0.1)
+                buffer.drop(len(records) - count)
+            else:
+                buffer.put(records, block=False)
+            if interval:
+                time.sleep(interval)
+    except Exception:
+        errors.put(traceback.format_exc())
+    finally:
+        buffer.close()
+
+
+class Worker(object):
+    """Runs a driver in a separate process and streams its records into a
+    :class:`SharedRingBuffer`.
+
+    :param driver: The driver class or its dotted path. It is constructed in
+        the worker process with the transport as first argument.
+    :param transport: A :class:`TransportSpec` instance.
+    :param acquire: A picklable callable, e.g. a module level function,
+        receiving the driver and returning a record or a sequence of records.
+    :param dtype: The numpy dtype of a record.
+    :param size: The size of the ring buffer in records.
+    :param block: If `True`, the worker waits for the consumer if the buffer
+        is full. Otherwise records are dropped.
+    :param interval: The time in seconds to sleep between two acquisitions.
+    :param name: The worker name, defaults to the driver name.
+    :param context: The multiprocessing context, e.g.
+        `multiprocessing.get_context('spawn')`. By default, the default
+        context is used.
+    :param kw: Additional keyword arguments of the driver constructor.
+
+    :ivar buffer: The :class:`SharedRingBuffer`.
+
+    """
+    def __init__(self, driver, transport, acquire, dtype, size=4096,
+                 block=True, interval=0., name=None, context=None, **kw):
+        self.driver = driver
+        self.transport = transport
+        self.acquire = acquire
+        self.block = block
+        self.interval = interval
+        self.name = name or (driver if isinstance(driver, str) else
+                             driver.__name__)
+        self.kw = kw
+        self._context = context = context or multiprocessing
+        self.buffer = SharedRingBuffer(size, dtype, context)
+        self._stop = context.Event()
+        self._errors = context.Queue()
+        self._process = None
+        self._error = None
+
+    @property
+    def alive(self):
+        """`True` if the worker process is running."""
+        return self._process is not None and self._process.is_alive()
+
+    @property
+    def error(self):
+        """The formatted traceback of an exception raised in the worker
+        process or `None`.
+        """
+        if self._error is None and self._process is not None:
+            try:
+                self._error = self._errors.get(
+                    timeout=0.1 if not self.alive else 0)
+            except Exception:
+                pass
+        return self._error
+
+    def start(self):
+        """Starts the worker process."""
+        if self.alive:
+            raise RuntimeError('Worker {0!r} is running.'.format(self.name))
+        self._stop.clear()
+        self._process = self._context.Process(
+            target=_run, name=self.name,
+            args=(self.driver, self.transport, self.acquire, self.buffer,
+                  self.block, self.interval, self.kw, self._stop,
+                  self._errors))
+        self._process.daemon = True
+        self._process.start()
+
+    def join(self, timeout=None):
+        """Waits until the worker process exits, e.g. after an error."""
+        if self._process is not None:
+            self._process.join(timeout)
+
+    def stop(self, timeout=5.):
+        """Stops the worker process.
+
+        :param timeout: The time in seconds to wait for the worker, before it
+            is terminated.
+
+        """
+        if self._process is None:
+            return
+        self._stop.set()
+        self._process.join(timeout)
+        if self._process.is_alive():
+            logger.warning('Terminating worker %r.', self.name)
+            self._process.terminate()
+            self._process.join()
+
+    def close(self):
+        """Stops the worker and removes the shared memory."""
+        self.stop()
+        self.buffer.unlink()
+
+    def __repr__(self):
+        return '<Worker({0!r}, alive={1}, written={2}, dropped={3})>'.format(
+            self.name, self.alive, self.buffer.written, self.buffer.dropped)
+
+
+class Acquisition(object):
+    """Starts and stops several workers together.
+
+    :param workers: A sequence of :class:`Worker` instances.
+
+    Used as a context manager, the workers are started on entry and closed
+    on exit.
+
+    """
+    def __init__(self, workers):
+        self.workers = list(workers)
+
+    def __getitem__(self, name):
+        for worker in self.workers:
+            if worker.name == name:
+                return worker
+        raise KeyError(name)
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+
+    def stop(self):
+        for worker in self.workers:
+            worker.stop()
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+    def statistics(self):
+        """Returns a dict mapping the worker names to a tuple *(<written>,
+        <dropped>)*.
+        """
+        return dict(
+            (x.name, (x.buffer.written, x.buffer.dropped))
+            for x in self.workers
+        )
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
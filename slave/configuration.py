@@ -0,0 +1,150 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+"""The :mod:`slave.configuration` module implements fast switching between
+named measurement configurations.
+
+Rewriting a complete instrument setup command by command takes dozens of
+messages. Instruments implementing the optional IEC 60488-2 stored setting
+commands keep several setups in local memory, which are recalled with a
+single `*RCL` message. Instruments implementing the learn command report
+their setup as a sequence of program message units with `*LRN?`, which are
+replayed with a single message. For all other instruments, the
+:class:`ConfigurationManager` falls back to a :meth:`~slave.driver.Driver.snapshot`
+and writes only the differing settings. E.g.::
+
+    from slave.configuration import ConfigurationManager
+    from slave.keithley import K2182
+
+    nv = K2182(transport)
+    manager = ConfigurationManager(nv, filename='k2182.json')
+
+    nv.sense.nplc = 1
+    manager.store('fast', slot=0)
+    nv.sense.nplc = 10
+    manager.store('precise', slot=1)
+
+    manager.switch('fast')  # Sends '*RCL 0'.
+
+The configurations are cached per instrument identity, e.g. the `*IDN?`
+response, and optionally persisted in a JSON file.
+
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+import json
+import os
+
+from slave.iec60488 import Learn, StoredSetting
+from slave.transport import SimulatedTransport
+
+
+class ConfigurationManager(object):
+    """Stores and switches named configurations of an instrument.
+
+    :param instrument: A :class:`~slave.driver.Driver` instance.
+    :param filename: An optional filename of a JSON file, where the
+        configurations are persisted.
+
+    :ivar identity: The string identifying the instrument. It is the joined
+        `*IDN?` response, if the instrument supports it, otherwise the class
+        name.
+    :ivar active: The name of the last stored or recalled configuration.
+
+    """
+    def __init__(self, instrument, filename=None):
+        self._instrument = instrument
+        self._filename = filename
+        self._cache = {}
+        if filename and os.path.exists(filename):
+            with open(filename) as f:
+                self._cache = json.load(f)
+        self.identity = self._identify()
+        self._configurations = self._cache.setdefault(self.identity, {})
+        self.active = None
+
+    @property
+    def names(self):
+        """A sorted list of the configuration names."""
+        return sorted(self._configurations)
+
+    def method(self, name):
+        """Returns the method used to restore a configuration, either
+        `'slot'`, `'learn'` or `'snapshot'`.
+        """
+        return self._configurations[name]['method']
+
+    def store(self, name, slot=None):
+        """Stores the current configuration of the instrument.
+
+        :param name: The configuration name.
+        :param slot: The memory slot of the instrument. If it is given, the
+            configuration is saved on the instrument with `*SAV`. A
+            configuration previously saved to this slot is removed.
+
+        Without a slot, the setup string is learned with `*LRN?` if the
+        instrument supports it, otherwise a snapshot of all settings is
+        taken.
+
+        """
+        instrument = self._instrument
+        if slot is not None:
+            if not isinstance(instrument, StoredSetting):
+                raise TypeError('Instrument does not support stored settings.')
+            for key, entry in list(self._configurations.items()):
+                if entry['method'] == 'slot' and entry['slot'] == slot:
+                    del self._configurations[key]
+            instrument.save(slot)
+            entry = {'method': 'slot', 'slot': slot}
+        elif isinstance(instrument, Learn):
+            entry = {'method': 'learn', 'setup': instrument.learn()}
+        else:
+            entry = {'method': 'snapshot', 'settings': instrument.snapshot()}
+        self._configurations[name] = entry
+        self.active = name
+        self._save()
+
+    def switch(self, name):
+        """Switches the instrument to a stored configuration.
+
+        Slot configurations are recalled with a single `*RCL` message, learned
+        setups are replayed with a single message. Snapshots are restored
+        writing the differing settings only.
+
+        :param name: The configuration name.
+        :raises KeyError: If the configuration is unknown.
+
+        """
+        entry = self._configurations[name]
+        instrument = self._instrument
+        if entry['method'] == 'slot':
+            instrument.recall(entry['slot'])
+        elif entry['method'] == 'learn':
+            if not isinstance(instrument._transport, SimulatedTransport):
+                instrument._protocol.write(instrument._transport,
+                                           entry['setup'])
+        else:
+            instrument.restore(entry['settings'])
+        self.active = name
+
+    def remove(self, name):
+        """Removes a configuration."""
+        del self._configurations[name]
+        if self.active == name:
+            self.active = None
+        self._save()
+
+    def _identify(self):
+        try:
+            identification = self._instrument.identification
+        except AttributeError:
+            return type(self._instrument).__name__
+        if isinstance(identification, (list, tuple)):
+            return ','.join(str(x).strip() for x in identification)
+        return str(identification)
+
+    def _save(self):
+        if self._filename:
+            with open(self._filename, 'w') as f:
+                json.dump(self._cache, f, indent=2, sort_keys=True)
@@ -11,6 +11,7 @@ from slave.driver import Command, Driver
 import slave.protocol
 import slave.iec60488
 from slave.types import Boolean, Float, Mapping, Set, String
+import slave.ramp
 
 
 #: A list with all valid shim identifiers.
@@ -240,3 +241,35 @@ class MPS4G(slave.iec60488.IEC60488):
             self._write('SWEEP {0}'.format(mode))
         else:
             self._write('SWEEP {0} {1}'.format(mode, speed))
+
+    def ramp(self, mode, speed=None, poller=None):
+        """Starts the output current sweep and tracks it without blocking.
+
+        :param mode: The sweep mode. Valid entries are `'UP'`, `'DOWN'`,
+            `'ZERO'` or, if in shim mode, `'LIMIT'`.
+        :param speed: The sweeping speed. Valid entries are `'FAST'`, `'SLOW'`
+            or `None`.
+        :param poller: The :class:`~slave.ramp.Poller` tracking the ramp. By
+            default, the shared poller is used.
+        :returns: A :class:`~slave.ramp.Ramp` instance. It is done as soon as
+            the sweep status reports a paused sweep or standby after the sweep
+            started. Cancelling it pauses the sweep.
+
+        """
+        if mode == 'PAUSE':
+            raise ValueError('Invalid ramp mode.')
+        self.sweep(mode, speed)
+
+        def update(status):
+            status = status.lower()
+            return status.startswith('pause') or status.startswith('standby')
+
+        # The status preceding the sweep might be idle as well. It is ignored
+        # until the sweep is reported or, e.g. if the current is at the limit
+        # already, for 2s.
+        ramp = slave.ramp.Ramp(
+            (self, 'sweep_status'), lambda: self.sweep_status, update,
+            lambda: self.sweep('PAUSE'), holdoff=2.,
+            started=lambda status: not update(status)
+        )
+        return (poller or slave.ramp.default_poller()).add(ramp)
@@ -29,11 +29,16 @@ from __future__ import (absolute_import, division,
 from future.builtins import map, zip, dict, int, list, range, str
 import collections
 import itertools as it
+import logging
+import threading
+import time
 
 from slave.transport import SimulatedTransport
 import slave.protocol
 import slave.misc
 
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 _Message = collections.namedtuple(
     '_Message',
@@ -41,9 +46,20 @@ _Message = collections.namedtuple(
 )
 
 
+# Default instances of type classes. Types are immutable, so a single
+# instance is shared by all commands.
+_instances = {}
+
+
 def _to_instance(x):
     """Converts x to an instance if its a class."""
-    return x() if isinstance(x, type) else x
+    if isinstance(x, type):
+        try:
+            return _instances[x]
+        except KeyError:
+            instance = _instances[x] = x()
+            return instance
+    return x
 
 def _typelist(x):
     """Helper function converting all items of x to instances."""
@@ -72,6 +88,85 @@ def _load(types, values):
     return _apply(lambda t, v: t.load(v), types, values)
 
 
+_recordings = threading.local()
+
+
+def _recording(transport):
+    """Returns the innermost active :class:`Recording` of the current thread
+    using the transport or `None`.
+    """
+    for recording in reversed(getattr(_recordings, 'stack', ())):
+        if recording.transport is transport:
+            return recording
+    return None
+
+
+class Recording(object):
+    """Records the message units of commands instead of sending them.
+
+    Commands issued by the current thread within the `with` block, which use
+    the given transport, are not sent but recorded. Queries return `None`,
+    their responses can be parsed with :meth:`.parse` later on. Messages sent
+    directly with the protocol are not recorded. E.g.::
+
+        with Recording(transport) as recording:
+            instrument.voltage = 1.
+            instrument.current
+
+        response = protocol.query(transport, recording.message())
+        voltage, = recording.parse(response)
+
+    :param transport: The transport of the recorded commands.
+
+    :ivar units: A list of *(<header>, <data>, <command>)* tuples, where
+        *<data>* is the list of dumped program data and *<command>* is the
+        :class:`Command` of a query or `None`.
+
+    """
+    def __init__(self, transport):
+        self.transport = transport
+        self.units = []
+
+    @property
+    def queries(self):
+        """The number of recorded queries."""
+        return sum(1 for unit in self.units if unit[2] is not None)
+
+    def message(self, header_sep=' ', data_sep=',', unit_sep=';'):
+        """Joins the recorded units to a single program message."""
+        units = []
+        for header, data, _ in self.units:
+            if data:
+                header = header_sep.join([header, data_sep.join(data)])
+            units.append(header)
+        return unit_sep.join(units)
+
+    def parse(self, response, data_sep=',', unit_sep=';'):
+        """Parses the response to the recorded queries.
+
+        :param response: The response data blocks, as returned by the query
+            method of the protocol.
+        :returns: A list with the response of each recorded query.
+
+        """
+        queries = [unit[2] for unit in self.units if unit[2] is not None]
+        units = data_sep.join(response).split(unit_sep)
+        if len(units) != len(queries):
+            raise ValueError(
+                'Expected {0} responses, got {1}.'.format(len(queries), len(units)))
+        return [cmd._parse(unit.split(data_sep))
+                for cmd, unit in zip(queries, units)]
+
+    def __enter__(self):
+        if not hasattr(_recordings, 'stack'):
+            _recordings.stack = []
+        _recordings.stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _recordings.stack.remove(self)
+
+
 class Command(object):
     """Represents an instrument command.
 
@@ -148,7 +243,10 @@ class Command(object):
         else:
             # TODO We silently ignore possible data
             data = ()
-        if isinstance(transport, SimulatedTransport):
+        recording = _recording(transport)
+        if recording is not None:
+            recording.units.append((self._write.header, data, None))
+        elif isinstance(transport, SimulatedTransport):
             self.simulate_write(data)
         else:
             protocol.write(transport, self._write.header, *data)
@@ -174,10 +272,20 @@ class Command(object):
         else:
             # TODO We silently ignore possible data
             data = ()
+        recording = _recording(transport)
+        if recording is not None:
+            recording.units.append((self._query.header, data, self))
+            return None
         if isinstance(transport, SimulatedTransport):
             response = self.simulate_query(data)
         else:
             response = protocol.query(transport, self._query.header, *data)
+        return self._parse(response)
+
+    def _parse(self, response):
+        """Converts the raw response data blocks to the response type."""
+        if getattr(self._query.response_type, 'as_array', False):
+            return self._query.response_type.load_array(response)
         response = _load(self._query.response_type, response)
 
         # Return single value if parsed_data is 1-tuple.
@@ -214,6 +322,131 @@ class Command(object):
                                                    self.protocol)
 
 
+class SnapshotStatistics(object):
+    """Transfer statistics of a :meth:`Driver.snapshot` or
+    :meth:`Driver.restore` call.
+
+    :ivar settings: The number of settings read.
+    :ivar queries: The number of query messages sent.
+    :ivar writes: The number of write messages sent.
+    :ivar changed: The number of settings written.
+    :ivar duration: The elapsed time in seconds.
+
+    """
+    def __init__(self):
+        self.settings = 0
+        self.queries = 0
+        self.writes = 0
+        self.changed = 0
+        self.duration = 0.
+
+    def __repr__(self):
+        return (
+            '<SnapshotStatistics(settings={0}, queries={1}, writes={2}, '
+            'changed={3}, duration={4:.3f})>'
+        ).format(self.settings, self.queries, self.writes, self.changed,
+                 self.duration)
+
+
+_Setting = collections.namedtuple(
+    '_Setting',
+    ['path', 'command', 'transport', 'protocol']
+)
+
+
+def _is_setting(cmd):
+    """Checks if the command represents instrument state, e.g. it is query-
+    and writeable and the query does not require any program data.
+    """
+    return bool(
+        cmd._query and cmd._write and not cmd._query.data_type and
+        cmd.protocol is None and cmd._write.data_type and
+        isinstance(cmd._write.data_type, collections.Sequence)
+    )
+
+
+def _settings(driver, path=()):
+    """Yields a :class:`_Setting` for every setting of the driver tree in
+    definition order.
+    """
+    for name, attr in list(vars(driver).items()):
+        if name.startswith('_'):
+            continue
+        if isinstance(attr, Lazy):
+            attr = driver._construct(name)
+        for setting in _walk(attr, driver, path + (name,)):
+            yield setting
+    # Drivers might be containers of subdrivers themselves, e.g. the input
+    # channels of temperature controllers.
+    if isinstance(driver, collections.Mapping):
+        for key in driver:
+            for setting in _walk(driver[key], driver, path + (str(key),)):
+                yield setting
+    elif isinstance(driver, collections.Sequence):
+        for idx, item in enumerate(driver):
+            for setting in _walk(item, driver, path + (str(idx),)):
+                yield setting
+
+
+def _walk(attr, driver, path):
+    if isinstance(attr, Command):
+        if _is_setting(attr):
+            yield _Setting(path, attr, driver._transport, driver._protocol)
+    elif isinstance(attr, Driver):
+        for setting in _settings(attr, path):
+            yield setting
+    elif isinstance(attr, CommandSequence):
+        for idx, cmd in enumerate(attr._sequence):
+            if _is_setting(cmd):
+                yield _Setting(path + (str(idx),), cmd,
+                               attr._transport, attr._protocol)
+    elif isinstance(attr, (tuple, list, LazySequence)):
+        for idx, item in enumerate(attr):
+            if isinstance(item, Driver):
+                for setting in _settings(item, path + (str(idx),)):
+                    yield setting
+
+
+def _serialize(value):
+    """Converts a parsed response into a JSON serializable value."""
+    if isinstance(value, collections.Mapping):
+        return dict((str(k), _serialize(v)) for k, v in value.items())
+    if hasattr(value, 'tolist'):
+        # numpy arrays and scalars.
+        return value.tolist()
+    if isinstance(value, (tuple, list)):
+        return [_serialize(x) for x in value]
+    return value
+
+
+def _lookup(doc, path):
+    for key in path:
+        doc = doc[key]
+    return doc
+
+
+def _insert(doc, path, value):
+    for key in path[:-1]:
+        doc = doc.setdefault(key, {})
+    doc[path[-1]] = value
+
+
+def _priority(setting):
+    """Settings selecting a mode or range are restored before values, which
+    might be limited by them.
+    """
+    import slave.types
+    discrete = (slave.types.Boolean, slave.types.Enum, slave.types.Mapping,
+                slave.types.Register, slave.types.Set)
+    data_type = setting.command._write.data_type
+    return 0 if any(isinstance(t, discrete) for t in data_type) else 1
+
+
+def _chunked(settings, size):
+    for i in range(0, len(settings), size):
+        yield settings[i:i + size]
+
+
 class Driver(object):
     """Base class of all instruments.
 
@@ -227,6 +460,10 @@ class Driver(object):
         :class:`IEC60488` protocol is used as default.
 
     """
+    # Set to True by instruments accepting several message units separated by
+    # a semicolon, e.g. 'A?;B?', and answering them in a single response.
+    _compound = False
+
     def __init__(self, transport, protocol=None, *args, **kw):
         self._transport = transport
         self._protocol = protocol or slave.protocol.IEC60488()
@@ -244,11 +481,146 @@ class Driver(object):
         cmd = Command(query=cmd)
         return cmd.query(self._transport, self._protocol, *datas)
 
+    def snapshot(self, batch_size=16, statistics=None):
+        """Reads all settings of the driver tree.
+
+        Every query- and writeable command of the driver and its subdrivers is
+        read. If the instrument supports compound messages, up to
+        `batch_size` queries are combined into a single message.
+
+        :param batch_size: The maximum number of queries per message.
+        :param statistics: An optional :class:`SnapshotStatistics` instance,
+            which is updated.
+        :returns: A JSON serializable document of nested dictionaries, mapping
+            the attribute names (and the indices of subdriver sequences) to
+            the setting values.
+
+        """
+        start = time.time()
+        statistics = statistics or SnapshotStatistics()
+        doc = {}
+        for path, value in self._read_settings(list(_settings(self)),
+                                               batch_size, statistics):
+            _insert(doc, path, value)
+        statistics.duration += time.time() - start
+        logger.debug('Snapshot: %r', statistics)
+        return doc
+
+    def restore(self, doc, batch_size=16):
+        """Restores the settings of a snapshot document.
+
+        The current settings are read once and only the differing settings are
+        written. Settings selecting modes or ranges are written before the
+        values constrained by them, otherwise the definition order is kept.
+        Settings missing in the document are left untouched.
+
+        :param doc: A document created by :meth:`.snapshot`.
+        :param batch_size: The maximum number of message units per message.
+        :returns: A :class:`SnapshotStatistics` instance.
+
+        """
+        start = time.time()
+        statistics = SnapshotStatistics()
+        settings = list(_settings(self))
+        current = dict(self._read_settings(settings, batch_size, statistics))
+        changes = []
+        for setting in settings:
+            try:
+                value = _lookup(doc, setting.path)
+            except (KeyError, TypeError):
+                continue
+            if setting.path in current and current[setting.path] == value:
+                continue
+            changes.append((setting, value))
+        changes.sort(key=lambda x: _priority(x[0]))
+        self._write_settings(changes, batch_size, statistics)
+        statistics.duration = time.time() - start
+        logger.debug('Restore: %r', statistics)
+        return statistics
+
+    def _batchable(self, setting):
+        return (self._compound and setting.transport is self._transport and
+                setting.protocol is self._protocol and
+                not isinstance(self._transport, SimulatedTransport))
+
+    def _read_settings(self, settings, batch_size, statistics):
+        """Yields a (path, value) tuple for every readable setting."""
+        batched = [x for x in settings if self._batchable(x)]
+        single = [x for x in settings if not self._batchable(x)]
+        for batch in _chunked(batched, batch_size):
+            header = ';'.join(x.command._query.header for x in batch)
+            statistics.queries += 1
+            response = self._protocol.query(self._transport, header)
+            sep = self._protocol.resp_data_sep
+            units = sep.join(response).split(';')
+            if len(units) != len(batch):
+                logger.warning('Compound response mismatch %r', header)
+                single.extend(batch)
+                continue
+            for setting, unit in zip(batch, units):
+                try:
+                    value = setting.command._parse(unit.split(sep))
+                except (ValueError, TypeError):
+                    single.append(setting)
+                    continue
+                statistics.settings += 1
+                yield setting.path, _serialize(value)
+        for setting in single:
+            statistics.queries += 1
+            try:
+                value = setting.command.query(setting.transport,
+                                              setting.protocol)
+            except Exception as e:
+                # A single unsupported setting, e.g. a missing option,
+                # should not spoil the snapshot.
+                logger.warning('Failed to read %s: %r',
+                               '.'.join(setting.path), e)
+                continue
+            statistics.settings += 1
+            yield setting.path, _serialize(value)
+
+    def _write_settings(self, changes, batch_size, statistics):
+        def data(setting, value):
+            if len(setting.command._write.data_type) > 1:
+                return value
+            return [value]
+
+        batch = []
+        for setting, value in changes:
+            statistics.changed += 1
+            if self._batchable(setting):
+                batch.append((setting, value))
+                continue
+            statistics.writes += 1
+            setting.command.write(setting.transport, setting.protocol,
+                                  *data(setting, value))
+        protocol = self._protocol
+        for chunk in _chunked(batch, batch_size):
+            units = []
+            for setting, value in chunk:
+                cmd = setting.command
+                dumped = _dump(cmd._write.data_type, data(setting, value))
+                units.append(protocol.msg_header_sep.join(
+                    [cmd._write.header, protocol.msg_data_sep.join(dumped)]
+                ))
+            statistics.writes += 1
+            protocol.write(self._transport, ';'.join(units))
+
+    def _construct(self, name):
+        """Constructs a :class:`Lazy` attribute and replaces it."""
+        attr = object.__getattribute__(self, name)
+        if isinstance(attr, Lazy):
+            attr = attr.create()
+            object.__setattr__(self, name, attr)
+        return attr
+
     def __getattribute__(self, name):
         """Redirects read access of command attributes to
         the :class:`~Command.query` function.
         """
         attr = object.__getattribute__(self, name)
+        if isinstance(attr, Lazy):
+            attr = self._construct(name)
         if isinstance(attr, Command):
             return attr.query(self._transport, self._protocol)
         return attr
@@ -259,20 +631,101 @@ class Driver(object):
         config into commands.
         """
         try:
-            attr = object.__getattribute__(self, name)
-        except AttributeError:
-            # Attribute does not exist.
-            object.__setattr__(self, name, value)
-        else:
-            if isinstance(attr, Command):
-                # Redirect write access
-                if (isinstance(value, collections.Sequence) and
-                    not isinstance(value, (str, bytes))):
-                    attr.write(self._transport, self._protocol, *value)
-                else:
-                    attr.write(self._transport, self._protocol, value)
-            else:
+            attr = object.__getattribute__(self, '__dict__')[name]
+        except KeyError:
+            # Not an instance attribute, e.g. a new attribute or a property.
+            # Don't query the property getter, just invoke the setter.
+            attr = getattr(type(self), name, None)
+            if not isinstance(attr, Command):
                 object.__setattr__(self, name, value)
+                return
+        if isinstance(attr, Lazy) and attr.command:
+            attr = self._construct(name)
+        if isinstance(attr, Command):
+            # Redirect write access
+            if (isinstance(value, collections.Sequence) and
+                not isinstance(value, (str, bytes))):
+                attr.write(self._transport, self._protocol, *value)
+            else:
+                attr.write(self._transport, self._protocol, value)
+        else:
+            object.__setattr__(self, name, value)
+
+
+class Lazy(object):
+    """Defers the construction of a sub-driver or command until the first
+    access of the driver attribute.
+
+    Instruments with large command trees construct hundreds of commands and
+    types. Wrapping the subsystems, e.g.::
+
+        class Instrument(Driver):
+            def __init__(self, transport):
+                super(Instrument, self).__init__(transport)
+                self.source = Lazy(Source, transport, self._protocol)
+                self.zone1 = Lazy(Command, 'ZONE? 1', 'ZONE 1,', ZONE_TYPE)
+
+    constructs them on first use only. Accessing `instrument.source` returns
+    the constructed :class:`Driver`, `instrument.zone1` queries the
+    constructed :class:`Command` as usual.
+
+    :param factory: A callable returning the attribute, e.g. a driver class.
+    :param args: Positional arguments of the factory.
+    :param kw: Keyword arguments of the factory.
+
+    """
+    __slots__ = ('factory', 'args', 'kw')
+
+    def __init__(self, factory, *args, **kw):
+        self.factory = factory
+        self.args = args
+        self.kw = kw
+
+    @property
+    def command(self):
+        """`True` if the factory constructs a :class:`Command`."""
+        return isinstance(self.factory, type) and issubclass(self.factory,
+                                                             Command)
+
+    def create(self):
+        return self.factory(*self.args, **self.kw)
+
+    def __repr__(self):
+        return '<Lazy({0})>'.format(getattr(self.factory, '__name__',
+                                            self.factory))
+
+
+class LazySequence(collections.Sequence):
+    """An immutable sequence constructing its items on first access, e.g. the
+    curves of a temperature controller::
+
+        self.curves = LazySequence(
+            lambda idx: Curve(transport, self._protocol, idx), range(1, 61))
+
+    :param factory: A callable receiving a key and returning the item.
+    :param keys: The keys of the items.
+
+    """
+    def __init__(self, factory, keys):
+        self._factory = factory
+        self._keys = tuple(keys)
+        self._items = [None] * len(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self[i] for i in range(*index.indices(len(self))))
+        item = self._items[index]
+        if item is None:
+            item = self._items[index] = self._factory(self._keys[index])
+        return item
+
+    def __repr__(self):
+        constructed = sum(x is not None for x in self._items)
+        return '<LazySequence(len={0}, constructed={1})>'.format(
+            len(self), constructed)
 
 
 class CommandSequence(slave.misc.ForwardSequence):
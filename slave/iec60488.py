@@ -165,8 +165,10 @@ from __future__ import (absolute_import, division,
 # We're not using a star import here, because python-future 0.13's `newobject`
 # breaks multiple inheritance due to it's metaclass.
 from future.builtins import map, zip, dict, int, list, range, str
+import re
 
-from slave.driver import Command, Driver
+from slave.driver import Command, Driver, Recording
+from slave.transport import SimulatedTransport
 from slave.types import Boolean, Integer, Register, String
 
 
@@ -195,6 +197,19 @@ EVENT_STATUS_BYTE = {
 PARALLEL_POLL_REGISTER = dict((i, str(i)) for i in range(8, 16))
 
 
+def definite_length_block(data):
+    """Encodes data as definite length arbitrary block program data, e.g.
+    `'#15HELLO'`.
+
+    :param data: The data string. The length is counted in encoded bytes.
+
+    """
+    length = str(len(data.encode('ascii')))
+    if len(length) > 9:
+        raise ValueError('Data too long.')
+    return '#{0}{1}{2}'.format(len(length), length, data)
+
+
 def _construct_register(reg, default_reg):
     """Constructs a register dict."""
     if reg:
@@ -522,6 +537,75 @@ class Macro(object):
         """Deletes all previously defined macros."""
         self._write('*PMC')
 
+    def record_macro(self, label):
+        """Records commands and defines them as macro.
+
+        The commands issued within the `with` block are recorded instead of
+        being sent. On exit, they are compiled into a single macro with
+        `*DMC`. The returned :class:`MacroRecording` replays it with a single
+        message, e.g.::
+
+            with instrument.record_macro('CYCLE') as cycle:
+                instrument.arm()
+                instrument.initiate()
+                instrument.data
+
+            for i in range(100):
+                data, = cycle()
+
+        :param label: The macro label, up to 12 characters.
+
+        """
+        return MacroRecording(self, label)
+
+
+class MacroRecording(Recording):
+    """A recorded macro of a :class:`Macro` instrument.
+
+    :param instrument: An instrument with the :class:`Macro` mixin.
+    :param label: The macro label.
+
+    """
+    LABEL = re.compile(r'^[A-Za-z][A-Za-z0-9_]{0,11}$')
+
+    def __init__(self, instrument, label):
+        if not self.LABEL.match(label):
+            raise ValueError('Invalid macro label: {0!r}'.format(label))
+        super(MacroRecording, self).__init__(instrument._transport)
+        self.instrument = instrument
+        self.label = label
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super(MacroRecording, self).__exit__(exc_type, exc_value, traceback)
+        if exc_type is None:
+            self.define()
+
+    def define(self):
+        """Defines the macro on the instrument."""
+        if not self.units:
+            raise ValueError('Empty macro.')
+        protocol = self.instrument._protocol
+        message = self.message(getattr(protocol, 'msg_header_sep', ' '),
+                               getattr(protocol, 'msg_data_sep', ','))
+        self.instrument.define_macro(
+            '"{0}",{1}'.format(self.label, definite_length_block(message)))
+
+    def __call__(self):
+        """Executes the macro with a single message.
+
+        :returns: A list with the parsed responses of the recorded queries or
+            `None` if the macro contains no queries.
+
+        """
+        protocol, transport = self.instrument._protocol, self.instrument._transport
+        if isinstance(transport, SimulatedTransport):
+            return None
+        if not self.queries:
+            protocol.write(transport, self.label)
+            return None
+        response = protocol.query(transport, self.label)
+        return self.parse(response, getattr(protocol, 'resp_data_sep', ','))
+
 
 class ObjectIdentification(object):
     """A mixin class, implementing the optional object identification command.
@@ -594,7 +678,12 @@ class Learn(object):
             of the device at the time this command was executed.
 
         """
-        return self._query(('*LRN?', String))
+        if isinstance(self._transport, SimulatedTransport):
+            return self._query(('*LRN?', String))
+        # The response contains data separators, therefore it is joined again
+        # instead of being parsed.
+        response = self._protocol.query(self._transport, '*LRN?')
+        return ','.join(response)
 
 
 class SystemConfiguration(object):
@@ -1,9 +1,11 @@
 #  -*- coding: utf-8 -*-
 #
 # E21, (c) 2012-2015, see AUTHORS.  Licensed under the GNU GPL.
+import contextlib
+
 from slave.driver import Command, Driver
 import slave.iec60488 as iec
-from slave.types import Boolean, Float, Integer, Mapping, Set
+from slave.types import Boolean, Float, Integer, Mapping, Set, Stream
 
 
 class Initiate(Driver):
@@ -172,6 +174,14 @@ class Trace(Driver):
         """Query bytes available and bytes in use."""
         return self._query((':TRAC:FREE?', [Float, Float]))
 
+    def data(self):
+        """Reads all readings stored in the buffer.
+
+        :returns: A numpy array of the readings.
+
+        """
+        return self._query((':TRAC:DATA?', Stream(Float, as_array=True)))
+
 
 class Trigger(Driver):
     """The Trigger command layer.
@@ -264,6 +274,8 @@ class K2182(iec.IEC60488, iec.StoredSetting, iec.Trigger):
         ..note:: This Command is much slower than :meth:`.read`.
 
     """
+    _compound = True
+
     def __init__(self, transport, protocol=None):
         super(K2182, self).__init__(transport, protocol)
         self.initiate = Initiate(self._transport, self._protocol)
@@ -285,6 +297,28 @@ class K2182(iec.IEC60488, iec.StoredSetting, iec.Trigger):
         """Resets the trigger system, it put's the device in idle mode."""
         self._write(':ABOR')
 
+    @contextlib.contextmanager
+    def batch(self):
+        """Sends all writes within the with block together, if the protocol
+        supports it, e.g. the :class:`~slave.keithley.k6221.MediatorProtocol`
+        used to access the K2182 through the K6221::
+
+            k2182 = k6221.system.communicate.serial.k2182
+            with k2182.batch():
+                k2182.sample_count = 1024
+                k2182.trace.points = 1024
+                k2182.trace.feed = 'sense'
+
+        Otherwise, the writes are sent immediately.
+
+        """
+        batch = getattr(self._protocol, 'batch', None)
+        if batch is None:
+            yield
+        else:
+            with batch(self._transport):
+                yield
+
     def fetch(self):
         """Returns the latest available reading
 
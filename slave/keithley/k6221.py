@@ -5,64 +5,179 @@
 :class:`~.K6221` ac/dc current source.
 
 """
+import contextlib
 import itertools
-from slave.driver import Command, Driver
+import threading
+import time
+
+import numpy as np
+
+from slave.driver import Command, Driver, Lazy
 from slave.iec60488 import (IEC60488, Trigger, ObjectIdentification,
     StoredSetting)
 from slave.types import (Boolean, Enum, Float, Integer, Mapping, String, Set,
     Stream, Register)
 from slave.keithley.k2182 import K2182
-from slave.protocol import IEC60488 as IEC60488Protocol, Timeout, logger, _retry
+from slave.protocol import IEC60488 as IEC60488Protocol, logger, _retry
+from slave.transport import SimulatedTransport, Timeout
+import slave.misc
 
     
 class MediatorProtocol(IEC60488Protocol):
-    """Allows communication with the nanovolt meter through the K6221."""
+    """Allows communication with the nanovolt meter through the K6221.
+
+    Each message is forwarded to the serial port of the K6221 with the
+    `SYST:COMM:SER:SEND` command. Responses are fetched with
+    `SYST:COMM:SER:ENT?`. A large response, e.g. the trace buffer of the
+    K2182, arrives in several parts. It is polled until it is complete. A part
+    is recognized as incomplete when its final terminator does not arrive
+    within the transport timeout, a short transport timeout therefore speeds
+    up large transfers. Until the first part arrives, the polling delay
+    doubles from :attr:`.poll_delay` up to :attr:`.max_poll_delay`.
+
+    Writes issued within a :meth:`.batch` block are sent together, joined
+    with ';', in as few `SEND` commands as possible.
+
+    :ivar int max_length: The maximum length of a forwarded message.
+    :ivar float poll_delay: The initial delay between polls in seconds.
+    :ivar float max_poll_delay: The maximum delay between polls in seconds.
+    :ivar float timeout: The maximum time in seconds to wait for a response.
+
+    """
     def __init__(self, *args, **kw):
         super(MediatorProtocol, self).__init__(*args, resp_term='\n\n', **kw)
         self.write_cmd = 'SYST:COMM:SER:SEND'
         self.query_cmd = 'SYST:COMM:SER:ENT?'
-    
-    def create_message(self, header, *data):
+        self.max_length = 256
+        self.poll_delay = 0.01
+        self.max_poll_delay = 0.5
+        self.timeout = 10.
+        self._local = threading.local()
+
+    def create_command(self, header, *data):
+        """Creates the forwarded, unwrapped message."""
         if not data:
-            msg = ''.join((self.msg_prefix, header))
-        else:
-            data = self.msg_data_sep.join(data)
-            msg = ''.join((self.msg_prefix, header, self.msg_header_sep, data))
+            return ''.join((self.msg_prefix, header))
+        data = self.msg_data_sep.join(data)
+        return ''.join((self.msg_prefix, header, self.msg_header_sep, data))
+
+    def wrap(self, command):
+        """Wraps a forwarded message in a `SEND` command."""
+        return ''.join((self.write_cmd, ' "', command, '\n"', self.msg_term))
+
+    def create_message(self, header, *data):
         # Wrap mediated message
-        msg = ''.join((self.write_cmd, ' "', msg, '\n"', self.msg_term))
+        msg = self.wrap(self.create_command(header, *data))
         return msg.encode(self.encoding)
-    
+
     def create_query_message(self, header, *data):
-        if not data:
-            msg = ''.join((self.msg_prefix, header))
-        else:
-            data = self.msg_data_sep.join(data)
-            msg = ''.join((self.msg_prefix, header, self.msg_header_sep, data))
         # Wrap mediated message
         msg = ''.join((
-            self.write_cmd, ' "', msg, '\n"', self.msg_term,
+            self.wrap(self.create_command(header, *data)),
             ';', self.query_cmd, self.msg_term
         ))
         return msg.encode(self.encoding)
-    
-    @_retry(errors=(IEC60488Protocol.ParsingError, UnicodeDecodeError, UnicodeEncodeError, Timeout), logger=logger)
+
+    @contextlib.contextmanager
+    def batch(self, transport):
+        """Collects all writes of the current thread within the with block
+        and sends them together on exit or with the next query.
+        """
+        if getattr(self._local, 'batch', None) is not None:
+            # Nested batch blocks are merged.
+            yield
+            return
+        self._local.batch = []
+        try:
+            yield
+        finally:
+            commands, self._local.batch = self._local.batch, None
+        if commands:
+            with transport:
+                self._send(transport, commands)
+
+    def _pack(self, commands):
+        """Joins the commands into as few messages as possible."""
+        messages = []
+        for command in commands:
+            if messages and len(messages[-1]) + 1 + len(command) <= self.max_length:
+                messages[-1] = ';'.join((messages[-1], command))
+            else:
+                messages.append(command)
+        return messages
+
+    def _send(self, transport, commands):
+        for message in self._pack(commands):
+            message = self.wrap(message).encode(self.encoding)
+            logger.debug('Mediator write: %r', message)
+            transport.write(message)
+
+    def _enter(self, transport):
+        """Polls the response until it is complete."""
+        term = self.resp_term[0].encode(self.encoding)
+        poll = ''.join((self.query_cmd, self.msg_term)).encode(self.encoding)
+        response = bytearray()
+        delay = self.poll_delay
+        deadline = time.time() + self.timeout
+        while True:
+            # Each ENT? response is terminated by the K6221. A complete K2182
+            # response is terminated as well, therefore the last part is
+            # followed by a second terminator. It is part of the same ENT?
+            # response and arrives without polling. If nothing arrives until
+            # the transport times out, the response is incomplete.
+            part = transport.read_until(term)
+            if part or response:
+                response += part
+                try:
+                    while True:
+                        rest = transport.read_until(term)
+                        if not rest:
+                            return bytes(response)
+                        response += term + rest
+                except Timeout:
+                    pass
+            if not part and time.time() > deadline:
+                raise Timeout('Incomplete mediator response.')
+            if not response:
+                # Waits for the first part, the transport timeout elapsed
+                # already otherwise.
+                time.sleep(delay)
+                delay = min(2 * delay, self.max_poll_delay)
+            transport.write(poll)
+
+    @_retry
     def query(self, transport, header, *data):
-        message = self.create_query_message(header, *data)
-        logger.debug('Mediator query: %r', message)
+        pending = getattr(self._local, 'batch', None)
         with transport:
+            if pending:
+                # Send pending writes first, the last batch message carries
+                # the query if it fits.
+                messages = self._pack(pending + [self.create_command(header, *data)])
+                del pending[:]
+                self._send(transport, messages[:-1])
+                message = ''.join((
+                    self.wrap(messages[-1]), ';', self.query_cmd, self.msg_term
+                )).encode(self.encoding)
+            else:
+                message = self.create_query_message(header, *data)
+            logger.debug('Mediator query: %r', message)
             transport.write(message)
-            response = transport.read_until(self.resp_term.encode(self.encoding))
+            response = self._enter(transport)
         # TODO: Currently, response headers are not handled.
         logger.debug('IEC60488 response: %r', response)
         return self.parse_response(response)
 
-    @_retry(errors=(IEC60488Protocol.ParsingError, UnicodeDecodeError, UnicodeEncodeError, Timeout), logger=logger)
+    @_retry
     def write(self, transport, header, *data):
+        pending = getattr(self._local, 'batch', None)
+        if pending is not None:
+            pending.append(self.create_command(header, *data))
+            return
         message = self.create_message(header, *data)
         logger.debug('IEC60488 write: %r', message)
         with transport:
             transport.write(message)
-    
+
 
 class K6221(IEC60488, Trigger, ObjectIdentification):
     """The Keithley K6221 ac/dc current source.
@@ -131,24 +246,28 @@ class K6221(IEC60488, Trigger, ObjectIdentification):
         :class:`~.Units`.
 
     """
+    _compound = True
+
     def __init__(self, transport):
         super(K6221, self).__init__(transport)
         # The command subgroups
-        self.math = Math(self._transport, self._protocol)
-        self.buffer_statistics = BufferStatistics(self._transport, self._protocol)
-        self.digital_io = DigitalIO(self._transport, self._protocol)
-        self.display = Display(self._transport, self._protocol)
-        self.format = Format(self._transport, self._protocol)
-        self.output = Output(self._transport, self._protocol)
-        self.sense = Sense(self._transport, self._protocol)
-        self.source = Source(self._transport, self._protocol)
-        self.status_cmds = Status(self._transport, self._protocol)
-        self.system = System(self._transport, self._protocol)
-        self.trace = Trace(self._transport, self._protocol)
+        self.math = Lazy(Math, self._transport, self._protocol)
+        self.buffer_statistics = Lazy(
+            BufferStatistics, self._transport, self._protocol
+        )
+        self.digital_io = Lazy(DigitalIO, self._transport, self._protocol)
+        self.display = Lazy(Display, self._transport, self._protocol)
+        self.format = Lazy(Format, self._transport, self._protocol)
+        self.output = Lazy(Output, self._transport, self._protocol)
+        self.sense = Lazy(Sense, self._transport, self._protocol)
+        self.source = Lazy(Source, self._transport, self._protocol)
+        self.status_cmds = Lazy(Status, self._transport, self._protocol)
+        self.system = Lazy(System, self._transport, self._protocol)
+        self.trace = Lazy(Trace, self._transport, self._protocol)
         # The trigger command layer
-        self.arm = Arm(self._transport, self._protocol)
-        self.triggering = Trigger(self._transport, self._protocol)
-        self.units = Units(self._transport, self._protocol)
+        self.arm = Lazy(Arm, self._transport, self._protocol)
+        self.triggering = Lazy(Trigger, self._transport, self._protocol)
+        self.units = Lazy(Units, self._transport, self._protocol)
 
 
     # TODO list method in trigger rubric
@@ -310,8 +429,8 @@ class Display(Driver):
     def __init__(self, transport, protocol):
         super(Display, self).__init__(transport, protocol)
         self.enabled = Command(':DISP:ENAB?', ':DISP:ENAB', Boolean)
-        self.top = DisplayWindow(1, self._transport, self._protocol)
-        self.bottom = DisplayWindow(2, self._transport, self._protocol)
+        self.top = Lazy(DisplayWindow, 1, self._transport, self._protocol)
+        self.bottom = Lazy(DisplayWindow, 2, self._transport, self._protocol)
 
 
 class DisplayWindow(Driver):
@@ -325,7 +444,9 @@ class DisplayWindow(Driver):
     def __init__(self, id, transport, protocol):
         super(DisplayWindow, self).__init__(transport, protocol)
         self.id = int(id)
-        self.text = DisplayWindowText(self.id, self._transport, self._protocol)
+        self.text = Lazy(
+            DisplayWindowText, self.id, self._transport, self._protocol
+        )
         self.blinking = Command(
             ':DISP:WIND{}:ATTR?'.format(id),
             ':DISP:WIND{}:ATTR'.format(id),
@@ -474,8 +595,8 @@ class Sense(Driver):
     """
     def __init__(self, transport, protocol):
         super(Sense, self).__init__(transport, protocol)
-        self.data = SenseData(self._transport, self._protocol)
-        self.average = SenseAverage(self._transport, self._protocol)
+        self.data = Lazy(SenseData, self._transport, self._protocol)
+        self.average = Lazy(SenseAverage, self._transport, self._protocol)
 
 
 class SenseData(Driver):
@@ -548,21 +669,24 @@ class Source(Driver):
     """
     def __init__(self, transport, protocol):
         super(Source, self).__init__(transport, protocol)
-        self.current = SourceCurrent(self._transport, self._protocol)
+        self.current = Lazy(SourceCurrent, self._transport, self._protocol)
         self.delay = Command(
             ':SOUR:DEL?',
             ':SOUR:DEL',
             Float(min=1e-3, max=999999.999, fmt='{0:.3f}')
         )
-        self.sweep = SourceSweep(self._transport, self._protocol)
-        self.list = SourceList(self._transport, self._protocol)
-        self.delta = SourceDelta(self._transport, self._protocol)
-        self.pulse_delta = SourcePulseDelta(self._transport, self._protocol)
-        self.differential_conductance = SourceDifferentialConductance(
+        self.sweep = Lazy(SourceSweep, self._transport, self._protocol)
+        self.list = Lazy(SourceList, self._transport, self._protocol)
+        self.delta = Lazy(SourceDelta, self._transport, self._protocol)
+        self.pulse_delta = Lazy(
+            SourcePulseDelta, self._transport, self._protocol
+        )
+        self.differential_conductance = Lazy(
+            SourceDifferentialConductance,
             self._transport,
             self._protocol
         )
-        self.wave = SourceWave(self._transport, self._protocol)
+        self.wave = Lazy(SourceWave, self._transport, self._protocol)
 
     def clear(self):
         """Clears the current source."""
@@ -715,14 +839,22 @@ class SourceList(Driver):
     :attr:`~.SourceList.delay` and :attr:`~.SourceList.compliance` can be
     manipulated in the same manner.
 
+    To program a complete list sweep at once, use :meth:`.load`, e.g.::
+
+        >>> currents = np.linspace(-1e-3, 1e-3, 1001)
+        >>> k6221.source.list.load(currents, delays=1e-3, compliances=10.)
+
     :ivar current: An instance of :class:`~.SourceListSequence`, giving access
         to the current subsystem.
     :ivar delay: An instance of :class:`~.SourceListSequence`, giving access
         to the delay subsystem.
-    :ivar current: An instance of :class:`~.SourceListSequence`, giving access
-        to the compliance subsystem.
+    :ivar compliance: An instance of :class:`~.SourceListSequence`, giving
+        access to the compliance subsystem.
 
     """
+    #: The maximum length of a single message in bytes.
+    MAX_LENGTH = 1024
+
     def __init__(self, transport, protocol):
         super(SourceList, self).__init__(transport, protocol)
         self.current = SourceListSequence(
@@ -737,25 +869,78 @@ class SourceList(Driver):
             node='DEL',
             type=Float(min=1e-3, max=999999.999)
         )
-        self.current = SourceListSequence(
+        self.compliance = SourceListSequence(
             transport,
             protocol,
             node='COMP',
-            type=Float(min=-1e-3, max=105e-3)
+            type=Float(min=0.1, max=105)
         )
 
+    def load(self, currents, delays=None, compliances=None):
+        """Replaces the list sweep.
+
+        The sequences are split into `APPEND` commands of at most
+        :attr:`.MAX_LENGTH` bytes, which are packed into compound messages.
+        Finally, the lengths of the lists are verified with a single query.
+
+        :param currents: A sequence of currents.
+        :param delays: An optional sequence of delays or a single delay used
+            for all points.
+        :param compliances: An optional sequence of compliances or a single
+            compliance used for all points.
+        :raises RuntimeError: If the verification fails.
+
+        """
+        currents = np.asarray(currents, dtype=float).ravel()
+        sequences = [(self.current, currents)]
+        for sequence, values in ((self.delay, delays), (self.compliance, compliances)):
+            if values is not None:
+                values = np.asarray(values, dtype=float)
+                if values.ndim == 0:
+                    values = np.repeat(values, len(currents))
+                sequences.append((sequence, values.ravel()))
+
+        commands = []
+        for sequence, values in sequences:
+            if len(values) != len(currents):
+                raise ValueError('Unequal sequence lengths.')
+            commands.extend(sequence._commands(values, self.MAX_LENGTH))
+        if isinstance(self._transport, SimulatedTransport):
+            return
+
+        message = []
+        for command in commands:
+            if message and len(';'.join(message + [command])) > self.MAX_LENGTH:
+                self._protocol.write(self._transport, ';'.join(message))
+                message = []
+            message.append(command)
+        if message:
+            self._protocol.write(self._transport, ';'.join(message))
+
+        query = ';'.join(
+            ':SOUR:LIST:{0}:POIN?'.format(sequence._node)
+            for sequence, _ in sequences
+        )
+        response = self._protocol.query(self._transport, query)
+        lengths = [int(x) for x in ','.join(response).split(';')]
+        if lengths != [len(currents)] * len(sequences):
+            raise RuntimeError(
+                'List verification failed, lengths {0} != {1}.'.format(
+                    lengths, len(currents)))
+
 
 class SourceListSequence(Driver):
     def __init__(self, transport, protocol, node, type):
         super(SourceListSequence, self).__init__(transport, protocol)
         self._node = node
+        self._type = type
         self._extend = Command(write=(
             ':SOUR:LIST:{}:APPEND'.format(node),
             itertools.repeat(type))
         )
         self._sequence = Command(
             ':SOUR:LIST:{}?'.format(node),
-            ':SOUR:LIST:{}?'.format(node),
+            ':SOUR:LIST:{}'.format(node),
             itertools.repeat(type)
         )
 
@@ -763,6 +948,31 @@ class SourceListSequence(Driver):
         """Extends the list."""
         self._extend = iterable
 
+    def _commands(self, values, max_length):
+        """Creates the commands replacing the list with the values.
+
+        Each command is limited to `max_length` bytes. The first one defines
+        the list, the following ones append to it.
+
+        """
+        min, max = self._type._min, self._type._max
+        if (min is not None and np.any(values < min)) or (max is not None and np.any(values > max)):
+            raise ValueError('Values exceed the range [{0}, {1}].'.format(min, max))
+        data = ['{0:.9g}'.format(x) for x in values]
+        commands, chunk = [], []
+        header = ':SOUR:LIST:{0}'.format(self._node)
+        length = len(header)
+        for item in data:
+            if chunk and length + 1 + len(item) > max_length:
+                commands.append(header + ' ' + ','.join(chunk))
+                header = ':SOUR:LIST:{0}:APP'.format(self._node)
+                chunk, length = [], len(header)
+            chunk.append(item)
+            length += len(item) + 1
+        if chunk:
+            commands.append(header + ' ' + ','.join(chunk))
+        return commands
+
     def __getitem__(self, item):
         return self._sequence[item]
 
@@ -1036,8 +1246,12 @@ class SourceWave(Driver):
             ':SOUR:WAVE:OFFS',
             Float(min=-105e-3, max=105e-3)
         )
-        self.phase_marker = SourceWavePhaseMarker(self._transport, self._protocol)
-        self.arbitrary = SourceWaveArbitrary(self._transport, self._protocol)
+        self.phase_marker = Lazy(
+            SourceWavePhaseMarker, self._transport, self._protocol
+        )
+        self.arbitrary = Lazy(
+            SourceWaveArbitrary, self._transport, self._protocol
+        )
         self.ranging = Command(
             ':SOUR:WAVE:RANG?',
             ':SOUR:WAVE:RANG',
@@ -1057,7 +1271,9 @@ class SourceWave(Driver):
             # The Keithley accepts 'INF' as a valid duration.
             Float(min=1e-3, max=99999999900)
         )
-        self.external_trigger = SourceWaveETrigger(self._transport, self._protocol)
+        self.external_trigger = Lazy(
+            SourceWaveETrigger, self._transport, self._protocol
+        )
 
     def arm(self):
         """Arm waveform function."""
@@ -1102,20 +1318,41 @@ class SourceWavePhaseMarker(Driver):
 class SourceWaveArbitrary(Driver):
     """The arbitrary waveform command subgroup of the SourceWave node.
 
-    It supports slicing notation to read and write up to 100 points into memory.
+    It supports slicing notation to read and write the points in memory.
+    Complete waveforms are transfered with :meth:`.upload` and
+    :meth:`.download`, e.g.::
+
+        import numpy as np
+
+        t = np.linspace(0, 2 * np.pi, 10000, endpoint=False)
+        k6221.source.wave.arbitrary.upload(np.sin(t) * np.exp(-t))
+        # Change a few points. The waveform is not read back.
+        k6221.source.wave.arbitrary.update(100, [0., 0.5, 1.])
+
+    The points are sent in chunks of :attr:`.CHUNK_SIZE` points, the first
+    with `:SOUR:WAVE:ARB:DATA`, the following with `:SOUR:WAVE:ARB:APPEND`.
+    The last uploaded waveform is remembered, so :meth:`.update` and item
+    assignments do not need to read the points back.
+
+    .. note::
+
+        The K6221 accepts the waveform points in ASCII format only. To reduce
+        the transfer size, the points are sent with :attr:`.digits`
+        significant digits.
+
+    :ivar int digits: The number of significant digits of the sent points.
+        Default: 6.
 
     """
+    #: The maximum number of points.
+    MAX_POINTS = 65536
+    #: The maximum number of points of a single command.
+    CHUNK_SIZE = 100
+
     def __init__(self, transport, protocol):
         super(SourceWaveArbitrary, self).__init__(transport, protocol)
-        self._extend = Command(write=(
-            ':SOUR:WAVE:ARB:APPEND',
-            itertools.repeat(Float(min=-1, max=1.), 100)
-        ))
-        self._sequence = Command(
-                ':SOUR:WAVE:ARB:DATA?',
-                ':SOUR:WAVE:ARB:DATA',
-            itertools.repeat(Float(min=-1, max=1.), 100)
-        )
+        self.digits = 6
+        self._points = None
 
     def copy(self, index):
         """Copy arbitrary points into NVRAM.
@@ -1126,17 +1363,88 @@ class SourceWaveArbitrary(Driver):
         """
         self._write(('SOUR:WAVE:ARB:COPY', Integer(min=1, max=4)), index)
 
+    def upload(self, points):
+        """Replaces the waveform.
+
+        :param points: A sequence of at least two and at most
+            :attr:`.MAX_POINTS` points in the range [-1, 1].
+
+        """
+        points = self._validate(points)
+        if len(points) < 2:
+            raise ValueError('At least two points are required.')
+        for start in range(0, len(points), self.CHUNK_SIZE):
+            header = ':SOUR:WAVE:ARB:APPEND' if start else ':SOUR:WAVE:ARB:DATA'
+            self._send(header, points[start:start + self.CHUNK_SIZE])
+        self._points = points
+
+    def download(self):
+        """Reads the waveform.
+
+        :returns: A numpy array of the points.
+
+        """
+        points = self._query((':SOUR:WAVE:ARB:DATA?', Stream(Float, as_array=True)))
+        self._points = points
+        return points.copy()
+
     def extend(self, iterable):
-        """Extends the list."""
-        self._extend = iterable
+        """Extends the waveform."""
+        points = self._validate(iterable)
+        length = 0 if self._points is None else len(self._points)
+        if length + len(points) > self.MAX_POINTS:
+            raise ValueError('Too many points.')
+        for start in range(0, len(points), self.CHUNK_SIZE):
+            self._send(':SOUR:WAVE:ARB:APPEND', points[start:start + self.CHUNK_SIZE])
+        if self._points is not None:
+            self._points = np.concatenate((self._points, points))
+
+    def update(self, start, values):
+        """Replaces a range of points.
+
+        :param start: The index of the first replaced point.
+        :param values: The new points.
+
+        """
+        values = self._validate(values)
+        points = self._current()
+        start = slave.misc.index(start, len(points))
+        if start + len(values) > len(points):
+            raise IndexError('Points exceed the waveform.')
+        if np.array_equal(points[start:start + len(values)], values):
+            return
+        points = points.copy()
+        points[start:start + len(values)] = values
+        self.upload(points)
+
+    def _current(self):
+        """Returns the last uploaded waveform, it is read if unknown."""
+        if self._points is None:
+            self.download()
+        return self._points
+
+    def _validate(self, points):
+        points = np.asarray(points, dtype=float).ravel()
+        if len(points) > self.MAX_POINTS:
+            raise ValueError('Too many points.')
+        if not np.all(np.abs(points) <= 1.):
+            raise ValueError('Points must be in the range [-1, 1].')
+        return points
+
+    def _send(self, header, points):
+        if isinstance(self._transport, SimulatedTransport):
+            return
+        data = ['{0:.{1}g}'.format(x, self.digits) for x in points]
+        self._protocol.write(self._transport, header, *data)
 
     def __getitem__(self, item):
-        return self._sequence[item]
+        points = self._current()[item]
+        return points.tolist() if isinstance(item, slice) else float(points)
 
     def __setitem__(self, item, value):
-        seq = self._sequence
-        seq[item] = value
-        self._sequence = seq
+        points = self._current().copy()
+        points[item] = value
+        self.upload(points)
 
     def __len__(self):
         return self._query((':SOUR:WAVE:ARB:POIN?', Integer))
@@ -1630,7 +1938,7 @@ class Trace(Driver):
             ':TRAC:TST:FORM',
             Mapping({'absolute': 'ABS', 'delta': 'DELT'})
         )
-        self.data = TraceData(self._transport, self._protocol)
+        self.data = Lazy(TraceData, self._transport, self._protocol)
 
     def clear(self):
         """Clears the readings from buffer."""
@@ -1647,7 +1955,8 @@ class TraceData(Driver):
     """The data command subsystem of the Trace node.
 
     The TraceData class provides a listlike interface to access the stored
-    values.
+    values. The readings are returned as numpy array. Each record consists of
+    the fields defined in :attr:`~.TraceData.fields`.
 
     E.g.::
 
@@ -1659,11 +1968,15 @@ class TraceData(Driver):
         k6221.trace.data[4:8]
 
         # Requests all readings in buffer.
-        k6221.trace.data[:]
+        data = k6221.trace.data[:]
+        print(data['reading'], data['timestamp'])
 
 
     :ivar type: The type of the stored readings. Valid are `None`, 'delta',
         'dcon', 'pulse'. (read-only).
+    :ivar fields: A sequence of record field names. It must match the numeric
+        data elements, see :attr:`.Format.elements`. Default:
+        `('reading', 'timestamp')`.
 
     """
     def __init__(self, transport, protocol):
@@ -1678,10 +1991,24 @@ class TraceData(Driver):
                 'pulse': 'PULS'
             })
         )
+        self.fields = ('reading', 'timestamp')
 
     def __getitem__(self, item):
-        # TODO
-        raise NotImplementedError()
+        if isinstance(item, slice):
+            points = self._query((':TRAC:POIN:ACT?', Integer))
+            start, stop, step = item.indices(points)
+            count = stop - start
+        else:
+            if item < 0:
+                item += self._query((':TRAC:POIN:ACT?', Integer))
+            start, count, step = item, 1, 1
+        if count <= 0 or step < 1:
+            raise IndexError('Empty or reversed selection.')
+        record = Stream(*[Float] * len(self.fields), as_array=True,
+                        names=self.fields)
+        cmd = ':TRAC:DATA:SEL?', record, [Integer(min=0), Integer(min=1)]
+        data = self._query(cmd, start, count)
+        return data[::step] if isinstance(item, slice) else data[0]
 
 
 # -----------------------------------------------------------------------------
@@ -1799,8 +2126,8 @@ class Units(Driver):
     """
     def __init__(self, transport, protocol):
         super(Units, self).__init__(transport, protocol)
-        self.voltage = UnitVoltage(self._transport, self._protocol)
-        self.power = UnitPower(self._transport, self._protocol)
+        self.voltage = Lazy(UnitVoltage, self._transport, self._protocol)
+        self.power = Lazy(UnitPower, self._transport, self._protocol)
 
 
 class UnitVoltage(Driver):
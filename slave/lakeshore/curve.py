@@ -0,0 +1,392 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+"""The :mod:`slave.lakeshore.curve` module implements the bulk transfer of
+calibration curves shared by the lakeshore temperature controllers.
+
+Reading or writing a curve point by point costs one transaction per point.
+The :class:`CurveTransfer` mixin packs several `CRVPT` commands into a single
+compound message instead and only rewrites points that changed, e.g.::
+
+    from slave.lakeshore import LS340
+
+    ls340 = LS340(transport)
+    curve = ls340.user_curve[0]
+    # Load a standard .340 curve file.
+    curve.load('X12345.340')
+    # Read all stored points into a numpy array of shape (N, 2).
+    points = curve.read()
+
+A :class:`Calibration` converts sensor units to kelvin locally, with the same
+interpolation the device uses. Together with the :class:`CurveCache`, archived
+raw readings can be converted without querying the device at all, e.g.::
+
+    from slave.lakeshore import LS370
+    from slave.lakeshore.curve import CurveCache
+
+    ls370 = LS370(transport)
+    cache = CurveCache('~/.cache/curves')
+    # The curve is only downloaded, if it is not cached yet.
+    calibration = cache.get(ls370.user_curve[0], ls370.identification[2])
+    kelvin = calibration.kelvin(resistances)
+
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+import hashlib
+import io
+import os
+import re
+
+import numpy as np
+
+from slave.transport import SimulatedTransport
+from slave.types import Float, Integer
+import slave.scheduler
+
+
+#: Maps the data format codes of .340 curve files to the curve header format.
+FORMATS = {
+    1: 'mV/K',
+    2: 'V/K',
+    3: 'Ohm/K',
+    4: 'logOhm/K',
+    5: 'logOhm/logK',
+}
+
+#: Maps the temperature coefficient codes of .340 curve files to the curve
+#: header coefficient.
+COEFFICIENTS = {
+    1: 'negative',
+    2: 'positive',
+}
+
+
+def read_340(filename):
+    """Reads a standard lakeshore .340 curve file.
+
+    :param filename: The path of the curve file.
+    :returns: A tuple *(<header>, <points>)*, where *<header>* is a tuple
+        *(<name>, <serial>, <format>, <limit>, <coefficient>)* as used by the
+        curve header command and *<points>* is a numpy array of shape (N, 2)
+        containing the *(<units value>, <temp value>)* pairs.
+
+    """
+    with io.open(filename, encoding='ascii', errors='replace') as f:
+        lines = f.read().splitlines()
+
+    fields = {}
+    points = []
+    for line in lines:
+        if ':' in line:
+            key, value = line.split(':', 1)
+            fields[key.strip().lower()] = value.strip()
+            continue
+        items = line.split()
+        if len(items) == 3:
+            try:
+                points.append((float(items[1]), float(items[2])))
+            except ValueError:
+                # The table header
+                pass
+
+    def field(key):
+        try:
+            return fields[key]
+        except KeyError:
+            raise ValueError('Missing curve file field {0!r}.'.format(key))
+
+    def code(key):
+        match = re.match(r'\d+', field(key))
+        if not match:
+            raise ValueError('Invalid curve file field {0!r}.'.format(key))
+        return int(match.group())
+
+    header = (
+        field('sensor model')[:15],
+        field('serial number')[:10],
+        FORMATS[code('data format')],
+        float(field('setpoint limit').split()[0]),
+        COEFFICIENTS[code('temperature coefficient')],
+    )
+    return header, np.array(points, dtype=float).reshape(-1, 2)
+
+
+def write_340(filename, header, points):
+    """Writes a standard lakeshore .340 curve file.
+
+    :param filename: The path of the curve file.
+    :param header: The curve header tuple
+        *(<name>, <serial>, <format>, <limit>, <coefficient>)*.
+    :param points: A sequence of *(<units value>, <temp value>)* pairs.
+
+    """
+    name, serial, format, limit, coefficient = header
+    formats = dict((v, k) for k, v in FORMATS.items())
+    coefficients = dict((v, k) for k, v in COEFFICIENTS.items())
+    lines = [
+        'Sensor Model:   {0}'.format(name),
+        'Serial Number:  {0}'.format(serial),
+        'Data Format:    {0}      ({1})'.format(formats[format], format),
+        'SetPoint Limit: {0}      (Kelvin)'.format(float(limit)),
+        'Temperature coefficient:  {0} ({1})'.format(
+            coefficients[coefficient], coefficient.capitalize()),
+        'Number of Breakpoints:   {0}'.format(len(points)),
+        '',
+        'No.   Units      Temperature (K)',
+        '',
+    ]
+    lines.extend(
+        '{0:3d}  {1!r:<12} {2!r}'.format(i, float(unit), float(temp))
+        for i, (unit, temp) in enumerate(points, start=1)
+    )
+    with io.open(filename, 'w', encoding='ascii') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+class Calibration(object):
+    """Converts sensor units to kelvin with a calibration curve.
+
+    The conversion interpolates linearly in the units of the curve format,
+    e.g. for a `'logOhm/logK'` curve, the logarithm of the temperature is
+    interpolated between the logarithms of the resistance.
+
+    :param header: The curve header tuple
+        *(<name>, <serial>, <format>, <limit>, <coefficient>)*.
+    :param points: A sequence of *(<units value>, <temp value>)* pairs, in the
+        units of the curve format.
+
+    """
+    def __init__(self, header, points):
+        self.header = tuple(header)
+        self.format = format = header[2]
+        if format not in FORMATS.values():
+            raise ValueError('Invalid curve format {0!r}.'.format(format))
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if len(points) < 2:
+            raise ValueError('A calibration needs at least two points.')
+        self.points = points
+        # numpy.interp expects increasing sample points.
+        order = np.argsort(points[:, 0])
+        self._units = points[order, 0]
+        self._temperature = points[order, 1]
+
+    @classmethod
+    def from_curve(cls, curve):
+        """Downloads the header and points of a device curve."""
+        return cls(curve.header, curve.read())
+
+    @classmethod
+    def from_file(cls, filename):
+        """Reads a standard .340 curve file."""
+        return cls(*read_340(filename))
+
+    def save(self, filename):
+        """Writes the calibration as standard .340 curve file."""
+        write_340(filename, self.header, self.points)
+
+    def kelvin(self, units):
+        """Converts sensor units to kelvin.
+
+        :param units: A scalar or array of sensor units as returned by the
+            sensor units reading, e.g. the resistance in ohm for `'Ohm/K'` and
+            `'logOhm/K'` curves.
+        :returns: A numpy array of temperatures in kelvin. Values outside the
+            range of the curve are `nan`.
+
+        """
+        units = np.asarray(units, dtype=float)
+        if self.format.startswith('log'):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                units = np.log10(units)
+        temperature = np.interp(units, self._units, self._temperature,
+                                left=np.nan, right=np.nan)
+        if self.format.endswith('logK'):
+            temperature = 10. ** temperature
+        return temperature
+
+    def __call__(self, units):
+        return self.kelvin(units)
+
+    def __repr__(self):
+        return '<Calibration({0!r}, {1} points)>'.format(self.header, len(self.points))
+
+
+class CurveCache(object):
+    """Caches device curves on disk.
+
+    The cached curves are stored as standard .340 files, keyed by the serial
+    number of the device and the curve header. A modified curve header
+    therefore invalidates the cached curve.
+
+    .. note::
+
+        Changing the points of a curve without changing its header is not
+        detected. Use :meth:`.invalidate` in this case.
+
+    :param directory: The cache directory. It is created if it does not
+        exist.
+
+    """
+    def __init__(self, directory):
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self._calibrations = {}
+
+    def path(self, serial, header):
+        """The path of the cache file of the curve."""
+        key = repr([str(serial)] + [str(x) for x in header]).encode('utf-8')
+        digest = hashlib.sha1(key).hexdigest()[:16]
+        name = re.sub(r'[^\w.-]', '_', '{0}-{1}.340'.format(serial, digest))
+        return os.path.join(self.directory, name)
+
+    def get(self, curve, serial):
+        """Returns the :class:`Calibration` of a device curve.
+
+        Only the curve header is queried, if the curve is cached already.
+
+        :param curve: The curve, e.g. an instance of
+            :class:`slave.lakeshore.ls370.Curve`.
+        :param serial: The serial number of the device.
+
+        """
+        path = self.path(serial, curve.header)
+        try:
+            return self._calibrations[path]
+        except KeyError:
+            pass
+        if os.path.exists(path):
+            calibration = Calibration.from_file(path)
+        else:
+            calibration = Calibration.from_curve(curve)
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            calibration.save(path)
+        self._calibrations[path] = calibration
+        return calibration
+
+    def invalidate(self, curve, serial):
+        """Removes a curve from the cache."""
+        path = self.path(serial, curve.header)
+        self._calibrations.pop(path, None)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class CurveTransfer(object):
+    """A mixin class, implementing the bulk transfer of curve points.
+
+    .. note:: This is a mixin class designed to work with the lakeshore curve
+        drivers. It uses their `idx` attribute, the `header` command and the
+        builtin :func:`len`.
+
+    Several points are transfered with a single compound message, e.g.
+    `CRVPT? 21,1;CRVPT? 21,2`. The number of points per message is limited
+    by :attr:`.chunk_size`, to stay within the input buffer of the device.
+
+    """
+    #: The maximum number of points transfered with a single message.
+    chunk_size = 8
+
+    def __init__(self, *args, **kw):
+        super(CurveTransfer, self).__init__(*args, **kw)
+
+    def read(self, start=0, stop=None, strip=True):
+        """Reads several points of the curve.
+
+        :param start: The index of the first point.
+        :param stop: The index after the last point. If `None`, the points
+            are read up to the end of the curve buffer.
+        :param strip: If `True`, trailing empty points, e.g. the unused part of
+            the curve buffer, are removed.
+        :returns: A numpy array of shape (N, 2).
+
+        """
+        points = self._read_points(range(*slice(start, stop).indices(len(self))))
+        if strip:
+            used = np.flatnonzero(np.any(points != 0, axis=1))
+            points = points[:used[-1] + 1] if len(used) else points[:0]
+        return points
+
+    def write(self, points, diff=True):
+        """Writes the points to the curve.
+
+        The points replace the complete curve content. Stale points of the
+        previous curve, exceeding the new points, are cleared.
+
+        :param points: A sequence of *(<units value>, <temp value>)* pairs or a
+            numpy array of shape (N, 2).
+        :param diff: If `True`, the current curve content is read first and
+            only changed points are written. Otherwise the complete curve
+            buffer is written.
+        :returns: The number of written points.
+
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if len(points) > len(self):
+            raise ValueError('Too many points.')
+        new = np.zeros((len(self), 2))
+        new[:len(points)] = points
+        if diff:
+            current = self.read(strip=False)
+            indices = np.flatnonzero(np.any(current != new, axis=1))
+        else:
+            indices = np.arange(len(new))
+        self._write_points(indices, new[indices])
+        return len(indices)
+
+    def load(self, filename, diff=True):
+        """Loads a standard .340 curve file into the curve.
+
+        The header and all points of the curve are replaced.
+
+        :param filename: The path of the curve file.
+        :param diff: If `True`, only changed points are written, see
+            :meth:`.write`.
+        :returns: The number of written points.
+
+        """
+        header, points = read_340(filename)
+        self.header = header
+        return self.write(points, diff=diff)
+
+    def _read_points(self, indices):
+        """Reads the points at the given indices with compound queries."""
+        indices = list(indices)
+        points = np.zeros((len(indices), 2))
+        if isinstance(self._transport, SimulatedTransport):
+            for n, i in enumerate(indices):
+                points[n] = self._query(
+                    ('CRVPT?', [Float, Float], [Integer, Integer]), self.idx, i + 1)
+            return points
+        for start, length in slave.scheduler.chunks(0, len(indices), self.chunk_size):
+            message = ';'.join(
+                'CRVPT? {0},{1}'.format(self.idx, i + 1)
+                for i in indices[start:start + length]
+            )
+            response = self._protocol.query(self._transport, message)
+            # The protocol splits at the data separator only, the responses
+            # of the compound query are separated by ';'.
+            values = ','.join(response).replace(';', ',').split(',')
+            if len(values) != 2 * length:
+                raise ValueError('Invalid curve point response.')
+            points[start:start + length] = np.array(
+                values, dtype=float).reshape(length, 2)
+        return points
+
+    def _write_points(self, indices, points):
+        """Writes the points at the given indices with compound messages."""
+        if not getattr(self, '_writeable', True):
+            raise AttributeError('Curve is not writeable.')
+        indices = [int(i) for i in indices]
+        dump = Float().dump
+        messages = [
+            'CRVPT {0},{1},{2},{3}'.format(
+                self.idx, i + 1, dump(unit), dump(temp))
+            for i, (unit, temp) in zip(indices, points)
+        ]
+        if isinstance(self._transport, SimulatedTransport):
+            return
+        for start, length in slave.scheduler.chunks(0, len(messages), self.chunk_size):
+            self._protocol.write(
+                self._transport, ';'.join(messages[start:start + length]))
@@ -44,13 +44,14 @@ from __future__ import (absolute_import, division,
 from future.builtins import *
 import collections
 
-from slave.driver import Command, Driver
+from slave.driver import Command, Driver, Lazy, LazySequence
 from slave.iec60488 import IEC60488
+from slave.lakeshore.curve import CurveTransfer
 from slave.types import Boolean, Enum, Float, Integer, Register, Set, String
 import slave.misc
 
 
-class Curve(Driver):
+class Curve(CurveTransfer, Driver):
     """Represents a LS340 curve.
 
     :param transport: A transport object.
@@ -111,6 +112,14 @@ class Curve(Driver):
         # This will copy all points in the sequence, but points exceeding the
         # buffer length are stripped.
 
+    Slices are transfered with compound messages. To read or write the
+    complete curve as numpy array or to load a `.340` curve file, use the
+    :meth:`~.CurveTransfer.read`, :meth:`~.CurveTransfer.write` and
+    :meth:`~.CurveTransfer.load` methods, e.g.::
+
+        curve.load('X12345.340')
+        points = curve.read()
+
     .. warning ::
 
         In contrast to the LS340 device, point indices start at 0 **not** 1.
@@ -138,7 +147,7 @@ class Curve(Driver):
     def __getitem__(self, item):
         if isinstance(item, slice):
             indices = item.indices(len(self))
-            return [self[i] for i in range(*indices)]
+            return self._read_points(range(*indices)).tolist()
         # Simple index
         item = slave.misc.index(item, len(self))
         response_t = [Float, Float]
@@ -150,9 +159,8 @@ class Curve(Driver):
         if not self._writeable:
             raise AttributeError('Curve is not writeable.')
         if isinstance(item, slice):
-            indices = item.indices(min(len(self), len(value)))
-            for i in range(*indices):
-                self[i] = value[i]
+            indices = range(*item.indices(min(len(self), len(value))))
+            self._write_points(indices, [value[i] for i in indices])
         else:
             item = slave.misc.index(item, len(self))
             unit, temp = value
@@ -205,16 +213,18 @@ class Heater(Driver):
 class Input(Driver, collections.Mapping):
     def __init__(self, transport, protocol, channels):
         super(Input, self).__init__(transport, protocol)
-        self._channels = dict(
-            (ch, InputChannel(transport, self._protocol, ch)) for ch in channels
-        )
+        # The channels are constructed on first access.
+        self._channels = collections.OrderedDict((ch, None) for ch in channels)
 
     def __getitem__(self, channel):
-        return self._channels[channel]
+        item = self._channels[channel]
+        if item is None:
+            item = InputChannel(self._transport, self._protocol, channel)
+            self._channels[channel] = item
+        return item
 
     def __iter__(self):
-        # TODO check if correct
-        return self._channels.keys()
+        return iter(self._channels)
 
     def __len__(self):
         return len(self._channels)
@@ -556,6 +566,16 @@ class Loop(Driver):
         *(<top>, <p>, <i>, <d>, <mout>, <range>)*.
 
     """
+    # The zone table types, shared by all zones.
+    ZONE_TYPE = (
+        Float(min=0),  # top value
+        Float(min=0),  # P value
+        Float(min=0),  # I value
+        Float(min=0),  # D value
+        Float(min=0),  # manual output
+        Integer(min=0, max=5),  # heater range
+    )
+
     def __init__(self, transport, protocol, idx):
         super(Loop, self).__init__(transport, protocol)
         self.idx = idx = int(idx)
@@ -589,17 +609,8 @@ class Loop(Driver):
         self.setpoint = Command('SETP? {0}'.format(idx),
                                 'SETP {0},'.format(idx), Float)
         for z in range(1, 11):
-            type_ = [
-                Float(min=0),  # top value
-                Float(min=0),  # P value
-                Float(min=0),  # I value
-                Float(min=0),  # D value
-                Float(min=0),  # manual output
-                Integer(min=0, max=5),  # heater range
-            ]
-            cmd = Command('ZONE? {0}, {1},'.format(idx, z),
-                          'ZONE {0}, {1},'.format(idx, z),
-                          type_)
+            cmd = Lazy(Command, 'ZONE? {0}, {1},'.format(idx, z),
+                       'ZONE {0}, {1},'.format(idx, z), self.ZONE_TYPE)
             setattr(self, 'zone{0}'.format(z), cmd)
         if idx == 1:
             self.tuning_status = Command(('TUNEST?', Boolean))
@@ -767,17 +778,19 @@ class LS340(IEC60488):
         'The control channel setpoint is not in temperature',
     ]
 
+    _compound = True
+
     def __init__(self, transport, scanner=None):
         # Use default protocol.
         super(LS340, self).__init__(transport)
         self.scanner = scanner
-        self.output1 = Output(transport, self._protocol, 1)
-        self.output2 = Output(transport, self._protocol, 2)
+        self.output1 = Lazy(Output, transport, self._protocol, 1)
+        self.output2 = Lazy(Output, transport, self._protocol, 2)
         # Control Commands
         # ================
-        self.loop1 = Loop(transport, self._protocol, 1)
-        self.loop2 = Loop(transport, self._protocol, 2)
-        self.heater = Heater(transport, self._protocol)
+        self.loop1 = Lazy(Loop, transport, self._protocol, 1)
+        self.loop2 = Lazy(Loop, transport, self._protocol, 2)
+        self.heater = Lazy(Heater, transport, self._protocol)
         # System Commands
         # ===============
         self.beeper = Command('BEEP?', 'BEEP', Boolean)
@@ -848,11 +861,13 @@ class LS340(IEC60488):
         self.scanner_parameters = Command('XSCAN?', 'XSCAN', xscan)
         # Curve Commands
         # ==============
-        self.std_curve = tuple(
-            Curve(transport, self._protocol, i, writeable=False) for i in range(1, 21)
+        self.std_curve = LazySequence(
+            lambda i: Curve(transport, self._protocol, i, writeable=False),
+            range(1, 21)
         )
-        self.user_curve = tuple(
-            Curve(transport, self._protocol, i, writeable=True) for i in range(21, 61)
+        self.user_curve = LazySequence(
+            lambda i: Curve(transport, self._protocol, i, writeable=True),
+            range(21, 61)
         )
         # Data Logging Commands
         # =====================
@@ -873,11 +888,11 @@ class LS340(IEC60488):
                                       ('LOGSET', logset_write_t))
         self.program_status = Command(('PGMRUN?',
                                        [Integer, Enum(*self.PROGRAM_STATUS)]))
-        self.programs = tuple(
-            Program(transport, self._protocol, i) for i in range(1, 11)
+        self.programs = LazySequence(
+            lambda i: Program(transport, self._protocol, i), range(1, 11)
         )
-        self.column = tuple(
-            Column(self._transport, self._protocol, i) for i in range(1, 5)
+        self.column = LazySequence(
+            lambda i: Column(self._transport, self._protocol, i), range(1, 5)
         )
 
     def clear_alarm(self):
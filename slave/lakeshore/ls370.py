@@ -6,13 +6,14 @@ from __future__ import (absolute_import, division,
 from future.builtins import *
 import collections
 
-from slave.driver import Command, Driver, CommandSequence
+from slave.driver import Command, Driver, CommandSequence, Lazy, LazySequence
 from slave.iec60488 import IEC60488
+from slave.lakeshore.curve import CurveTransfer
 from slave.types import Boolean, Enum, Float, Integer, Register, Set, String
 import slave.misc
 
 
-class Curve(Driver):
+class Curve(CurveTransfer, Driver):
     """A LS370 curve.
 
     :param transport: A transport object.
@@ -56,6 +57,14 @@ class Curve(Driver):
         Be aware that the builtin :func:`len()` function returns the buffer
         length, **not** the number of points.
 
+    Slices are transfered with compound messages. To read or write the
+    complete curve as numpy array or to load a `.340` curve file, use the
+    :meth:`~.CurveTransfer.read`, :meth:`~.CurveTransfer.write` and
+    :meth:`~.CurveTransfer.load` methods, e.g.::
+
+        curve.load('X12345.340')
+        points = curve.read()
+
     .. warning ::
 
         In contrast to the LS370 device, point indices start at 0 **not** 1.
@@ -86,7 +95,7 @@ class Curve(Driver):
     def __getitem__(self, item):
         if isinstance(item, slice):
             indices = item.indices(len(self))
-            return [self[i] for i in range(*indices)]
+            return self._read_points(range(*indices)).tolist()
         # Simple index
         item = slave.misc.index(item, len(self))
         # construct command
@@ -97,9 +106,8 @@ class Curve(Driver):
 
     def __setitem__(self, item, value):
         if isinstance(item, slice):
-            indices = item.indices(min(len(self), len(value)))
-            for i in range(*indices):
-                self[i] = value[i]
+            indices = range(*item.indices(min(len(self), len(value))))
+            self._write_points(indices, [value[i] for i in indices])
         else:
             item = slave.misc.index(item, len(self))
             unit, temp = value
@@ -210,8 +218,9 @@ class Input(Driver, collections.Sequence):
     def __init__(self, transport, protocol, channels):
         super(Input, self).__init__(transport, protocol)
         # The ls370 channels start at 1
-        self._channels = tuple(
-            InputChannel(transport, protocol, idx) for idx in range(1, channels + 1)
+        self._channels = LazySequence(
+            lambda idx: InputChannel(transport, protocol, idx),
+            range(1, channels + 1)
         )
         self.scan = Command(
             'SCAN?',
@@ -574,6 +583,8 @@ class LS370(IEC60488):
           From -100 to 100.
 
     """
+    _compound = True
+
     def __init__(self, transport, scanner=None):
         super(LS370, self).__init__(transport)
         self.baud = Command('BAUD?', 'BAUD', Enum(300, 1200, 9600))
@@ -605,8 +616,8 @@ class LS370(IEC60488):
                 4: 'DO5'
             }),
         )
-        self.displays = tuple(
-            Display(transport, self._protocol, i) for i in range(1, 9)
+        self.displays = LazySequence(
+            lambda i: Display(transport, self._protocol, i), range(1, 9)
         )
         self.display_locations = Command(
             'DISPLAY?',
@@ -633,9 +644,8 @@ class LS370(IEC60488):
             Enum('off', 'cs neg', 'cs pos', 'vad',
                  'vcm neg', 'vcm pos', 'vdif', 'vmix')
         )
-        self.output = (
-            Output(transport, self._protocol, 1),
-            Output(transport, self._protocol, 2)
+        self.output = LazySequence(
+            lambda i: Output(transport, self._protocol, i), (1, 2)
         )
         self.pid = Command(
             'PID?',
@@ -650,24 +660,25 @@ class LS370(IEC60488):
             [Boolean, Float(min=1e-3, max=10.)]
         )
         self.ramping = Command(('RAMPST?', Boolean))
-        self.low_relay = Relay(transport, self._protocol, 1)
-        self.high_relay = Relay(transport, self._protocol, 2)
+        self.low_relay = Lazy(Relay, transport, self._protocol, 1)
+        self.high_relay = Lazy(Relay, transport, self._protocol, 2)
         self.scanner = scanner
         self.setpoint = Command('SETP?', 'SETP', Float)
         self.still = Command('STILL?', 'STILL', Float)
-        self.all_curves = Curve(transport, self._protocol, 0, 200)
-        self.user_curve = tuple(
-            Curve(transport, self._protocol, i, 200) for i in range(1, 21)
+        self.all_curves = Lazy(Curve, transport, self._protocol, 0, 200)
+        self.user_curve = LazySequence(
+            lambda i: Curve(transport, self._protocol, i, 200), range(1, 21)
         )
+        # The zone types are shared by all zones.
+        type_ = [
+            Float, Float(min=0.001, max=1000.), Integer(min=0, max=10000),
+            Integer(min=0, max=10000), Integer(min=0, max=100),
+            Enum(*Heater.RANGE), Boolean, Boolean,
+            Integer(min=-100, max=100),Integer(min=-100, max=100)
+        ]
 
         def make_zone(i):
             """Helper function to create a zone command."""
-            type_ = [
-                Float, Float(min=0.001, max=1000.), Integer(min=0, max=10000),
-                Integer(min=0, max=10000), Integer(min=0, max=100),
-                Enum(*Heater.RANGE), Boolean, Boolean,
-                Integer(min=-100, max=100),Integer(min=-100, max=100)
-            ]
             return Command('ZONE? {0}'.format(i), 'ZONE {0},'.format(i), type_)
         self.zones = CommandSequence(
             self._transport,
@@ -0,0 +1,194 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+"""The :mod:`slave.lakeshore.scanner` module implements an acquisition
+scheduler for the LS370 with a scanner option.
+
+The LS370 measures a single channel at a time. After switching the channel,
+the reading is invalid until the settle time has elapsed. The
+:class:`ScanScheduler` cycles through the channels of a plan, visiting
+channels with a higher priority more often, and never blocks while a channel
+settles. E.g.::
+
+    from slave.lakeshore import LS370
+    from slave.lakeshore.scanner import ScanScheduler
+
+    ls370 = LS370(transport, scanner='3716')
+    # channel: (dwell, priority), the mixing chamber thermometer is read
+    # three times as often as the others.
+    plan = {0: (1., 3), 1: (1., 1), 2: (1., 1)}
+    scheduler = ScanScheduler(ls370, plan)
+
+    while True:
+        # Other instruments are read while the bridge settles.
+        record = scheduler.poll()
+        if record is None:
+            print(ppms.field)
+
+    print(scheduler.rate)
+    print(scheduler.buffer.read())
+
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+import collections
+import time
+
+from slave.misc import RingBuffer
+from slave.transport import SimulatedTransport
+
+
+class ScanScheduler(object):
+    """Schedules the readings of the LS370 scanner channels.
+
+    :param ls370: An instance of :class:`~slave.lakeshore.ls370.LS370`.
+    :param plan: A dictionary mapping the zero based channel index to a tuple
+        *(<dwell>, <priority>)* or *(<dwell>, <priority>, <settle>)*, where
+
+        * *<dwell>* is the time in seconds the reading is taken after the
+          channel settled.
+        * *<priority>* is a positive integer. A channel is read
+          proportionally often to its priority.
+        * *<settle>* is the settle time in seconds after switching to the
+          channel. If it is missing or `None`, the pause time of the channel
+          configuration is used.
+
+    :param size: The size of the record ring buffer.
+    :param timer: A callable returning the current time in seconds.
+
+    :ivar buffer: A :class:`~slave.misc.RingBuffer` of records with the fields
+        `'channel'`, `'timestamp'`, `'kelvin'`, `'resistance'` and `'status'`,
+        where *<status>* is the raw reading status register value.
+    :ivar samples: A dictionary mapping the channel to the number of readings.
+
+    """
+    DTYPE = [
+        ('channel', 'i4'),
+        ('timestamp', 'f8'),
+        ('kelvin', 'f8'),
+        ('resistance', 'f8'),
+        ('status', 'i4'),
+    ]
+
+    def __init__(self, ls370, plan, size=4096, timer=time.time):
+        if not plan:
+            raise ValueError('Empty scan plan.')
+        self._ls370 = ls370
+        self._timer = timer
+        self._dwell, self._priority, self._settle = {}, {}, {}
+        for channel, entry in plan.items():
+            dwell, priority = entry[:2]
+            settle = entry[2] if len(entry) > 2 else None
+            if int(priority) < 1:
+                raise ValueError('Priority must be a positive integer.')
+            if settle is None:
+                # config is (<enabled>, <dwell>, <pause>, <curve>, <coefficient>)
+                settle = ls370.input[channel].config[2]
+            self._dwell[channel] = float(dwell)
+            self._priority[channel] = int(priority)
+            self._settle[channel] = float(settle)
+        self._credit = dict.fromkeys(plan, 0)
+        self.buffer = RingBuffer(size, self.DTYPE)
+        self.samples = collections.Counter()
+        self._channel = None
+        self._deadline = None
+        self._start = None
+
+    @property
+    def rate(self):
+        """A dictionary mapping each channel to the achieved sample rate in
+        readings per second.
+        """
+        elapsed = self._timer() - self._start if self._start is not None else 0.
+        return dict(
+            (channel, self.samples[channel] / elapsed if elapsed > 0 else 0.)
+            for channel in self._priority
+        )
+
+    @property
+    def remaining(self):
+        """The time in seconds until the next reading is due."""
+        if self._deadline is None:
+            return 0.
+        return max(0., self._deadline - self._timer())
+
+    def poll(self):
+        """Takes the next reading if it is due, without waiting.
+
+        :returns: The new record or `None`, if the current channel is still
+            settling.
+
+        """
+        now = self._timer()
+        if self._start is None:
+            self._start = now
+        if self._channel is None:
+            self._switch(self._next(), now)
+            return None
+        if now < self._deadline:
+            return None
+        channel = self._channel
+        record = (channel, now) + self._read(channel)
+        self.buffer.append(record)
+        self.samples[channel] += 1
+        self._switch(self._next(), self._timer())
+        return record
+
+    def run(self, count=None, duration=None, idle=None):
+        """Takes readings until `count` readings were taken or `duration`
+        seconds elapsed.
+
+        :param count: The number of readings.
+        :param duration: The maximum duration in seconds.
+        :param idle: An optional callable, which is called repeatedly while a
+            channel settles, e.g. to read other instruments. If it is `None`,
+            the scheduler sleeps instead.
+        :returns: The number of readings taken.
+
+        """
+        if count is None and duration is None:
+            raise ValueError('Either count or duration is required.')
+        stop = self._timer() + duration if duration is not None else None
+        taken = 0
+        while count is None or taken < count:
+            if stop is not None and self._timer() >= stop:
+                break
+            if self.poll() is not None:
+                taken += 1
+            elif idle:
+                idle()
+            else:
+                time.sleep(self.remaining)
+        return taken
+
+    def _next(self):
+        """Selects the next channel with a smooth weighted round robin."""
+        total = 0
+        for channel, priority in self._priority.items():
+            self._credit[channel] += priority
+            total += priority
+        channel = max(self._credit, key=lambda c: (self._credit[c], -c))
+        self._credit[channel] -= total
+        return channel
+
+    def _switch(self, channel, now):
+        if channel == self._channel:
+            # No need to settle, the channel is still active.
+            self._deadline = now + self._dwell[channel]
+            return
+        self._ls370.input.scan = channel + 1, False
+        self._channel = channel
+        self._deadline = now + self._settle[channel] + self._dwell[channel]
+
+    def _read(self, channel):
+        """Reads kelvin, resistance and status with a single compound query."""
+        input = self._ls370.input[channel]
+        if isinstance(self._ls370._transport, SimulatedTransport):
+            return input.kelvin, input.resistance, int(input.reading_status)
+        idx = channel + 1
+        response = self._ls370._protocol.query(
+            self._ls370._transport,
+            'RDGK? {0};RDGR? {0};RDGST? {0}'.format(idx))
+        kelvin, resistance, status = ','.join(response).split(';')
+        return float(kelvin), float(resistance), int(status)
@@ -13,6 +13,9 @@ import logging
 import os.path
 import io
 import functools
+import bisect
+
+import numpy as np
 
 
 SI_PREFIX = {
@@ -119,42 +122,174 @@ def range_to_numeric(ranges):
 class AutoRange(object):
     """Estimates an appropriate sensitivity range.
 
-    A mean value is calculated from the magnitude of the value and previous
+    A running mean is calculated from the magnitude of the value and previous
     ones(the number depends on the `buffer_len`). The best range is chosen
-    as the largest range, where the mean is smaller than `scale * range`. If
+    as the smallest range, where the mean is smaller than `scale * range`. If
     the mean is larger than any range, the largest range is returned.
 
+    The last estimate is remembered. To avoid switching back and forth near a
+    range boundary, the thresholds can be tuned with `up` and `down`. A larger
+    range is selected if the mean exceeds `up * scale * range` of the current
+    one, a smaller range only if the mean falls below `down * scale * range`
+    of the smaller one, e.g. `up=1., down=0.8` gives a hysteresis of 20%.
+
     :param range: A sequence of sensitivity ranges.
     :param names: An optional sequence of names corresponding to the ranges. If
         given, :meth:`AutoRange.range` returns the name instead of the range.
     :param scale: An optional parameter scaling the ranges.
     :param buffer_len: Defines the buffer length used to calculate the mean
         value in :meth:`~.AutoRange.range`.
+    :param up: The upper threshold factor.
+    :param down: The lower threshold factor.
 
     """
-    def __init__(self, ranges, names=None, scale=1., buffer_len=10):
+    def __init__(self, ranges, names=None, scale=1., buffer_len=10, up=1., down=1.):
         if names:
             if len(ranges) != len(names):
                 raise ValueError('Unequal length of names and ranges.')
-            self._mapping = {r:k for r, k in zip(ranges, names)}
+            pairs = sorted(zip(ranges, names), key=lambda x: x[0])
+            self.ranges = [r for r, _ in pairs]
+            self._names = [k for _, k in pairs]
         else:
-            self._mapping = None
-        self.ranges = sorted(ranges)
+            self.ranges = sorted(ranges)
+            self._names = None
+        if down > up:
+            raise ValueError('down must not exceed up.')
         self.scale = scale
+        self._up = [up * scale * r for r in self.ranges]
+        self._down = [down * scale * r for r in self.ranges]
         self._buffer = collections.deque(maxlen=buffer_len)
-
-    def range(self, value):
-        """Estimates an appropriate sensitivity range."""
-        self._buffer.append(abs(value))
-        mean = sum(self._buffer) / len(self._buffer)
-        estimate = next(
-            (r for r in self.ranges if mean < self.scale * r),
-            self.ranges[-1]
-        )
-        if self._mapping:
-            return self._mapping[estimate]
+        self._sum = 0.
+        self._index = None
+
+    @property
+    def mean(self):
+        """The running mean of the magnitudes."""
+        return self._sum / len(self._buffer) if self._buffer else 0.
+
+    @property
+    def current(self):
+        """The last estimated range or `None`.
+
+        It can be set to the range in use, e.g. the sensitivity read from the
+        device.
+        """
+        if self._index is None:
+            return None
+        return self._names[self._index] if self._names else self.ranges[self._index]
+
+    @current.setter
+    def current(self, value):
+        if value is None:
+            self._index = None
         else:
-            return estimate
+            self._index = (self._names or self.ranges).index(value)
+
+    def reset(self):
+        """Clears the buffered values."""
+        self._buffer.clear()
+        self._sum = 0.
+
+    def range(self, value, overload=False):
+        """Estimates an appropriate sensitivity range.
+
+        :param value: The new value.
+        :param overload: If `True`, the value is clipped. The buffered values
+            are discarded and the next larger range is selected.
+
+        """
+        last = len(self.ranges) - 1
+        if overload:
+            self.reset()
+            self._index = last if self._index is None else min(self._index + 1, last)
+            return self.current
+
+        if len(self._buffer) == self._buffer.maxlen:
+            self._sum -= self._buffer[0]
+        value = abs(value)
+        self._buffer.append(value)
+        self._sum += value
+        mean = self.mean
+
+        # The first range with mean < threshold.
+        index = min(bisect.bisect_right(self._up, mean), last)
+        if self._index is not None and index <= self._index:
+            index = min(bisect.bisect_right(self._down, mean), last)
+            index = min(index, self._index)
+        self._index = index
+        return self.current
+
+
+class RingBuffer(object):
+    """A fixed size buffer of numpy records, overwriting the oldest ones.
+
+    E.g.::
+
+        >>> buffer = RingBuffer(2, [('x', float)])
+        >>> for x in range(3):
+        ...     buffer.append((x,))
+        ...
+        >>> buffer.read()['x']
+        array([1., 2.])
+        >>> buffer.dropped
+        1
+
+    :param size: The maximum number of records.
+    :param dtype: The numpy dtype of a record.
+
+    :ivar int written: The number of records appended in total.
+
+    """
+    def __init__(self, size, dtype):
+        if size < 1:
+            raise ValueError('size < 1')
+        self._data = np.zeros(int(size), dtype=dtype)
+        self._lock = threading.Lock()
+        self.written = 0
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    @property
+    def size(self):
+        return len(self._data)
+
+    @property
+    def dropped(self):
+        """The number of overwritten records.
+
+        :meth:`read` does not consume records, every record pushed out of the
+        buffer is counted, whether it was read before or not.
+
+        """
+        return max(0, self.written - self.size)
+
+    def __len__(self):
+        return min(self.written, self.size)
+
+    def append(self, record):
+        """Appends a single record."""
+        with self._lock:
+            self._data[self.written % self.size] = record
+            self.written += 1
+
+    def read(self, count=None):
+        """Returns a copy of the latest records in chronological order.
+
+        :param count: The maximum number of records. If `None`, all records
+            are returned.
+
+        """
+        with self._lock:
+            length = len(self)
+            count = length if count is None else min(count, length)
+            indices = np.arange(self.written - count, self.written) % self.size
+            return self._data[indices]
+
+    def clear(self):
+        with self._lock:
+            self.written = 0
 
 
 class Measurement(object):
@@ -216,6 +351,51 @@ class Measurement(object):
         self.close()
 
 
+def _xy_reader(lockin):
+    """Returns a callable reading the x and y value of a lockin, with a
+    single query if supported.
+    """
+    if callable(getattr(lockin, 'snap', None)):
+        return lambda: tuple(lockin.snap('x', 'y'))
+    if 'xy' in vars(lockin):
+        return lambda: tuple(lockin.xy)
+    return lambda: (lockin.x, lockin.y)
+
+
+class _OverloadMonitor(object):
+    """Records the overload byte received by a signal recovery protocol."""
+    #: The overload bits of the x and y outputs.
+    MASK = 0x0f
+
+    def __init__(self, protocol):
+        self._protocol = protocol
+        self._previous = protocol.olb_callback
+        self._overload = False
+        protocol.olb_callback = self
+
+    @classmethod
+    def install(cls, lockin):
+        """Installs a monitor, if the protocol of the lockin supports it."""
+        protocol = getattr(lockin, '_protocol', None)
+        if hasattr(protocol, 'olb_callback'):
+            return cls(protocol)
+        return None
+
+    def uninstall(self):
+        self._protocol.olb_callback = self._previous
+
+    def pop(self):
+        """Returns `True` if an overload occured since the last call."""
+        overload, self._overload = self._overload, False
+        return overload
+
+    def __call__(self, overload_byte):
+        if overload_byte & self.MASK:
+            self._overload = True
+        if self._previous:
+            self._previous(overload_byte)
+
+
 class LockInMeasurement(Measurement):
     """A measurement helper optimized for lock-in amplifier measurements.
 
@@ -241,32 +421,58 @@ class LockInMeasurement(Measurement):
     :param lockins: A sequence of lockin drivers. A lockin driver must have a
         readable `x` and `y` attribute to get the data. Additionally a readable
         `SENSITIVITY` attribute and a read and writeable `sensitivity`
-        attribute are mandatory.
+        attribute are mandatory. If a lockin supports reading both values at
+        once, with a `snap()` method (e.g. SR830, SR850) or a `xy` command
+        (e.g. SR7230), this is used instead.
     :param measurables: An optional sequence of functions.
     :param names: A sequence of names used to generate the csv file header.
     :param bool autorange: Enables/disables auto ranging.
+    :param hysteresis: The relative hysteresis of the auto ranging, see the
+        `down` parameter of :class:`.AutoRange`.
+
+    The sensitivity is read once and cached afterwards, it is only written if
+    the estimated range changes. If the lockin uses the
+    :class:`~slave.protocol.SignalRecovery` protocol, the overload byte
+    received with each response is monitored and an overload selects the next
+    larger sensitivity immediately.
 
     """
-    def __init__(self, path, lockins, measurables=None, names=None, autorange=True):
+    def __init__(self, path, lockins, measurables=None, names=None,
+                 autorange=True, hysteresis=0.2):
         super(LockInMeasurement, self).__init__(path, measurables or [], names=names)
         self._lockins = lockins
+        self._readers = [_xy_reader(lia) for lia in lockins]
         self._autorange = []
+        self._monitors = []
         if autorange:
             for lia in lockins:
                 ranges, names = lia.SENSITIVITY, None
                 # Check if sensitivity ranges are already numeric or strings.
                 if isinstance(ranges[0], str):
                     ranges, names = range_to_numeric(ranges), ranges
-                self._autorange.append(AutoRange(ranges, names))
+                auto = AutoRange(ranges, names, down=1. - hysteresis)
+                auto.current = lia.sensitivity
+                self._autorange.append(auto)
+                self._monitors.append(_OverloadMonitor.install(lia))
+
+    def close(self):
+        for monitor in self._monitors:
+            if monitor:
+                monitor.uninstall()
+        self._monitors = []
+        super(LockInMeasurement, self).close()
 
     def __call__(self):
-        lockin_xy = [(lia.x, lia.y) for lia in self._lockins]
+        lockin_xy = [read() for read in self._readers]
         optional_data = [m() for m in self._measurables]
         # If autoranging is enabled,
         if self._autorange:
-            for lia, auto, (x, y) in zip(self._lockins, self._autorange, lockin_xy):
-                sens = auto.range(max(abs(x), abs(y)))
-                if lia.sensitivity != sens:
+            for lia, auto, monitor, (x, y) in zip(
+                    self._lockins, self._autorange, self._monitors, lockin_xy):
+                cached = auto.current
+                overload = monitor.pop() if monitor else False
+                sens = auto.range(max(abs(x), abs(y)), overload=overload)
+                if sens != cached:
                     lia.sensitivity = sens
 
         # Flatten lockin data and concatenate with optional data.
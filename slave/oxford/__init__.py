@@ -6,4 +6,5 @@ from __future__ import (absolute_import, division,
 from future.builtins import *
 
 from slave.oxford.ips120 import IPS120
-from slave.oxford.itc503 import ITC503
\ No newline at end of file
+from slave.oxford.isobus import IsobusBus
+from slave.oxford.itc503 import ITC503
@@ -9,6 +9,8 @@ import time
 from slave.driver import Driver, Command
 from slave.types import String, Float, Enum
 from slave.protocol import OxfordIsobus
+from slave.oxford.isobus import StatusCache
+import slave.ramp
 
 
 class IPS120(Driver):
@@ -54,7 +56,10 @@ class IPS120(Driver):
         .. note:: When using the serial interface, two stopbits must be used.
         
     :param address: The Oxford isobus address.
-    
+    :param max_age: The time in seconds the status is reused by the derived
+        properties, e.g. :attr:`.access_mode` and :attr:`.activity`. Writes
+        changing the status invalidate it.
+
     :ivar access_mode: The access control mode. Valid modes are
         'local locked', 'remote locked', 'local unlocked'
         and 'remote unlocked'.
@@ -65,6 +70,7 @@ class IPS120(Driver):
 
     :ivar measured_current: The measured magnet current. (read-only)
     :ivar measured_voltage: The measured power supply voltage. (read-only)
+    :ivar status: The status dictionary. (read-only)
     :ivar version: The firmware version. (read-only)
     
     """    
@@ -113,9 +119,10 @@ class IPS120(Driver):
         u'3': 'sweeping & sweep limiting'
     }
     
-    def __init__(self, transport, address):
+    def __init__(self, transport, address, max_age=0.1):
         super(IPS120, self).__init__(transport, OxfordIsobus(address=address))
-        
+        self._status = StatusCache(self._query_status, max_age)
+
         self.current = Current(self._transport, self._protocol)
         self.field = Field(self._transport, self._protocol)
         
@@ -136,6 +143,7 @@ class IPS120(Driver):
     def access_mode(self, mode):
         cmd = 'C', Enum(*self.ACCESS_MODE[:4])
         self._write(cmd, mode)
+        self._status.invalidate()
 
     @property
     def activity(self):
@@ -145,9 +153,31 @@ class IPS120(Driver):
     def activity(self, value):
         cmd = 'A', Enum(*self.ACTIVITY)
         self._write(cmd, value)
-        
+        self._status.invalidate()
+
     @property
     def status(self):
+        return dict(self._status.get())
+
+    def refresh(self):
+        """Queries and returns a new status, ignoring the cached one."""
+        return dict(self._status.refresh())
+
+    def poll(self):
+        """Reads the status, the field and the magnet current with the minimal
+        number of isobus transactions.
+
+        :returns: A dictionary with the keys `'status'`, `'field'` and
+            `'current'`. The status is cached as well.
+
+        """
+        return {
+            'status': self.refresh(),
+            'field': self.field.value,
+            'current': self.measured_current,
+        }
+
+    def _query_status(self):
         response = self._protocol.query(self._transport, 'X')[0]
         return {
             'status': self.STATUS[response[0]],
@@ -159,6 +189,36 @@ class IPS120(Driver):
             'mode': self.MODE[response[10]]
         }
         
+    def ramp_field(self, target, rate, poller=None):
+        """Starts a field ramp without blocking.
+
+        :param target: The target field in Tesla.
+        :param rate: The field rate in tesla per minute.
+        :param poller: The :class:`~slave.ramp.Poller` tracking the ramp. By
+            default, the shared poller is used.
+        :returns: A :class:`~slave.ramp.Ramp` instance. Cancelling it sets the
+            activity to 'hold'.
+
+        """
+        start = self.field.value
+        self.field.target = target
+        self.field.sweep_rate = rate
+        self.activity = 'to setpoint'
+
+        def cancel():
+            self.activity = 'hold'
+
+        # The status preceding the sweep reads 'at rest' as well. It is
+        # ignored until the sweep is reported or, e.g. if the field is at
+        # the target already, for 2s.
+        ramp = slave.ramp.Ramp(
+            (self, 'status'), self.refresh,
+            lambda status: status['mode'] == 'at rest', cancel,
+            duration=slave.ramp.duration(start, target, rate), holdoff=2.,
+            started=lambda status: status['mode'] != 'at rest'
+        )
+        return (poller or slave.ramp.default_poller()).add(ramp)
+
     def set_field(self, target, rate, wait_for_stability=True):
         """Sets the field to the specified value.
         
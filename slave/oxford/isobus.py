@@ -0,0 +1,256 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+"""Shared serial line support for Oxford Instruments ISOBUS devices.
+
+Several Oxford devices can be daisy chained on a single RS-232 line and are
+selected with the `@<address>` control sequence. The :class:`IsobusBus` owns
+the transport of such a line and is handed to the device drivers instead of
+the raw transport, e.g.::
+
+    from slave.oxford import IPS120, ITC503, IsobusBus
+    from slave.transport import Serial
+
+    bus = IsobusBus(Serial(0, timeout=1, stopbits=2))
+    itc = ITC503(bus, address=1)
+    ips = IPS120(bus, address=2)
+
+    print(itc.temperature1, ips.field.value)
+    print(bus.statistics[1].latency, bus.statistics[2].error_rate)
+
+Each isobus transaction takes tens of milliseconds. The Oxford drivers
+therefore derive several properties from a single status query, which is
+cached for a short time by a :class:`StatusCache`.
+
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+import collections
+import logging
+import re
+import threading
+import time
+
+from slave.transport import Transport, TransportError
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+class _FifoLock(object):
+    """A lock granting access in the order it was requested.
+
+    A plain :class:`threading.Lock` does not guarantee any ordering, a driver
+    polling in a tight loop can therefore starve other drivers on the same
+    line. The fifo lock hands out tickets and serves them in order.
+
+    """
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._next_ticket = 0
+        self._serving = 0
+
+    @property
+    def waiting(self):
+        """The number of requests waiting for the lock."""
+        with self._condition:
+            return self._next_ticket - self._serving - 1
+
+    def acquire(self):
+        with self._condition:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            while ticket != self._serving:
+                self._condition.wait()
+
+    def release(self):
+        with self._condition:
+            self._serving += 1
+            self._condition.notify_all()
+
+
+class IsobusStatistics(object):
+    """Accumulates the transaction statistics of a single isobus address.
+
+    :ivar int requests: The number of transactions.
+    :ivar int errors: The number of failed transactions. A transaction fails if
+        the transport raises an error or the device answers with a `'?'`.
+    :ivar float total_latency: The accumulated transaction time in seconds.
+    :ivar float max_latency: The longest transaction time in seconds.
+
+    """
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.total_latency = 0.
+        self.max_latency = 0.
+
+    @property
+    def latency(self):
+        """The mean transaction time in seconds."""
+        return self.total_latency / self.requests if self.requests else 0.
+
+    @property
+    def error_rate(self):
+        """The fraction of failed transactions."""
+        return self.errors / self.requests if self.requests else 0.
+
+    def add(self, latency, error=False):
+        self.requests += 1
+        self.errors += int(error)
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def __repr__(self):
+        return ('<IsobusStatistics(requests={0}, errors={1}, '
+                'latency={2:.4f})>').format(self.requests, self.errors,
+                                           self.latency)
+
+
+class IsobusBus(Transport):
+    """A transport shared by several addressed isobus devices.
+
+    The bus owns the transport of the serial line. Requests of all drivers
+    using the bus are serialised and served in the order they arrive. After a
+    failed transaction, the bus discards the buffered bytes and drains the
+    line until the transport times out, e.g. before a retry of the
+    :class:`~slave.protocol.OxfordIsobus` protocol. An answer arriving later
+    than one transport timeout after the failure can still be mistaken for
+    the next response.
+
+    :param transport: The transport object of the shared line, typically a
+        :class:`~slave.transport.Serial` instance.
+    :param pipeline: If `True`, messages not requesting an echo (prefixed
+        with `'$'`) are not sent immediately. They are queued and sent in a
+        single write together with the next message expecting a response, or
+        as soon as no other request is waiting for the bus.
+
+    :ivar statistics: A dictionary mapping the isobus address to an
+        :class:`IsobusStatistics` instance. Messages without an address use
+        `None` as key.
+
+    """
+    _ADDRESS = re.compile(br'^\$?@(\d+)')
+    # Upper limit of the bytes drained after a failed transaction, in case a
+    # faulty device keeps talking.
+    _MAX_DRAIN = 4096
+
+    def __init__(self, transport, pipeline=False):
+        super(IsobusBus, self).__init__(max_bytes=transport._max_bytes,
+                                        lock=_FifoLock())
+        self._transport = transport
+        self.pipeline = pipeline
+        self.statistics = collections.defaultdict(IsobusStatistics)
+        self._pending = bytearray()
+        self._address = None
+        self._start = None
+        self._error = False
+
+    def __write__(self, data):
+        data = bytes(data)
+        if self._start is None:
+            match = self._ADDRESS.match(data)
+            self._address = int(match.group(1)) if match else None
+            self._start = time.time()
+        if self.pipeline and data.startswith(b'$'):
+            self._pending += data
+        else:
+            self._transport.__write__(bytes(self._pending) + data)
+            self._pending = bytearray()
+
+    def __read__(self, num_bytes):
+        return self._transport.__read__(num_bytes)
+
+    def read_until(self, delimiter):
+        response = super(IsobusBus, self).read_until(delimiter)
+        if response.startswith(b'?'):
+            self._error = True
+        return response
+
+    def flush(self):
+        """Sends all queued messages."""
+        with self:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            self._transport.__write__(bytes(self._pending))
+            self._pending = bytearray()
+
+    def _drain(self):
+        stale = self._buffer
+        self._buffer = bytearray()
+        try:
+            while len(stale) < self._MAX_DRAIN:
+                stale += self._transport.__read__(self._max_bytes)
+        except TransportError:
+            pass
+        logger.debug('IsobusBus discarding %r', stale)
+
+    def __enter__(self):
+        super(IsobusBus, self).__enter__()
+        self._start = None
+        self._error = False
+
+    def __exit__(self, type, value, traceback):
+        try:
+            if type is not None:
+                # Drop partial or late responses to resynchronise the line.
+                self._drain()
+            if self._start is not None:
+                error = self._error or type is not None
+                self.statistics[self._address].add(time.time() - self._start,
+                                                   error)
+            if self._pending and not self.lock.waiting:
+                self._flush()
+        finally:
+            super(IsobusBus, self).__exit__(type, value, traceback)
+
+
+class StatusCache(object):
+    """A short-lived cache of a status query.
+
+    :param query: A callable returning the parsed status.
+    :param max_age: The time in seconds a status is reused. With `0` every
+        access issues a new query.
+    :param timer: A callable returning the current time in seconds.
+
+    """
+    def __init__(self, query, max_age=0.1, timer=time.time):
+        self.max_age = max_age
+        self._query = query
+        self._timer = timer
+        self._lock = threading.Lock()
+        self._value = None
+        self._timestamp = None
+
+    @property
+    def age(self):
+        """The age of the cached status in seconds or `None`."""
+        if self._timestamp is None:
+            return None
+        return self._timer() - self._timestamp
+
+    def get(self):
+        """Returns the cached status or queries a new one, if it is too old."""
+        with self._lock:
+            age = self.age
+            if age is None or age > self.max_age or self.max_age <= 0:
+                self._refresh()
+            return self._value
+
+    def refresh(self):
+        """Queries and returns a new status."""
+        with self._lock:
+            return self._refresh()
+
+    def invalidate(self):
+        """Drops the cached status, e.g. after a write changed it."""
+        with self._lock:
+            self._timestamp = None
+
+    def _refresh(self):
+        self._value = self._query()
+        self._timestamp = self._timer()
+        return self._value
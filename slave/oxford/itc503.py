@@ -8,10 +8,14 @@ from future.builtins import *
 from slave.driver import Command, Driver
 from slave.types import Boolean, Enum, Float, Integer, Register, String
 from slave.protocol import OxfordIsobus
+from slave.oxford.isobus import StatusCache
+import slave.ramp
 
 import re
 import time
 
+import numpy as np
+
 
 class ITC503(Driver):
     """An oxford instruments ITC503 temperature controller driver.
@@ -38,6 +42,9 @@ class ITC503(Driver):
 
     :param address: The isobus address. Use `None` if no isobus address is
         configured.
+    :param max_age: The time in seconds the status is reused by the derived
+        properties, e.g. :attr:`.access_mode` and :attr:`.control_sensor`.
+        Writes changing the status invalidate it.
 
     :ivar access_mode: Controls the front panel access mode. Valid are
         'local locked', 'remote locked', 'local unlocked' and 'remote unlocked'.
@@ -56,6 +63,7 @@ class ITC503(Driver):
     :ivar sweep_table: The itc sweep table, an instance of :class:`~.SweepTable`.
 
     :ivar float target_temperature: The target temperature.
+    :ivar status: The status dictionary. (read-only)
     :ivar float temperature1: The temperature of sensor 1. (read-only)
     :ivar float temperature2: The temperature of sensor 2. (read-only)
     :ivar float temperature3: The temperature of sensor 3. (read-only)
@@ -73,14 +81,17 @@ class ITC503(Driver):
         1: 'gas'
     }
 
-    def __init__(self, transport, address=None):
+    def __init__(self, transport, address=None, max_age=0.1):
         super(ITC503, self).__init__(transport, OxfordIsobus(address=address))
+        self._status = StatusCache(self._query_status, max_age)
 
         self.gas_flow = Command('R7', 'G', Float(min=0, max=99.9))
         self.heater = Command('R5', 'O', Float(min=0, max=99.9))
 
-        self.sweep_table = SweepTable(self._transport, self._protocol)
-        self.pid_table = PIDTable(self._transport, self._protocol)
+        # The tables share the x and y pointers of the device.
+        pointer = [None, None]
+        self.sweep_table = SweepTable(self._transport, self._protocol, pointer)
+        self.pid_table = PIDTable(self._transport, self._protocol, pointer)
 
         self.target_temperature = Command('R0', 'T', Float)
 
@@ -100,6 +111,7 @@ class ITC503(Driver):
     def access_mode(self, mode):
         cmd = 'C', Enum(*self.ACCESS_MODE)
         self._write(cmd, mode)
+        self._status.invalidate()
 
     @property
     def activity(self):
@@ -112,6 +124,7 @@ class ITC503(Driver):
     def activity(self, mode):
         cmd = 'S', Enum(*self.ACTIVITY)
         self._write(cmd, mode)
+        self._status.invalidate()
 
     @property
     def auto(self):
@@ -121,6 +134,7 @@ class ITC503(Driver):
     def auto(self, mode):
         cmd = 'A', Register(self.AUTO)
         self._write(cmd, mode)
+        self._status.invalidate()
 
     @property
     def auto_pid(self):
@@ -130,16 +144,11 @@ class ITC503(Driver):
     def auto_pid(self, value):
         cmd = 'L', Boolean
         self._write(cmd, value)
+        self._status.invalidate()
 
     @property
     def control_temperature(self):
-        control_sensor = self.status['control_sensor']
-        if control_sensor == 1:
-            return self.temperature1
-        if control_sensor == 2:
-            return self.temperature2
-        if control_sensor == 3:
-            return self.temperature3
+        return self._sensor_temperature(self.status['control_sensor'])
 
     @property
     def control_sensor(self):
@@ -149,9 +158,39 @@ class ITC503(Driver):
     def control_sensor(self, value):
         cmd = 'H', Integer(min=1, max=3)
         self._write(cmd, value)
+        self._status.invalidate()
 
     @property
     def status(self):
+        return dict(self._status.get())
+
+    def refresh(self):
+        """Queries and returns a new status, ignoring the cached one."""
+        return dict(self._status.refresh())
+
+    def poll(self):
+        """Reads the status and the control temperature with the minimal
+        number of isobus transactions.
+
+        :returns: A dictionary with the keys `'status'` and `'temperature'`.
+            The status is cached as well.
+
+        """
+        status = self.refresh()
+        return {
+            'status': status,
+            'temperature': self._sensor_temperature(status['control_sensor']),
+        }
+
+    def _sensor_temperature(self, sensor):
+        if sensor == 1:
+            return self.temperature1
+        if sensor == 2:
+            return self.temperature2
+        if sensor == 3:
+            return self.temperature3
+
+    def _query_status(self):
         response = self._protocol.query(self._transport, 'X')[0]
         x, auto, access_mode, activity, control_sensor, auto_pid = re.split('[XACSHL]', response)
         return {
@@ -162,6 +201,39 @@ class ITC503(Driver):
             'auto_pid': bool(int(auto_pid)),
         }
 
+    def ramp_temperature(self, temperature, rate, poller=None):
+        """Starts a temperature ramp without blocking.
+
+        The setpoint is stepped on every tick of the poller, like in
+        :meth:`.scan_temperature`.
+
+        :param temperature: The target temperature in kelvin.
+        :param rate: The sweep rate in kelvin per minute.
+        :param poller: The :class:`~slave.ramp.Poller` tracking the ramp. By
+            default, the shared poller is used.
+        :returns: A :class:`~slave.ramp.Ramp` instance. Cancelling it keeps the
+            last setpoint.
+
+        """
+        # set target temperature to current control temperature
+        self.target_temperature = start = self.control_temperature
+        rate = abs(rate) if temperature - start > 0 else -abs(rate)
+
+        def update(status):
+            # Update setpoint
+            setpoint = start + ramp.elapsed * rate / 60.
+            if abs(setpoint - start) >= abs(temperature - start):
+                self.target_temperature = temperature
+                return True
+            self.target_temperature = setpoint
+            return False
+
+        ramp = slave.ramp.Ramp(
+            None, None, update,
+            duration=slave.ramp.duration(start, temperature, rate)
+        )
+        return (poller or slave.ramp.default_poller()).add(ramp)
+
     def scan_temperature(self, measure, temperature, rate, delay=1):
         """Performs a temperature scan.
 
@@ -279,28 +351,116 @@ class Table(Driver):
     Inheriting classes need to implement a `_item` command used
     to read and write the table.
 
+    A table cell is accessed by setting the `x` and `y` pointers first. The
+    last pointer position is remembered and unchanged pointers are not
+    written again. All tables of a device share the same pointers and
+    therefore the remembered position. Whole tables are transfered in pointer order with
+    :meth:`.read` and :meth:`.write`, e.g.::
+
+        table = itc.pid_table.read()  # A numpy array of shape (32, 4)
+        table[0, 1] = 5.
+        itc.pid_table.write(table)  # Writes the changed cell only.
+
+    .. note::
+
+        If the pointers are moved by someone else, e.g. another program
+        accessing the same device, call :meth:`.invalidate`.
+
+    :param pointer: A list with the current `x` and `y` pointer position,
+        shared by all tables of a device. `None` marks an unknown position.
+
     """
-    def __init__(self, transport, protocol, shape):
+    def __init__(self, transport, protocol, shape, pointer=None):
         super(Table, self).__init__(transport, protocol)
         self._shape = shape
+        self._pointer = [None, None] if pointer is None else pointer
 
     @property
     def shape(self):
         return self._shape
 
+    def invalidate(self):
+        """Forgets the pointer position, both pointers are written again on
+        the next access.
+        """
+        self._pointer[:] = None, None
+
+    def read(self):
+        """Reads the complete table.
+
+        :returns: A numpy array with the shape of the table.
+
+        """
+        table = np.zeros(self.shape)
+        for x in range(self.shape[0]):
+            for y in range(self.shape[1]):
+                table[x, y] = self._get(x, y)
+        return table
+
+    def write(self, table, diff=True):
+        """Writes the complete table.
+
+        :param table: A two dimensional array. Missing rows are filled with
+            zeros.
+        :param diff: If `True`, the table is read first and only changed cells
+            are written.
+        :returns: The number of written cells.
+
+        """
+        new = np.zeros(self.shape)
+        table = np.asarray(table, dtype=float)
+        if table.ndim != 2 or table.shape[0] > self.shape[0] or table.shape[1] != self.shape[1]:
+            raise ValueError('Invalid table shape {0}.'.format(table.shape))
+        new[:len(table)] = table
+        if diff:
+            changed = new != self.read()
+        else:
+            changed = np.ones(self.shape, dtype=bool)
+        # np.argwhere returns the indices in row-major, that is pointer, order.
+        cells = np.argwhere(changed)
+        for x, y in cells:
+            self._set(x, y, new[x, y])
+        return len(cells)
+
+    def _point(self, x, y):
+        """Moves the pointers to the table entry, unless they are there."""
+        # The ITC uses one based indexing, therefore we increase x and y
+        # by one
+        x, y = int(x) % self.shape[0] + 1, int(y) % self.shape[1] + 1
+        current_x, current_y = self._pointer
+        # Reset the pointer first, the position is unknown if a write fails.
+        self.invalidate()
+        if x != current_x:
+            self._write(('x', Integer), x)
+        if y != current_y:
+            self._write(('y', Integer), y)
+        self._pointer[:] = x, y
+
+    def _get(self, x, y):
+        """Reads a single table entry."""
+        self._point(x, y)
+        try:
+            return self._item
+        except Exception:
+            self.invalidate()
+            raise
+
+    def _set(self, x, y, value):
+        """Writes a single table entry."""
+        self._point(x, y)
+        try:
+            self._item = value
+        except Exception:
+            self.invalidate()
+            raise
+
     def _read_item(self, x, y):
         # recursively build a list of items if x is a slice
         if isinstance(x, slice):
             return [self._read_item(xi, y) for xi in range(*x.indices(self.shape[0]))]
         if isinstance(y, slice):
             return [self._read_item(x, yi) for yi in range(*y.indices(self.shape[1]))]
-        # The ITC uses one based indexing, therefore we increase x and y
-        # by one
-        x, y = x % self.shape[0] + 1, y % self.shape[1] + 1
-        # Direct pointer to table entry.
-        self._write(('x', Integer), x)
-        self._write(('y', Integer), y)
-        return self._item
+        return self._get(x, y)
 
     def _write_item(self, x, y, value):
         # recursively walk through a list of items if x is a slice
@@ -321,13 +481,7 @@ class Table(Driver):
                 for yi in y_values:
                     self._write_item(x, yi, value)
         else:
-            # The ITC uses one based indexing, therefore we increase x and y
-            # by one
-            x, y = x % self.shape[0] + 1, y % self.shape[1] + 1
-            # Direct pointer to table entry.
-            self._write(('x', Integer), x)
-            self._write(('y', Integer), y)
-            self._item = value
+            self._set(x, y, value)
 
     def __len__(self):
         return self.shape[0]
@@ -370,8 +524,9 @@ class SweepTable(Table):
         row = itc.sweep_table[::2]
 
     """
-    def __init__(self, transport, protocol):
-        super(SweepTable, self).__init__(transport, protocol, shape=(16, 3))
+    def __init__(self, transport, protocol, pointer=None):
+        super(SweepTable, self).__init__(transport, protocol, shape=(16, 3),
+                                         pointer=pointer)
         self._item = Command('r', 's', Float)
 
     def clear(self):
@@ -380,7 +535,7 @@ class SweepTable(Table):
             self._write('w')
         except OxfordIsobus.InvalidRequestError:
             # Wipe command was not recognized. Try manual wiping
-            self[:] = 0
+            self.write(np.zeros(self.shape))
             
             
 class PIDTable(Table):
@@ -403,8 +558,9 @@ class PIDTable(Table):
         row = itc.pid_table[::2]
 
     """
-    def __init__(self, transport, protocol):
-        super(PIDTable, self).__init__(transport, protocol, shape=(32, 4))
+    def __init__(self, transport, protocol, pointer=None):
+        super(PIDTable, self).__init__(transport, protocol, shape=(32, 4),
+                                       pointer=pointer)
         self._item = Command('q', 'p', Float)
 
     def clear(self):
@@ -413,4 +569,4 @@ class PIDTable(Table):
             self._write('w')
         except OxfordIsobus.InvalidRequestError:
             # Wipe command was not recognized. Try manual wiping
-            self[:] = 0
\ No newline at end of file
+            self.write(np.zeros(self.shape))
\ No newline at end of file
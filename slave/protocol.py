@@ -19,15 +19,19 @@ The following protocols are already implemented and ready to use:
  * :class:`~.SignalRecovery`
  * :class:`~.OxfordIsobus`
 
+Failed transactions are retried according to a :class:`~.RetryPolicy`.
+
 """
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 from future.builtins import *
 import logging
 import functools
+import random
+import threading
 import time
 
-from slave.transport import Timeout
+from slave.transport import Timeout, TransportError
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
@@ -48,23 +52,171 @@ class Protocol(object):
         raise NotImplementedError()
 
 
-def _retry(errors, logger):
-    def wrapper(fn):
-        @functools.wraps(fn)
-        def wrapped(self, transport, *args, **kw):
-            try:
-                return fn(self, transport, *args, **kw)
-            except errors as e:
-                logger.exception('Exception occured on 1. try. Msg: %r Retrying.', e)
+class RetryPolicy(object):
+    """Defines how failed protocol transactions are retried.
+
+    Each protocol instance owns a retry policy, available as its `retry`
+    attribute. A failed transaction is repeated after a delay growing
+    exponentially with each attempt. Before a retry, an action depending on
+    the error is executed. E.g.::
+
+        from slave.protocol import IEC60488, RetryPolicy
+        from slave.transport import Timeout
+
+        policy = RetryPolicy(
+            attempts=5, backoff=0.1, deadline=2.,
+            actions={Timeout: 'reconnect'},
+            failure_threshold=3, reset_timeout=30.
+        )
+        protocol = IEC60488(retry=policy)
+
+    The following actions are available:
+
+    * `'clear'` Issues a device clear via the protocol.
+    * `'reconnect'` Reconnects the transport if it supports it, e.g.
+      :class:`~slave.transport.PersistentSocket`.
+    * `'resync'` Discards any buffered, unread bytes of the transport.
+    * A callable, receiving the protocol and transport object.
+    * `None` Retries without any further action.
+
+    The policy implements a circuit breaker. After `failure_threshold`
+    consecutive failed transactions, the circuit opens and all transactions
+    fail immediately with a :class:`~.RetryPolicy.CircuitOpenError` until
+    `reset_timeout` seconds have passed. Then a single attempt is allowed. On
+    success the circuit closes, otherwise it opens again.
+
+    :param attempts: The maximum number of attempts.
+    :param errors: A tuple of exceptions triggering a retry. Other exceptions
+        are raised immediately.
+    :param backoff: The delay in seconds before the first retry.
+    :param factor: The factor, the delay grows with each retry.
+    :param max_backoff: The maximum delay in seconds.
+    :param jitter: The relative random variation of the delay, e.g. `0.1`
+        varies the delay by up to 10%. This avoids synchronised retries of
+        several threads.
+    :param deadline: The time budget in seconds of a transaction, including
+        all retries. No retry is started if it would exceed the deadline.
+        `None` disables the deadline.
+    :param actions: A dictionary mapping exception types to actions. The
+        action of the most specific matching type is used.
+    :param failure_threshold: The number of consecutive failed transactions
+        opening the circuit breaker. `None` disables the circuit breaker.
+    :param reset_timeout: The time in seconds the circuit stays open.
+
+    """
+    class CircuitOpenError(Protocol.Error):
+        """Raised if the circuit breaker is open."""
+
+    def __init__(self, attempts=3, errors=None, backoff=0.05, factor=2.,
+                 max_backoff=1., jitter=0.1, deadline=None, actions=None,
+                 failure_threshold=None, reset_timeout=10.):
+        if attempts < 1:
+            raise ValueError('attempts < 1')
+        self.attempts = attempts
+        self.errors = errors or (Protocol.Error, UnicodeError, TransportError)
+        self.backoff = backoff
+        self.factor = factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.deadline = deadline
+        if actions is None:
+            actions = {
+                Timeout: 'clear',
+                TransportError: 'reconnect',
+                Protocol.ParsingError: 'resync',
+            }
+        self.actions = dict(actions)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened = None
+        self._lock = threading.Lock()
+
+    def action(self, error):
+        """Returns the action for the given error."""
+        for cls in type(error).__mro__:
+            if cls in self.actions:
+                return self.actions[cls]
+        return None
+
+    def _execute(self, action, protocol, transport):
+        if action is None:
+            return
+        elif action == 'clear':
+            protocol.clear(transport)
+        elif action == 'reconnect':
+            if hasattr(transport, 'reconnect'):
+                with transport:
+                    transport.reconnect()
+        elif action == 'resync':
+            with transport:
+                transport.discard()
+        else:
+            action(protocol, transport)
+
+    def _allow(self):
+        """Checks the circuit breaker and returns the number of attempts."""
+        with self._lock:
+            if self._opened is None:
+                return self.attempts
+            if time.time() - self._opened < self.reset_timeout:
+                raise RetryPolicy.CircuitOpenError(
+                    'Circuit open after {0} failures.'.format(self._failures))
+            # Half open, a single attempt decides if the circuit closes.
+            return 1
+
+    def _success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened = None
+
+    def _failure(self):
+        with self._lock:
+            self._failures += 1
+            threshold = self.failure_threshold
+            if threshold is not None and self._failures >= threshold:
+                self._opened = time.time()
+
+    def __call__(self, fn, protocol, transport, *args, **kw):
+        """Calls `fn(protocol, transport, *args, **kw)` and retries it
+        according to the policy.
+        """
+        attempts = self._allow()
+        start = time.time()
+        delay = self.backoff
+        attempt = 1
+        while True:
             try:
-                return fn(self, transport, *args, **kw)
-            except errors as e:
-                logger.exception('Exception occured on 2. try. Msg: %r Clearing device and retrying.', e)
-                self.clear(transport)
-            # Try one more time
-            return fn(self, transport, *args, **kw)
-        return wrapped
-    return wrapper
+                result = fn(protocol, transport, *args, **kw)
+            except self.errors as e:
+                sleep = delay * (1 + random.uniform(-self.jitter, self.jitter))
+                expired = (self.deadline is not None and
+                           time.time() - start + sleep > self.deadline)
+                if attempt >= attempts or expired:
+                    self._failure()
+                    raise
+                logger.warning('Attempt %d of %d failed: %r. Retrying.',
+                               attempt, attempts, e)
+                try:
+                    self._execute(self.action(e), protocol, transport)
+                except self.errors as e:
+                    logger.warning('Retry action failed: %r', e)
+                time.sleep(sleep)
+                delay = min(delay * self.factor, self.max_backoff)
+                attempt += 1
+            else:
+                self._success()
+                return result
+
+
+def _retry(fn):
+    """Retries the decorated method according to the retry policy of the
+    protocol instance.
+    """
+    @functools.wraps(fn)
+    def wrapped(self, transport, *args, **kw):
+        return self.retry(fn, self, transport, *args, **kw)
+    return wrapped
 
 
 class IEC60488(Protocol):
@@ -86,6 +238,8 @@ class IEC60488(Protocol):
     :param stb_callback: For each read and write operation, a status byte is
         received. If a callback function is given, it will be called with the
         status byte.
+    :param retry: The :class:`~.RetryPolicy` of failed queries and writes. If
+        `None`, a default policy is used.
 
 
     """
@@ -93,7 +247,8 @@ class IEC60488(Protocol):
         pass
 
     def __init__(self, msg_prefix='', msg_header_sep=' ', msg_data_sep=',', msg_term='\n',
-                 resp_prefix='', resp_header_sep='', resp_data_sep=',', resp_term='\n', encoding='ascii'):
+                 resp_prefix='', resp_header_sep='', resp_data_sep=',', resp_term='\n', encoding='ascii',
+                 retry=None):
         self.msg_prefix = msg_prefix
         self.msg_header_sep = msg_header_sep
         self.msg_data_sep = msg_data_sep
@@ -105,6 +260,7 @@ class IEC60488(Protocol):
         self.resp_term = resp_term
 
         self.encoding = encoding
+        self.retry = retry or RetryPolicy()
 
     def create_message(self, header, *data):
         if not data:
@@ -146,7 +302,7 @@ class IEC60488(Protocol):
             response = response[len(header):]
         return response.split(self.resp_data_sep)
 
-    @_retry(errors=(ParsingError, UnicodeDecodeError, UnicodeEncodeError, Timeout), logger=logger)
+    @_retry
     def query(self, transport, header, *data):
         message = self.create_message(header, *data)
         logger.debug('IEC60488 query: %r', message)
@@ -157,7 +313,7 @@ class IEC60488(Protocol):
         logger.debug('IEC60488 response: %r', response)
         return self.parse_response(response)
 
-    @_retry(errors=(ParsingError, UnicodeDecodeError, UnicodeEncodeError, Timeout), logger=logger)
+    @_retry
     def write(self, transport, header, *data):
         message = self.create_message(header, *data)
         logger.debug('IEC60488 write: %r', message)
@@ -313,6 +469,8 @@ class OxfordIsobus(Protocol):
     :param msg_term: The message terminator.
     :param resp_term: The response terminator.
     :param encoding: The message and response encoding.
+    :param retry: The :class:`~.RetryPolicy` of failed queries and writes. If
+        `None`, a default policy is used.
 
     Oxford Isobus messages messages are created in the following manner, where
     `HEADER` is a single char::
@@ -350,12 +508,13 @@ class OxfordIsobus(Protocol):
 
 
     def __init__(self, address=None, echo=True, msg_term='\r',
-                 resp_term='\r', encoding='ascii'):
+                 resp_term='\r', encoding='ascii', retry=None):
         self.address = address
         self.echo = echo
         self.msg_term = msg_term
         self.resp_term = resp_term
         self.encoding = encoding
+        self.retry = retry or RetryPolicy()
 
     def create_message(self, header, *data):
         msg = []
@@ -381,7 +540,7 @@ class OxfordIsobus(Protocol):
         # this won't work.
         return response[1:]
 
-    @_retry(errors=(InvalidRequestError, ParsingError, UnicodeDecodeError, UnicodeEncodeError, Timeout), logger=logger)
+    @_retry
     def query(self, transport, header, *data):
         message = self.create_message(header, *data)
         logger.debug('OxfordIsobus query: %r', message)
@@ -394,7 +553,7 @@ class OxfordIsobus(Protocol):
         # consistent with the other protocols.
         return [self.parse_response(response, header)]
 
-    @_retry(errors=(InvalidRequestError, ParsingError, UnicodeDecodeError, UnicodeEncodeError, Timeout), logger=logger)
+    @_retry
     def write(self, transport, header, *data):
         message = self.create_message(header, *data)
         logger.debug('OxfordIsobus write: %r', message)
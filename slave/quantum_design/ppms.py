@@ -12,6 +12,7 @@ from slave.driver import Command, CommandSequence, Driver
 from slave.types import Enum, Float, Integer, Register, String
 from slave.iec60488 import IEC60488
 import slave.protocol
+import slave.ramp
 
 #: Temperature controller status code.
 STATUS_TEMPERATURE = {
@@ -591,6 +592,73 @@ class PPMS(IEC60488):
             measure()
             time.sleep(delay)
 
+    def ramp_field(self, field, rate, approach='linear', mode='persistent',
+                   poller=None):
+        """Starts a field ramp without blocking.
+
+        :param field: The target field in Oersted.
+        :param rate: The field rate in Oersted per minute.
+        :param approach: The approach mode, either 'linear', 'no overshoot' or
+            'oscillate'.
+        :param mode: The state of the magnet at the end of the charging
+            process, either 'persistent' or 'driven'.
+        :param poller: The :class:`~slave.ramp.Poller` tracking the ramp. By
+            default, the shared poller is used.
+        :returns: A :class:`~slave.ramp.Ramp` instance. Cancelling it holds
+            the field at its present value.
+
+        """
+        start = self.field
+        self.target_field = field, rate, approach, mode
+        holdoff = 0.
+        if self.system_status['magnet'].startswith('persist'):
+            # The persistent switch takes some time to open. While it's
+            # opening, the status does not change.
+            holdoff = self.magnet_config[5]
+
+        def update(status):
+            return status['magnet'] in ('persistent, stable', 'driven, stable')
+
+        def cancel():
+            self.target_field = self.field, rate, approach, mode
+
+        expected = slave.ramp.duration(start, field, rate) or 0.
+        ramp = slave.ramp.Ramp(
+            (self, 'system_status'), lambda: self.system_status, update,
+            cancel, duration=holdoff + expected, holdoff=holdoff
+        )
+        return (poller or slave.ramp.default_poller()).add(ramp)
+
+    def ramp_temperature(self, temperature, rate, mode='fast', poller=None):
+        """Starts a temperature ramp without blocking.
+
+        :param temperature: The target temperature in kelvin.
+        :param rate: The sweep rate in kelvin per minute.
+        :param mode: The sweep mode, either 'fast' or 'no overshoot'.
+        :param poller: The :class:`~slave.ramp.Poller` tracking the ramp. By
+            default, the shared poller is used.
+        :returns: A :class:`~slave.ramp.Ramp` instance. Cancelling it holds
+            the temperature at its present value.
+
+        """
+        start = self.temperature
+        self.target_temperature = temperature, rate, mode
+
+        def update(status):
+            return status['temperature'] == 'normal stability at target temperature'
+
+        def cancel():
+            self.target_temperature = self.temperature, rate, mode
+
+        # The PPMS needs some time to update the status code, we therefore
+        # ignore it for 10s.
+        ramp = slave.ramp.Ramp(
+            (self, 'system_status'), lambda: self.system_status, update,
+            cancel, duration=slave.ramp.duration(start, temperature, rate),
+            holdoff=10.
+        )
+        return (poller or slave.ramp.default_poller()).add(ramp)
+
     def set_field(self, field, rate, approach='linear', mode='persistent',
                   wait_for_stability=True, delay=1):
         """Sets the magnetic field.
@@ -0,0 +1,249 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+"""The :mod:`slave.ramp` module implements non-blocking magnet and
+temperature ramps.
+
+A ramp is started by a driver method, e.g. :meth:`PPMS.ramp_field()
+<slave.quantum_design.ppms.PPMS.ramp_field>`, and returns immediately with a
+:class:`Ramp` handle. A background :class:`Poller` thread tracks all active
+ramps. Ramps waiting for the same status, e.g. the field and temperature ramp
+of a PPMS, share a single status query per tick. E.g.::
+
+    from slave.quantum_design import PPMS
+
+    ppms = PPMS(transport)
+    field = ppms.ramp_field(10000., 100.)
+    temperature = ppms.ramp_temperature(10., 1.)
+
+    while not (field.done() and temperature.done()):
+        # The main thread keeps measuring while both ramps proceed.
+        measure()
+
+    temperature.wait(timeout=60.)
+
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+import collections
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+def duration(start, target, rate):
+    """Estimates the duration of a ramp in seconds.
+
+    :param start: The start value.
+    :param target: The target value.
+    :param rate: The rate in units per minute.
+    :returns: The duration or `None`, if the rate is zero.
+
+    """
+    return 60. * abs(target - start) / abs(rate) if rate else None
+
+
+class Ramp(object):
+    """A handle of a running ramp.
+
+    :param key: A hashable key identifying the status source, e.g.
+        `(<driver>, 'status')`. Ramps with the same key share a single status
+        query per poller tick. `None` means no status is required.
+    :param query: A callable returning the status. It is ignored if key is
+        `None`.
+    :param update: A callable receiving the status, respectively `None`, on
+        every tick. It returns `True` when the ramp is complete. It can be
+        used to step a setpoint as well.
+    :param cancel: An optional callable stopping the ramp on the instrument.
+    :param duration: The expected duration in seconds, used to estimate the
+        progress.
+    :param holdoff: The time in seconds the status is ignored after the start,
+        e.g. because the instrument updates it with a delay.
+    :param started: An optional callable receiving the status and returning
+        `True` once the instrument reports the ramp as running. The status is
+        ignored until then or until the holdoff elapsed, so the idle state
+        preceding the ramp is not mistaken for its end.
+    :param timer: A callable returning the current time in seconds.
+
+    """
+    def __init__(self, key, query, update, cancel=None, duration=None,
+                 holdoff=0., started=None, timer=time.time):
+        self.key = key
+        self.query = query
+        self.duration = duration
+        self.holdoff = holdoff
+        self._started = started
+        self._running = False
+        self._update = update
+        self._cancel = cancel
+        self._timer = timer
+        self._start = timer()
+        self._event = threading.Event()
+        self._cancelled = False
+        self._exception = None
+
+    @property
+    def elapsed(self):
+        """The time in seconds since the ramp started."""
+        return self._timer() - self._start
+
+    @property
+    def progress(self):
+        """The estimated progress in the range 0 to 1 or `None`, if the
+        duration is unknown.
+        """
+        if self.done():
+            return 1.
+        if not self.duration:
+            return None
+        return min(self.elapsed / self.duration, 1.)
+
+    def done(self):
+        """Returns `True` if the ramp is complete, failed or was cancelled."""
+        return self._event.is_set()
+
+    def cancelled(self):
+        """Returns `True` if the ramp was cancelled."""
+        return self._cancelled
+
+    def exception(self):
+        """Returns the exception raised while tracking the ramp or `None`."""
+        return self._exception
+
+    def wait(self, timeout=None):
+        """Blocks until the ramp is done.
+
+        :param timeout: The timeout in seconds or `None`.
+        :returns: `True` if the ramp is done, `False` if the timeout expired.
+
+        """
+        return self._event.wait(timeout)
+
+    def cancel(self):
+        """Stops the ramp.
+
+        :returns: `False` if the ramp was already done, `True` otherwise.
+
+        """
+        if self.done():
+            return False
+        self._cancelled = True
+        try:
+            if self._cancel:
+                self._cancel()
+        finally:
+            self._event.set()
+        return True
+
+    def step(self, status):
+        """Updates the ramp with a new status, used by the :class:`Poller`."""
+        if self.done():
+            return
+        try:
+            if not self._running:
+                if self._started is not None and self._started(status):
+                    self._running = True
+                elif self.elapsed < self.holdoff:
+                    return
+            finished = self._update(status)
+        except Exception as e:
+            self.fail(e)
+        else:
+            if finished:
+                self._event.set()
+
+    def fail(self, exception):
+        """Finishes the ramp with an exception."""
+        logger.warning('Ramp failed: %r', exception)
+        self._exception = exception
+        self._event.set()
+
+    def __repr__(self):
+        return '<Ramp(key={0!r}, done={1}, progress={2})>'.format(
+            self.key, self.done(), self.progress)
+
+
+class Poller(object):
+    """Tracks active ramps in a background thread.
+
+    :param interval: The time between two ticks in seconds.
+    :param autostart: If `True`, the background thread is started with the
+        first ramp and stops when no ramp is left. Otherwise :meth:`.tick`
+        must be called manually.
+
+    """
+    def __init__(self, interval=1., autostart=True):
+        self.interval = interval
+        self.autostart = autostart
+        self._ramps = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def ramps(self):
+        """A list of the active ramps."""
+        with self._lock:
+            return list(self._ramps)
+
+    def add(self, ramp):
+        """Tracks a ramp and returns it."""
+        with self._lock:
+            self._ramps.append(ramp)
+            if self.autostart and self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+        return ramp
+
+    def tick(self):
+        """Queries each status once and updates the active ramps.
+
+        :returns: The number of status queries.
+
+        """
+        with self._lock:
+            self._ramps = [x for x in self._ramps if not x.done()]
+            groups = collections.OrderedDict()
+            for ramp in self._ramps:
+                groups.setdefault(ramp.key, []).append(ramp)
+        queries = 0
+        for key, ramps in groups.items():
+            status = None
+            if key is not None:
+                queries += 1
+                try:
+                    status = ramps[0].query()
+                except Exception as e:
+                    for ramp in ramps:
+                        ramp.fail(e)
+                    continue
+            for ramp in ramps:
+                ramp.step(status)
+        return queries
+
+    def _run(self):
+        while True:
+            self.tick()
+            with self._lock:
+                if not any(not x.done() for x in self._ramps):
+                    self._ramps = []
+                    self._thread = None
+                    return
+            time.sleep(self.interval)
+
+
+_default_poller = None
+_default_lock = threading.Lock()
+
+
+def default_poller():
+    """Returns the shared :class:`Poller` used by the drivers by default."""
+    global _default_poller
+    with _default_lock:
+        if _default_poller is None:
+            _default_poller = Poller()
+        return _default_poller
@@ -0,0 +1,166 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+"""The :mod:`slave.scheduler` module implements priority based access to a
+shared transport.
+
+Every protocol transaction locks the transport for its whole duration. If
+several threads use the same transport, e.g. a measurement loop and a safety
+watchdog, a plain lock grants access in arbitrary order. The
+:class:`Scheduler` replaces the lock of a transport and always serves the
+waiting transaction with the highest priority first. Transactions of the same
+priority are served in the order they arrived.
+
+Bulk reads, which support reading windows of data, are split into several
+transactions of bounded size (see :func:`chunks`), so high priority queries
+are interleaved between them. E.g.::
+
+    import threading
+
+    from slave.quantum_design import PPMS
+    from slave.scheduler import Scheduler
+    from slave.srs import SR830
+    from slave.transport import Visa
+
+    transport = Visa('GPIB::8')
+    scheduler = Scheduler(transport)
+    lockin = SR830(transport)
+
+    def watchdog():
+        while True:
+            with scheduler.priority(Scheduler.HIGH):
+                print(lockin.status)
+
+    threading.Thread(target=watchdog).start()
+    data = lockin.trace(1, 0, 16383)
+    print(scheduler.statistics[Scheduler.HIGH].delay)
+
+.. note::
+
+    A response which must be read at once, e.g. the SR7230 `DCB` curve dump,
+    can not be split and blocks the transport until it is completely read.
+
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+import collections
+import contextlib
+import heapq
+import itertools
+import threading
+import time
+
+
+def chunks(start, length, size):
+    """Splits a window of data into windows of at most `size` items.
+
+    E.g.::
+
+        >>> list(chunks(10, 5, 2))
+        [(10, 2), (12, 2), (14, 1)]
+
+    :param start: The index of the first item.
+    :param length: The total number of items.
+    :param size: The maximum number of items of a single window. If it is
+        `None`, the window is not split.
+    :returns: An iterator yielding `(start, length)` tuples.
+
+    """
+    if size is None:
+        size = length
+    if size < 1:
+        raise ValueError('size < 1')
+    stop = start + length
+    for i in range(start, stop, size):
+        yield i, min(size, stop - i)
+
+
+class QueueStatistics(object):
+    """Accumulates the queueing delay of a single priority.
+
+    :ivar int requests: The number of served requests.
+    :ivar float total_delay: The accumulated queueing delay in seconds.
+    :ivar float max_delay: The longest queueing delay in seconds.
+
+    """
+    def __init__(self):
+        self.requests = 0
+        self.total_delay = 0.
+        self.max_delay = 0.
+
+    @property
+    def delay(self):
+        """The mean queueing delay in seconds."""
+        return self.total_delay / self.requests if self.requests else 0.
+
+    def add(self, delay):
+        self.requests += 1
+        self.total_delay += delay
+        self.max_delay = max(self.max_delay, delay)
+
+    def __repr__(self):
+        return '<QueueStatistics(requests={0}, delay={1:.4f})>'.format(
+            self.requests, self.delay)
+
+
+class Scheduler(object):
+    """Grants access to a transport by priority.
+
+    The scheduler installs itself as the lock of the transport. The priority
+    of a transaction is a property of the calling thread and is set with the
+    :meth:`.priority` context manager. Lower values are served first.
+
+    :param transport: The transport object to schedule.
+    :param default: The priority of transactions issued outside a
+        :meth:`.priority` block.
+
+    :ivar statistics: A dictionary mapping the priority to an instance of
+        :class:`QueueStatistics`.
+
+    """
+    #: The highest predefined priority, e.g. for safety critical polls.
+    HIGH = 0
+    #: The default priority.
+    NORMAL = 10
+    #: A priority for bulk transfers.
+    LOW = 20
+
+    def __init__(self, transport, default=NORMAL):
+        self.default = default
+        self.statistics = collections.defaultdict(QueueStatistics)
+        self._condition = threading.Condition(threading.Lock())
+        self._queue = []
+        self._counter = itertools.count()
+        self._locked = False
+        self._local = threading.local()
+        transport.lock = self
+
+    @contextlib.contextmanager
+    def priority(self, value):
+        """Sets the priority of all transactions of the current thread issued
+        within the with block.
+        """
+        previous = getattr(self._local, 'priority', self.default)
+        self._local.priority = value
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def acquire(self):
+        priority = getattr(self._local, 'priority', self.default)
+        entry = (priority, next(self._counter))
+        start = time.time()
+        with self._condition:
+            heapq.heappush(self._queue, entry)
+            while self._locked or self._queue[0] != entry:
+                self._condition.wait()
+            heapq.heappop(self._queue)
+            self._locked = True
+            self.statistics[priority].add(time.time() - start)
+
+    def release(self):
+        with self._condition:
+            self._locked = False
+            self._condition.notify_all()
@@ -0,0 +1,525 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+"""The :mod:`slave.server` module shares a single instrument between several
+processes.
+
+Only one process can own a GPIB or serial instrument. A :class:`Server` wraps
+the transport of the instrument and serves it over TCP or a unix domain
+socket. Processes connect with the :class:`Client` transport and use the
+usual drivers. E.g. the process owning the instrument runs::
+
+    from slave.server import Server
+    from slave.transport import LinuxGpib
+
+    server = Server(LinuxGpib(primary=15), ('localhost', 6000),
+                    coalesce=lambda message: message.startswith(b'GETDAT?'))
+    server.serve_forever()
+
+while the measurement script, the monitoring dashboard and the safety
+watchdog each use::
+
+    from slave.quantum_design import PPMS
+    from slave.server import Client
+
+    ppms = PPMS(Client(('localhost', 6000)))
+    print(ppms.temperature)
+
+Each client has its own request queue, served round-robin by a single
+dispatcher thread. A client transport locked with a `with` block, as done by
+the protocols for every query, forms an atomic transaction. No other client
+is served until it ends.
+
+Identical read-only transactions, e.g. status queries, arriving within a
+short window are served from a single device transaction. All responses
+of a transaction stem from the same device transaction, once a request
+reaches the device, the rest of the transaction does as well. The read-only
+messages are selected with the `coalesce` parameter. Any other message
+invalidates the coalesced responses.
+
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+import collections
+import itertools
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+
+from slave.transport import Timeout, Transport, TransportError
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Request operations.
+BEGIN, END, WRITE, READ_BYTES, READ_EXACTLY, READ_UNTIL = range(1, 7)
+
+# Response status codes.
+OK, ERROR, TIMEOUT = range(3)
+
+_REQUEST = struct.Struct('!BII')
+_RESPONSE = struct.Struct('!BI')
+
+
+def _family(address):
+    return socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+
+
+def _receive(sock, num_bytes):
+    """Receives exactly `num_bytes` or raises an :class:`EOFError`."""
+    data = bytearray()
+    while len(data) < num_bytes:
+        chunk = sock.recv(num_bytes - len(data))
+        if not chunk:
+            raise EOFError('Connection closed.')
+        data += chunk
+    return bytes(data)
+
+
+def _request(op, data=b'', arg=b''):
+    return _REQUEST.pack(op, len(data), len(arg)) + bytes(data) + bytes(arg)
+
+
+class Client(Transport):
+    """A transport connected to a :class:`Server`.
+
+    :param address: The server address, either a tuple of host and port or
+        the path of a unix domain socket.
+    :param timeout: The socket timeout in seconds. `None` blocks forever.
+
+    Messages written inside a `with` block are sent together with the next
+    read request, so a query takes a single round trip.
+
+    If a request times out or the connection fails, the connection is closed,
+    so a late response can not be mistaken for the response of the next
+    request. The next request outside of the failed transaction connects
+    again.
+
+    """
+    class Error(TransportError):
+        pass
+
+    class Timeout(Timeout, Error):
+        pass
+
+    def __init__(self, address, timeout=None):
+        super(Client, self).__init__()
+        self.address = address
+        self.timeout = timeout
+        self._transaction = False
+        # True if the connection was lost within the current transaction.
+        self._lost = False
+        self._pending = bytearray()
+        self._frames = bytearray()
+        self._socket = None
+        self._connect()
+
+    def _connect(self):
+        sock = socket.socket(_family(self.address), socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.address)
+        except socket.error:
+            sock.close()
+            raise
+        if sock.family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._socket = sock
+
+    def _disconnect(self):
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except socket.error:
+                pass
+            self._socket = None
+        if self._transaction:
+            self._lost = True
+
+    def _send(self, op, arg=b''):
+        """Sends a request with the pending messages and returns the
+        response.
+        """
+        data, self._pending = self._pending, bytearray()
+        frames, self._frames = self._frames, bytearray()
+        if self._lost:
+            raise Client.Error('Connection lost within the transaction.')
+        try:
+            if self._socket is None:
+                self._connect()
+            self._socket.sendall(bytes(frames) + _request(op, data, arg))
+            status, length = _RESPONSE.unpack(
+                _receive(self._socket, _RESPONSE.size))
+            payload = _receive(self._socket, length)
+        except socket.timeout as e:
+            # The late response would be read by the next request.
+            self._disconnect()
+            raise Client.Timeout(e)
+        except (socket.error, EOFError) as e:
+            self._disconnect()
+            raise Client.Error(e)
+        if status == TIMEOUT:
+            raise Client.Timeout(payload.decode('utf-8', 'replace'))
+        elif status == ERROR:
+            raise Client.Error(payload.decode('utf-8', 'replace'))
+        return payload
+
+    def __write__(self, data):
+        self._pending += data
+        if not self._transaction:
+            self._send(WRITE)
+
+    def read_bytes(self, num_bytes):
+        return bytearray(self._send(READ_BYTES, str(num_bytes).encode()))
+
+    def read_exactly(self, num_bytes):
+        return bytearray(self._send(READ_EXACTLY, str(num_bytes).encode()))
+
+    def read_until(self, delimiter):
+        return bytearray(self._send(READ_UNTIL, bytes(delimiter)))
+
+    def discard(self):
+        self._pending = bytearray()
+
+    def __enter__(self):
+        super(Client, self).__enter__()
+        self._transaction = True
+        # Sent together with the next request.
+        self._frames += _request(BEGIN)
+
+    def __exit__(self, type, value, traceback):
+        try:
+            if self._pending and type is None:
+                self._send(WRITE)
+            self._pending = bytearray()
+            frames, self._frames = self._frames + _request(END), bytearray()
+            if self._socket is not None:
+                try:
+                    self._socket.sendall(bytes(frames))
+                except socket.error as e:
+                    self._disconnect()
+                    if type is None:
+                        raise Client.Error(str(e))
+        finally:
+            self._transaction = self._lost = False
+            super(Client, self).__exit__(type, value, traceback)
+
+    def close(self):
+        """Closes the connection."""
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+class _Connection(object):
+    """The server side state of a client connection."""
+    def __init__(self, sock, address):
+        self.socket = sock
+        self.address = address
+        self.requests = collections.deque()
+        self.closed = False
+        self.last = None
+        self.reset()
+
+    def reset(self):
+        """Starts a new transaction."""
+        # The requests of the current transaction.
+        self.history = []
+        # Requests served from the coalesced responses, which were not sent
+        # to the device.
+        self.coalesced = []
+        # The id of the device transaction serving this transaction.
+        self.source = None
+        # True once a request of this transaction reached the device.
+        self.executed = False
+
+    def respond(self, status, payload=b''):
+        try:
+            self.socket.sendall(_RESPONSE.pack(status, len(payload)) + payload)
+        except socket.error:
+            self.close()
+
+    def close(self):
+        self.closed = True
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+            self.socket.close()
+        except socket.error:
+            pass
+
+
+class Server(object):
+    """Serves a transport to several clients.
+
+    :param transport: The :class:`~slave.transport.Transport` of the
+        instrument.
+    :param address: Either a tuple of host and port, to serve over TCP, or
+        the path of a unix domain socket. A port of zero selects a free port,
+        see :attr:`.address`.
+    :param coalesce: Selects the read-only messages. Either a callable
+        receiving a message and returning `True` if it is read-only, or a
+        collection of read-only messages. `None` disables coalescing.
+    :param window: The time in seconds a response of a read-only transaction
+        is reused for identical transactions.
+    :param transaction_timeout: The time in seconds a client may keep a
+        transaction open without sending a request, before it is
+        disconnected.
+    :param timer: A callable returning the current time in seconds.
+
+    :ivar executed: The number of requests executed by the device.
+    :ivar coalesced: The number of requests served from a previous device
+        transaction.
+
+    """
+    def __init__(self, transport, address, coalesce=None, window=0.1,
+                 transaction_timeout=10., timer=time.time):
+        self.transport = transport
+        if coalesce is None:
+            self._readonly = lambda message: False
+        elif callable(coalesce):
+            self._readonly = coalesce
+        else:
+            messages = frozenset(bytes(x) for x in coalesce)
+            self._readonly = lambda message: message in messages
+        self.window = window
+        self.transaction_timeout = transaction_timeout
+        self.executed = 0
+        self.coalesced = 0
+        self._timer = timer
+        # Maps a transaction history to a tuple (<timestamp>, <response>,
+        # <device transaction id>).
+        self._cache = {}
+        self._ids = itertools.count()
+        self._connections = []
+        self._owner = None
+        self._index = 0
+        self._running = False
+        self._condition = threading.Condition()
+        self._threads = []
+
+        self._socket = socket.socket(_family(address), socket.SOCK_STREAM)
+        if self._socket.family == socket.AF_INET:
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(address)
+        self._socket.listen(16)
+
+    @property
+    def address(self):
+        """The address the server is listening on."""
+        return self._socket.getsockname()
+
+    def start(self):
+        """Starts serving in background threads."""
+        self._running = True
+        for target in (self._accept, self._dispatch):
+            thread = threading.Thread(target=target)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def serve_forever(self):
+        """Serves until :meth:`.close` is called or the process is
+        interrupted.
+        """
+        self.start()
+        try:
+            while self._running:
+                time.sleep(0.5)
+        finally:
+            self.close()
+
+    def close(self):
+        """Stops serving and closes all connections."""
+        with self._condition:
+            self._running = False
+            for connection in self._connections:
+                connection.close()
+            self._condition.notify_all()
+        address = self.address
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self._socket.close()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(1.)
+        if isinstance(address, str) and os.path.exists(address):
+            os.remove(address)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def _accept(self):
+        while self._running:
+            try:
+                sock, address = self._socket.accept()
+            except socket.error:
+                return
+            if sock.family == socket.AF_INET:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection = _Connection(sock, address)
+            connection.last = self._timer()
+            logger.debug('Client %r connected.', address)
+            with self._condition:
+                self._connections.append(connection)
+            thread = threading.Thread(target=self._receive, args=(connection,))
+            thread.daemon = True
+            thread.start()
+
+    def _receive(self, connection):
+        """Reads the requests of a client into its queue."""
+        try:
+            while True:
+                op, length, arg_length = _REQUEST.unpack(
+                    _receive(connection.socket, _REQUEST.size))
+                data = _receive(connection.socket, length)
+                arg = _receive(connection.socket, arg_length)
+                with self._condition:
+                    connection.requests.append((op, data, arg))
+                    self._condition.notify_all()
+        except (EOFError, socket.error):
+            logger.debug('Client %r disconnected.', connection.address)
+        with self._condition:
+            connection.closed = True
+            self._condition.notify_all()
+
+    def _next(self):
+        """Waits for the next request.
+
+        :returns: A tuple *(<connection>, <request>)* or `None` if the server
+            was closed.
+
+        """
+        with self._condition:
+            while self._running:
+                owner = self._owner
+                if owner is not None:
+                    if owner.requests:
+                        return owner, owner.requests.popleft()
+                    idle = self._timer() - owner.last
+                    if owner.closed or idle > self.transaction_timeout:
+                        if not owner.closed:
+                            logger.warning(
+                                'Transaction of %r timed out.', owner.address)
+                        owner.close()
+                        self._owner = None
+                        continue
+                    self._condition.wait(self.transaction_timeout - idle)
+                    continue
+                self._connections = [
+                    x for x in self._connections if x.requests or not x.closed
+                ]
+                count = len(self._connections)
+                for i in range(count):
+                    connection = self._connections[(self._index + i) % count]
+                    if connection.requests:
+                        self._index = (self._index + i + 1) % count
+                        return connection, connection.requests.popleft()
+                self._condition.wait()
+        return None
+
+    def _dispatch(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            connection, request = item
+            connection.last = self._timer()
+            self._handle(connection, request)
+
+    def _handle(self, connection, request):
+        op, data, arg = request
+        if op == BEGIN:
+            self._owner = connection
+            connection.reset()
+            return
+        elif op == END:
+            if self._owner is connection:
+                self._owner = None
+            connection.reset()
+            return
+        if self._owner is not connection:
+            # A request outside of a transaction.
+            connection.reset()
+        try:
+            response = self._execute(connection, request)
+        except Timeout as e:
+            self.transport.discard()
+            connection.respond(TIMEOUT, str(e).encode('utf-8'))
+        except Exception as e:
+            logger.warning('Request %r failed: %r', request, e)
+            self.transport.discard()
+            connection.respond(ERROR, '{0!r}'.format(e).encode('utf-8'))
+        else:
+            connection.respond(OK, response)
+
+    def _is_readonly(self, history):
+        # A read-only transaction starts with a read-only message and
+        # continues with read requests only.
+        op, data, arg = history[0]
+        if op == WRITE or not data or not self._readonly(data):
+            return False
+        return all(x[0] != WRITE and not x[1] for x in history[1:])
+
+    def _execute(self, connection, request):
+        connection.history.append(request)
+        history = tuple(connection.history)
+        readonly = self._is_readonly(history)
+        if not readonly:
+            self._cache.clear()
+        elif not connection.executed:
+            entry = self._cache.get(history)
+            # The previous responses must stem from the same device
+            # transaction, e.g. the header and body of a block read.
+            if (entry and self._timer() - entry[0] <= self.window and
+                    connection.source in (None, entry[2])):
+                connection.source = entry[2]
+                connection.coalesced.append(request)
+                self.coalesced += 1
+                return entry[1]
+        if not connection.executed:
+            connection.executed = True
+            connection.source = next(self._ids)
+            # The device has not seen the coalesced requests of this
+            # transaction.
+            replay, connection.coalesced = connection.coalesced, []
+            for i, x in enumerate(replay):
+                response = self._run(x)
+                if readonly:
+                    self._store(history[:i + 1], response, connection.source)
+        response = self._run(request)
+        if readonly:
+            self._store(history, response, connection.source)
+        return response
+
+    def _store(self, history, response, source):
+        now = self._timer()
+        # Drops expired responses, e.g. of varying monitor queries.
+        for key, entry in list(self._cache.items()):
+            if now - entry[0] > self.window:
+                del self._cache[key]
+        self._cache[history] = (now, response, source)
+
+    def _run(self, request):
+        op, data, arg = request
+        transport = self.transport
+        self.executed += 1
+        with transport:
+            if data:
+                transport.write(data)
+            if op == READ_BYTES:
+                return bytes(transport.read_bytes(int(arg)))
+            elif op == READ_EXACTLY:
+                return bytes(transport.read_exactly(int(arg)))
+            elif op == READ_UNTIL:
+                return bytes(transport.read_until(arg))
+        return b''
@@ -52,7 +52,8 @@ import datetime
 
 import numpy as np
 
-from slave.driver import Command, Driver, CommandSequence
+from slave.driver import (Command, Driver, CommandSequence, Lazy,
+                          LazySequence)
 from slave.protocol import SignalRecovery
 from slave.types import (
     Boolean, Enum, Float, Integer, Register, Set, String, Mapping
@@ -629,10 +630,9 @@ class SR7230(Driver):
         self.noise = Command(('NHZ.', Float))
         self.noise_bandwidth = Command(('ENBW.', Float))
         self.noise_output = Command(('NN.', Float))
-        self.equation = [
-            Equation(self._transport, self._protocol, 1),
-            Equation(self._transport, self._protocol, 2),
-        ]
+        self.equation = LazySequence(
+            lambda i: Equation(self._transport, self._protocol, i), (1, 2)
+        )
 
         # Internal oscillator
         # ===================
@@ -689,11 +689,12 @@ class SR7230(Driver):
         )
         # Analog Outputs
         # ==============
-        self.dac = [DAC(self._transport, self._protocol, i) for i in range(1, 5)]
+        self.dac = LazySequence(
+            lambda i: DAC(self._transport, self._protocol, i), range(1, 5))
 
         # Digital I/O
         # ===========
-        self.digital_ports = DigitalPort(self._transport, self._protocol)
+        self.digital_ports = Lazy(DigitalPort, self._transport, self._protocol)
 
         # Auxiliary Inputs
         # ================
@@ -718,8 +719,10 @@ class SR7230(Driver):
                 Integer
             ]
         ))
-        self.fast_buffer = FastBuffer(self._transport, self._protocol)
-        self.standard_buffer = StandardBuffer(self._transport, self._protocol)
+        self.fast_buffer = Lazy(FastBuffer, self._transport, self._protocol)
+        self.standard_buffer = Lazy(
+            StandardBuffer, self._transport, self._protocol
+        )
         self.trigger_output_event = Command(
             'TRIGOUT',
             'TRIGOUT',
@@ -753,9 +756,8 @@ class SR7230(Driver):
 
         # Dual Mode Command
         # =================
-        self.demod = (
-            Demodulator(self._transport, self._protocol, 1),
-            Demodulator(self._transport, self._protocol, 2),
+        self.demod = LazySequence(
+            lambda i: Demodulator(self._transport, self._protocol, i), (1, 2)
         )
 
     @property
@@ -0,0 +1,290 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+"""The :mod:`slave.srs.analysis` module implements the trace analysis of the
+SR850 locally.
+
+:meth:`SR850.smooth() <slave.srs.sr850.SR850.smooth>`,
+:meth:`~slave.srs.sr850.SR850.fit`,
+:meth:`~slave.srs.sr850.SR850.calculate_statistics` and
+:meth:`~slave.srs.sr850.SR850.calculate` run on the lock-in, pause a running
+scan and need additional queries to read the results. The functions of this
+module operate on a trace downloaded in bulk instead and follow the
+definitions of the instrument, e.g. :func:`fit` returns the parameters
+described in :class:`~slave.srs.sr850.FitParameters`. E.g.::
+
+    import numpy as np
+    from slave.srs import SR850
+    from slave.srs import analysis
+
+    lockin = SR850(transport)
+    data = np.array(lockin.traces[0][:])
+    t = analysis.time(len(data), lockin.scan_sample_rate)
+
+    # Statistics of the first 30% of the time window.
+    stats = analysis.statistics(*analysis.window(t, data, 0, 30))
+    # Fits a gaussian to the smoothed trace.
+    params = analysis.fit(t, analysis.smooth(data, 11), 'gauss')
+    print(stats.mean, params.t0)
+
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+import collections
+
+import numpy as np
+
+
+#: The smoothing windows supported by the SR850.
+WINDOWS = (5, 11, 17, 21, 25)
+
+#: The fit functions supported by the SR850.
+FUNCTIONS = ('line', 'exp', 'gauss')
+
+#: The math operations supported by the SR850.
+OPERATIONS = ('+', '-', '*', '/', 'sin', 'cos', 'tan', 'sqrt', '^2', 'log',
+              '10^x')
+
+FitResult = collections.namedtuple('FitResult', ['a', 'b', 'c', 't0'])
+FitResult.__doc__ = """The fit parameters, see
+:class:`~slave.srs.sr850.FitParameters` for their definition."""
+
+StatisticsResult = collections.namedtuple(
+    'StatisticsResult', ['mean', 'standard_deviation', 'total_data',
+                         'time_delta'])
+StatisticsResult.__doc__ = """The statistics, see
+:class:`~slave.srs.sr850.Statistics` for their definition."""
+
+
+def time(num, sample_rate):
+    """Returns the time axis of a trace in seconds.
+
+    :param num: The number of points.
+    :param sample_rate: The scan sample rate in Hz, see
+        :attr:`SR850.scan_sample_rate <slave.srs.sr850.SR850.scan_sample_rate>`.
+
+    """
+    if sample_rate == 'trigger':
+        raise ValueError('Triggered scans have no time axis.')
+    return np.arange(num) / float(sample_rate)
+
+
+def window(t, data, start, stop):
+    """Limits a trace to a range of the time window.
+
+    :param t: The time axis.
+    :param data: The trace data.
+    :param start: The left limit of the time window in percent.
+    :param stop: The right limit of the time window in percent.
+    :returns: A tuple *(<t>, <data>)* of numpy arrays.
+
+    """
+    if not 0 <= start < stop <= 100:
+        raise ValueError('0 <= start < stop <= 100 violated.')
+    t, data = np.asarray(t, dtype=float), np.asarray(data, dtype=float)
+    last = len(data) - 1
+    lo = int(np.floor(start * last / 100. + 1e-9))
+    hi = int(np.ceil(stop * last / 100. - 1e-9))
+    return t[lo:hi + 1], data[lo:hi + 1]
+
+
+def _savitzky_golay(window, order=2):
+    # The least squares polynomial fit of a window, as a matrix mapping the
+    # window points to the fitted value at each position.
+    x = np.arange(window) - window // 2
+    vandermonde = np.vander(x, order + 1, increasing=True)
+    return vandermonde.dot(np.linalg.pinv(vandermonde))
+
+
+def smooth(data, window):
+    """Smooths a trace with a Savitzky-Golay filter, like
+    :meth:`SR850.smooth() <slave.srs.sr850.SR850.smooth>`.
+
+    :param data: The trace data.
+    :param window: The smoothing window in points. Valid are 5, 11, 17, 21
+        and 25.
+    :returns: A numpy array with the smoothed data. Points closer than half a
+        window to the edges are evaluated with the polynomial fitted to the
+        first, respectively last, window.
+
+    """
+    if window not in WINDOWS:
+        raise ValueError('Invalid window {0}, valid are {1}.'.format(
+            window, WINDOWS))
+    data = np.asarray(data, dtype=float)
+    if len(data) < window:
+        raise ValueError('The trace is shorter than the smoothing window.')
+    matrix = _savitzky_golay(window)
+    half = window // 2
+    smoothed = np.convolve(data, matrix[half][::-1], mode='same')
+    smoothed[:half] = matrix[:half].dot(data[:window])
+    smoothed[-half:] = matrix[-half:].dot(data[-window:])
+    return smoothed
+
+
+def _exp(t, a, b, c):
+    return a * np.exp(-t / b) + c
+
+
+def _exp_jacobian(t, a, b, c):
+    e = np.exp(-t / b)
+    return np.column_stack((e, a * t * e / b ** 2, np.ones_like(t)))
+
+
+def _gauss(t, a, b, c, t0):
+    return a * np.exp(-0.5 * ((t - t0) / b) ** 2) + c
+
+
+def _gauss_jacobian(t, a, b, c, t0):
+    u = (t - t0) / b
+    e = np.exp(-0.5 * u ** 2)
+    return np.column_stack(
+        (e, a * e * u ** 2 / b, np.ones_like(t), a * e * u / b))
+
+
+def _levenberg_marquardt(model, jacobian, t, y, p, iterations=200,
+                         tolerance=1e-12):
+    p = np.asarray(p, dtype=float)
+    residual = y - model(t, *p)
+    cost = residual.dot(residual)
+    damping = 1e-3
+    for _ in range(iterations):
+        j = jacobian(t, *p)
+        jtj, jtr = j.T.dot(j), j.T.dot(residual)
+        while True:
+            matrix = jtj + damping * np.diag(np.diag(jtj) + 1e-30)
+            try:
+                delta = np.linalg.solve(matrix, jtr)
+            except np.linalg.LinAlgError:
+                delta = np.linalg.lstsq(matrix, jtr, rcond=None)[0]
+            candidate = p + delta
+            new = y - model(t, *candidate)
+            new_cost = new.dot(new)
+            if np.isfinite(new_cost) and new_cost <= cost:
+                damping = max(damping / 10., 1e-15)
+                break
+            damping *= 10.
+            if damping > 1e15:
+                return p
+        converged = cost - new_cost <= tolerance * max(cost, 1e-300)
+        p, residual, cost = candidate, new, new_cost
+        if converged:
+            break
+    return p
+
+
+def fit(t, data, function):
+    """Fits a function to a trace, like :meth:`SR850.fit()
+    <slave.srs.sr850.SR850.fit>`.
+
+    :param t: The time axis, e.g. limited with :func:`window`.
+    :param data: The trace data.
+    :param function: The fit function, either 'line', 'exp' or 'gauss'.
+    :returns: A :class:`FitResult`. For the line and exponential fit, the
+        horizontal offset `t0` is the first point of the time axis. The line
+        fit leaves `c` at zero.
+
+    """
+    if function not in FUNCTIONS:
+        raise ValueError('Invalid function {0!r}, valid are {1}.'.format(
+            function, FUNCTIONS))
+    t, data = np.asarray(t, dtype=float), np.asarray(data, dtype=float)
+    if len(t) != len(data):
+        raise ValueError('Time axis and data differ in length.')
+    if len(data) < 4:
+        raise ValueError('At least 4 points are required.')
+    t0 = t[0]
+    dt = t - t0
+    if function == 'line':
+        b, a = np.polyfit(dt, data, 1)
+        return FitResult(float(a), float(b), 0., float(t0))
+    span = dt[-1] or 1.
+    if function == 'exp':
+        c = data[-1]
+        a = data[0] - c
+        # The time the trace needs to decay to 1/e of the initial amplitude.
+        decayed = np.nonzero(np.abs(data - c) <= abs(a) / np.e)[0]
+        b = dt[decayed[0]] if len(decayed) and decayed[0] > 0 else span / 3.
+        a, b, c = _levenberg_marquardt(_exp, _exp_jacobian, dt, data,
+                                       (a, b, c))
+        return FitResult(float(a), float(b), float(c), float(t0))
+    c = 0.5 * (data[0] + data[-1])
+    peak = np.argmax(np.abs(data - c))
+    a = data[peak] - c
+    # Estimates the width from the area below the peak.
+    area = 0.5 * np.sum((data[1:] + data[:-1] - 2 * c) * np.diff(dt))
+    b = abs(area / (a * np.sqrt(2 * np.pi))) if a else 0.
+    if not 0 < b < span:
+        b = span / 10.
+    a, b, c, center = _levenberg_marquardt(_gauss, _gauss_jacobian, dt, data,
+                                           (a, b, c, dt[peak]))
+    return FitResult(float(a), float(abs(b)), float(c), float(center + t0))
+
+
+def statistics(t, data):
+    """Calculates the statistics of a trace, like
+    :meth:`SR850.calculate_statistics()
+    <slave.srs.sr850.SR850.calculate_statistics>`.
+
+    :param t: The time axis, e.g. limited with :func:`window`.
+    :param data: The trace data.
+    :returns: A :class:`StatisticsResult`. The standard deviation is the
+        population standard deviation.
+
+    """
+    t, data = np.asarray(t, dtype=float), np.asarray(data, dtype=float)
+    if not len(data):
+        raise ValueError('The trace is empty.')
+    return StatisticsResult(
+        mean=float(data.mean()),
+        standard_deviation=float(data.std()),
+        total_data=float(data.sum()),
+        time_delta=float(t[-1] - t[0]),
+    )
+
+
+_BINARY = {
+    '+': np.add,
+    '-': np.subtract,
+    '*': np.multiply,
+    '/': np.true_divide,
+}
+
+_UNARY = {
+    'sin': np.sin,
+    'cos': np.cos,
+    'tan': np.tan,
+    'sqrt': np.sqrt,
+    '^2': np.square,
+    'log': np.log10,
+    '10^x': lambda x: np.power(10., x),
+}
+
+
+def calculate(data, operation, argument=None):
+    """Applies a math operation to a trace, like :meth:`SR850.calculate()
+    <slave.srs.sr850.SR850.calculate>`.
+
+    :param data: The trace data.
+    :param operation: The operation, see :attr:`SR850.math_operation
+        <slave.srs.sr850.SR850.math_operation>`. The trigonometric functions
+        expect radians, 'log' is the decadic logarithm.
+    :param argument: The second argument of the arithmetic operations, either
+        a constant or another trace of the same length.
+    :returns: A numpy array.
+
+    """
+    data = np.asarray(data, dtype=float)
+    if operation in _BINARY:
+        if argument is None:
+            raise ValueError('Operation {0!r} requires an argument.'.format(
+                operation))
+        argument = np.asarray(argument, dtype=float)
+        if argument.ndim and argument.shape != data.shape:
+            raise ValueError('Traces differ in length.')
+        return _BINARY[operation](data, argument)
+    if operation in _UNARY:
+        return _UNARY[operation](data)
+    raise ValueError('Invalid operation {0!r}, valid are {1}.'.format(
+        operation, OPERATIONS))
@@ -13,7 +13,8 @@ from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 from future.builtins import *
 
-from slave.driver import Command, Driver
+from slave.driver import Command, Driver, Lazy
+from slave.scheduler import chunks
 from slave.types import Boolean, Enum, Float, Integer, Register, Set, String
 
 
@@ -247,6 +248,12 @@ class SR830(Driver):
         1, 3, 10, 30, 100, 300, 1e3, 3e3, 10e3, 30e3
     ]
 
+    # The (lowercase) parameters of the SNAP? command.
+    _SNAP_PARAMETER = Enum(
+        'x', 'y', 'r', 'theta', 'auxin1', 'auxin2', 'auxin3', 'auxin4', 'ref',
+        'ch1', 'ch2', start=1
+    )
+
     def __init__(self, transport):
         """Constructs a SR830 instrument object.
 
@@ -333,7 +340,8 @@ class SR830(Driver):
         # Aux input and output commands
         # =============================
         for id in range(1, 5):
-            setattr(self, 'aux{0}'.format(id), Aux(transport, self._protocol, id))
+            setattr(self, 'aux{0}'.format(id),
+                    Lazy(Aux, transport, self._protocol, id))
 
         # Setup commands
         # ==============
@@ -390,14 +398,22 @@ class SR830(Driver):
 
         # Status reporting commands
         # =========================
-        self.error_status = ErrorStatus(transport, self._protocol)
-        self.error_enable = ErrorEnable(transport, self._protocol)
-        self.lockin_status = LockInStatus(transport, self._protocol)
-        self.lockin_enable = LockInEnable(transport, self._protocol)
-        self.serial_poll_status = SerialPollStatus(transport, self._protocol)
-        self.serial_poll_enable = SerialPollEnable(transport, self._protocol)
-        self.std_event_status = StandardEventStatus(transport, self._protocol)
-        self.std_event_enable = StandardEventEnable(transport, self._protocol)
+        self.error_status = Lazy(ErrorStatus, transport, self._protocol)
+        self.error_enable = Lazy(ErrorEnable, transport, self._protocol)
+        self.lockin_status = Lazy(LockInStatus, transport, self._protocol)
+        self.lockin_enable = Lazy(LockInEnable, transport, self._protocol)
+        self.serial_poll_status = Lazy(
+            SerialPollStatus, transport, self._protocol
+        )
+        self.serial_poll_enable = Lazy(
+            SerialPollEnable, transport, self._protocol
+        )
+        self.std_event_status = Lazy(
+            StandardEventStatus, transport, self._protocol
+        )
+        self.std_event_enable = Lazy(
+            StandardEventEnable, transport, self._protocol
+        )
         #: Enables or disables the clearing of the status registers on poweron.
         self.clear_on_poweron = Command('*PSC?', '*PSC', Boolean)
 
@@ -461,38 +477,49 @@ class SR830(Driver):
     def snap(self, *args):
         """Records up to 6 parameters at a time.
 
+        The values are recorded simultaneously and read with a single query,
+        e.g.::
+
+            x, y, aux1 = lockin.snap('X', 'Y', 'AuxIn1')
+
         :param args: Specifies the values to record. Valid ones are 'X', 'Y',
           'R', 'theta', 'AuxIn1', 'AuxIn2', 'AuxIn3', 'AuxIn4', 'Ref', 'CH1'
-          and 'CH2'. If none are given 'X' and 'Y' are used.
+          and 'CH2'. The names are case insensitive. If none are given 'X' and
+          'Y' are used.
+        :returns: A list of floats.
 
         """
-        # TODO: Do not use transport directly.
-        params = {'X': 1, 'Y': 2, 'R': 3, 'Theta': 4, 'AuxIn1': 5, 'AuxIn2': 6,
-                  'AuxIn3': 7, 'AuxIn4': 8, 'Ref': 9, 'CH1': 10, 'CH2': 11}
         if not args:
             args = ['X', 'Y']
-        if len(args) > 6:
-            raise ValueError('Too many parameters (max: 6).')
-        cmd = 'SNAP? ' + ','.join(map(lambda x: str(params[x]), args))
-        result = self.transport.ask(cmd)
-        return map(float, result.split(','))
+        if not 2 <= len(args) <= 6:
+            raise ValueError('snap takes 2 to 6 parameters, {0} given.'.format(len(args)))
+        cmd = 'SNAP?', [Float] * len(args), [self._SNAP_PARAMETER] * len(args)
+        return self._query(cmd, *[str(x).lower() for x in args])
 
     def clear(self):
         """Clears all status registers."""
         self._write('*CLS')
 
-    def trace(self, buffer, start, length=1):
+    def trace(self, buffer, start, length=1, chunk_size=512):
         """Reads the points stored in the channel buffer.
 
         :param buffer: Selects the channel buffer (either 1 or 2).
         :param start: Selects the bin where the reading starts.
         :param length: The number of bins to read.
+        :param chunk_size: The maximum number of bins read with a single
+            query. Larger reads are split into several queries, so other
+            queries on the same transport are not blocked for the whole
+            transfer, see :class:`~slave.scheduler.Scheduler`.
+        :returns: A list of floats.
 
         .. todo::
            Use binary command TRCB to speed up data transmission.
         """
-        # TODO: Do not use transport directly.
-        query = 'TRCA? {0}, {1}, {2}'.format(buffer, start, length)
-        result = self.transport.ask(query)
-        # Result format: "1.0e-004,1.2e-004,". Strip trailing comma then split.
-        return (float(f) for f in result.strip(',').split(','))
+        values = []
+        for i, n in chunks(start, length, chunk_size):
+            response = self._protocol.query(
+                self._transport, 'TRCA?', str(buffer), str(i), str(n))
+            # Result format: "1.0e-004,1.2e-004,". The trailing comma leads to
+            # an empty last item.
+            values.extend(float(f) for f in response if f)
+        return values
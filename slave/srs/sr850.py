@@ -5,9 +5,11 @@ from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 from future.builtins import *
 
-from slave.driver import Command, Driver, CommandSequence
+from slave.driver import (Command, Driver, CommandSequence, Lazy,
+                          LazySequence)
 from slave.types import Boolean, Enum, Float, Integer, Register, String
 from slave.iec60488 import IEC60488, PowerOn
+from slave.scheduler import chunks
 
 
 class SR850(IEC60488, PowerOn):
@@ -477,9 +479,9 @@ class SR850(IEC60488, PowerOn):
             (Float(min=-105., max=105.), Integer(min=1, max=256))
         )
         # Trace and Scan Commands
-        self.traces = [
-            Trace(transport, self._protocol, i) for i in range(1, 5)
-        ]
+        self.traces = LazySequence(
+            lambda i: Trace(transport, self._protocol, i), range(1, 5)
+        )
         self.scan_sample_rate = Command(
             'SRAT?',
             'SRAT',
@@ -506,13 +508,13 @@ class SR850(IEC60488, PowerOn):
             'MNTR',
             Enum('settings', 'input/output')
         )
-        self.full_display = Display(transport, self._protocol, 0)
-        self.top_display = Display(transport, self._protocol, 1)
-        self.bottom_display = Display(transport, self._protocol, 2)
+        self.full_display = Lazy(Display, transport, self._protocol, 0)
+        self.top_display = Lazy(Display, transport, self._protocol, 1)
+        self.bottom_display = Lazy(Display, transport, self._protocol, 2)
         # Cursor Commands
-        self.cursor = Cursor(transport, self._protocol)
+        self.cursor = Lazy(Cursor, transport, self._protocol)
         # Mark Commands
-        self.marks = MarkList(transport, self._protocol)
+        self.marks = Lazy(MarkList, transport, self._protocol)
         # Aux Input and Output Comnmands
         def aux_in(i):
             """Helper function to create an aux input command."""
@@ -523,8 +525,8 @@ class SR850(IEC60488, PowerOn):
             self._protocol,
             (aux_in(i) for i in range(1, 5))
         )
-        self.aux_output = tuple(
-            Output(transport, self._protocol, i) for i in range(1, 5)
+        self.aux_output = LazySequence(
+            lambda i: Output(transport, self._protocol, i), range(1, 5)
         )
         self.start_on_trigger = Command('TSTR?', 'TSTR', Boolean)
         # Math Commands
@@ -550,8 +552,8 @@ class SR850(IEC60488, PowerOn):
             'FTYP',
             Enum('line', 'exp', 'gauss')
         )
-        self.fit_params = FitParameters(transport, self._protocol)
-        self.statistics = Statistics(transport, self._protocol)
+        self.fit_params = Lazy(FitParameters, transport, self._protocol)
+        self.statistics = Lazy(Statistics, transport, self._protocol)
         # Store and Recall File Commands
         # TODO The filename syntax is not validated yet.
         self.filename = Command('FNAM?', 'FNAM', String(max=12))
@@ -707,11 +709,12 @@ class SR850(IEC60488, PowerOn):
         are recorded together, as well as 'r' and 'theta'. Between these
         pairs, there is a delay of approximately 10 us. 'aux1', 'aux2', 'aux3'
         and 'aux4' have am uncertainty of up to 32 us. It takes at least 40 ms
-        or a period to calculate the frequency.
+        or a period to calculate the frequency. The arguments are case
+        insensitive.
 
         E.g.::
 
-            lockin.snap('x', 'theta', 'trace3')
+            x, theta, trace3 = lockin.snap('x', 'theta', 'trace3')
 
         """
         length = len(args)
@@ -721,11 +724,11 @@ class SR850(IEC60488, PowerOn):
         # The program data type.
         param = Enum(
             'x', 'y', 'r', 'theta', 'aux1', 'aux2', 'aux3', 'aux4',
-            'frequency', 'trace1', 'trace2', 'trace3', 'trace4'
+            'frequency', 'trace1', 'trace2', 'trace3', 'trace4', start=1
         )
         # construct command,
         cmd = 'SNAP?', (Float,) * length, (param, ) * length
-        return self._ask(cmd, *args)
+        return self._query(cmd, *[str(x).lower() for x in args])
 
     def save(self, mode='all'):
         """Saves to the file specified by :attr:`~SR850.filename`.
@@ -802,8 +805,8 @@ class SR850(IEC60488, PowerOn):
             # Fit's a gaussian to the first 30% of the time window.
             lockin.fit(range=(0, 30), function='gauss')
 
-        :param start: The left limit of the time window in percent.
-        :param stop: The right limit of the time window in percent.
+        :param range: A tuple *(<start>, <stop>)* with the left and right
+            limit of the time window in percent.
         :param function: The function used to fit the data, either 'line',
             'exp', 'gauss' or None, the default. The configured fit function is
             left unchanged if function is None.
@@ -819,10 +822,14 @@ class SR850(IEC60488, PowerOn):
             The SR850 will generate an error if the active display trace is not
             stored when the fit command is executed.
 
+        .. seealso:: :func:`slave.srs.analysis.fit` fits a downloaded trace
+            locally.
+
         """
         if function is not None:
             self.fit_function = function
-        cmd = 'FITT', Integer(min=0, max=100), Integer(min=0, max=100)
+        start, stop = range
+        cmd = 'FITT', (Integer(min=0, max=100), Integer(min=0, max=100))
         self._write(cmd, start, stop)
 
     def calculate_statistics(self, start, stop):
@@ -843,7 +850,7 @@ class SR850(IEC60488, PowerOn):
             stored when the command is executed.
 
         """
-        cmd = 'STAT', Integer, Integer
+        cmd = 'STAT', (Integer, Integer)
         self._write(cmd, start, stop)
 
     def calculate(self, operation=None, trace=None, constant=None, type=None):
@@ -1127,10 +1134,16 @@ class Trace(Driver):
         If the upper bound exceeds the number of store points, an internal
         lock-in error is generated.
 
+    :ivar int chunk_size: The maximum number of points read with a single
+        query. Larger reads are split into several queries, so other queries
+        on the same transport are not blocked for the whole transfer, see
+        :class:`~slave.scheduler.Scheduler`.
+
     """
     def __init__(self, transport, protocol, idx):
         super(Trace, self).__init__(transport, protocol)
         self.idx = idx = int(idx)
+        self.chunk_size = 512
         self.value = Command(('OUTR? {0}'.format(idx), Float))
 
         quantities = Enum(
@@ -1146,22 +1159,23 @@ class Trace(Driver):
 
     def __len__(self):
         """The number of points stored in the trace."""
-        return self._write(('SPTS {0}'.format(self.idx), Integer))
+        return self._query(('SPTS? {0}'.format(self.idx), Integer))
 
     def __getitem__(self, item):
         if isinstance(item, slice):
-            start = item.start
-            length = item.stop - item.start
+            start = 0 if item.start is None else item.start
+            stop = len(self) if item.stop is None else item.stop
+            length = stop - start
         else:
-            start = item.start
-            length = 1
+            start, length = item, 1
         if length <= 0:
             raise ValueError('stop - start > 0 violated.')
-        cmd = (
-            'TRCA? {0},{1},{2}'.format(self.idx, start, length),
-            (Float,) * length
-        )
-        return self._ask(cmd)
+        values = []
+        for i, n in chunks(start, length, self.chunk_size):
+            response = self._protocol.query(
+                self._transport, 'TRCA?', str(self.idx), str(i), str(n))
+            values.extend(float(f) for f in response if f)
+        return values if isinstance(item, slice) else values[0]
 
 
 class Mark(Driver):
@@ -1215,7 +1229,8 @@ class MarkList(Driver):
     """A sequence like structure holding the eight SR850 marks."""
     def __init__(self, transport, protocol):
         super(MarkList, self).__init__(transport, protocol)
-        self._marks = [Mark(transport, self._protocol, i) for i in range(8)]
+        self._marks = LazySequence(
+            lambda i: Mark(transport, self._protocol, i), range(8))
 
     def active(self):
         """The indices of the active marks."""
@@ -1242,7 +1257,7 @@ class FitParameters(Driver):
 
     line   `y = a + b * (t - t0)`
     exp    `y = a * exp(-(t - t0) / b) + c`
-    gauss  `y = a * exp(0.5 * (t / b)^2) + c`
+    gauss  `y = a * exp(-0.5 * ((t - t0) / b)^2) + c`
     ========  ===============================
 
     :ivar a: The a parameter.
@@ -0,0 +1,328 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+"""The :mod:`slave.sweep` module implements declarative multi-axis sweeps.
+
+An :class:`Axis` binds a sequence of setpoints to a writeable driver
+attribute, e.g. a :class:`~slave.driver.Command`, or to a ramp method of a
+driver. Axes are combined with :class:`Nest`, iterating over the cartesian
+product, and :class:`Zip`, stepping several axes together. A :class:`Sweep`
+writes the setpoints, waits until they are settled and calls the
+measurements, e.g. :class:`~slave.misc.Measurement` writers. Axes are
+callables returning their current setpoint, so they can be used as
+measurables. E.g.::
+
+    from slave.misc import Measurement
+    from slave.sweep import Axis, Nest, Sweep, linear, log
+
+    field = Axis.ramp(ppms.ramp_field, linear(0., 10000., 11), 'field',
+                      args=(100.,))
+    frequency = Axis.command(lockin, 'frequency', log(10., 10e3, 31),
+                             'frequency', settle=0.5)
+
+    with Measurement('sweep.csv', [field, frequency, lambda: lockin.x],
+                     ['field', 'frequency', 'x']) as measurement:
+        sweep = Sweep(Nest(field, frequency, snake=True), [measurement])
+        statistics = sweep.run()
+
+    print(statistics.time_per_point, statistics.skipped)
+
+Setpoints equal to the last written value are not written again, e.g. the
+outer axis of a nested sweep is written once per inner sweep. With
+`snake=True`, the inner axes reverse their direction on every other outer
+point, so the setpoint does not jump back and the turning point is not
+rewritten.
+
+"""
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+import time
+
+import numpy as np
+
+
+def linear(start, stop, num):
+    """Returns `num` linearly spaced points, including `start` and `stop`."""
+    return np.linspace(start, stop, num)
+
+
+def log(start, stop, num):
+    """Returns `num` logarithmically spaced points, including `start` and
+    `stop`.
+    """
+    if start <= 0 or stop <= 0:
+        raise ValueError('Logarithmic sweeps require positive limits.')
+    return np.logspace(np.log10(start), np.log10(stop), num)
+
+
+def step(start, stop, step):
+    """Returns points from `start` to `stop` with the given step size.
+
+    In contrast to :func:`numpy.arange`, `stop` is included if it lies on the
+    grid.
+
+    """
+    if step == 0:
+        raise ValueError('Step must not be zero.')
+    num = int(np.floor((stop - start) / step + 1e-9)) + 1
+    return start + step * np.arange(max(num, 0))
+
+
+class Axis(object):
+    """A sweep axis.
+
+    :param setter: A callable writing a setpoint.
+    :param points: An iterable of setpoints.
+    :param name: An optional name.
+    :param settle: Either the time in seconds waited after a setpoint was
+        written, or a callable returning `True` as soon as the setpoint is
+        settled. It is polled every `interval` seconds.
+    :param interval: The polling interval of a settle callable in seconds.
+    :param timeout: The maximum time in seconds a settle callable is polled,
+        `None` waits forever.
+
+    Calling an axis returns the setpoint written last.
+
+    """
+    def __init__(self, setter, points, name=None, settle=None, interval=0.1,
+                 timeout=None):
+        self.setter = setter
+        self.points = list(points)
+        self.name = name
+        self.settle = settle
+        self.interval = interval
+        self.timeout = timeout
+        self.value = None
+        self._ramp = None
+
+    @classmethod
+    def command(cls, driver, attribute, points, name=None, **kw):
+        """Creates an axis writing a driver attribute, e.g. a
+        :class:`~slave.driver.Command`.
+        """
+        def setter(value):
+            setattr(driver, attribute, value)
+        return cls(setter, points, name or attribute, **kw)
+
+    @classmethod
+    def ramp(cls, method, points, name=None, args=(), **kw):
+        """Creates an axis starting a ramp, e.g. with
+        :meth:`~slave.quantum_design.ppms.PPMS.ramp_field`, and waiting until
+        it is done.
+
+        The ramp is started when the setpoint is written and awaited while
+        the point settles, so the ramps of several axes of a point, e.g. a
+        :class:`Zip` of a field and a temperature axis, run simultaneously.
+        The timeout applies to the ramp as well.
+
+        :param method: The ramp method, receiving the setpoint and `args`. It
+            returns a :class:`~slave.ramp.Ramp`.
+        :param args: Additional positional arguments, e.g. the rate.
+
+        """
+        axis = cls(None, points, name or getattr(method, '__name__', None),
+                   **kw)
+
+        def setter(value):
+            axis._ramp = method(value, *args)
+        axis.setter = setter
+        return axis
+
+    def __call__(self):
+        return self.value
+
+    def __len__(self):
+        return len(self.points)
+
+    def steps(self, reverse=False):
+        """Yields a tuple of *(<axis>, <setpoint>)* tuples for every point."""
+        points = reversed(self.points) if reverse else self.points
+        for point in points:
+            yield ((self, point),)
+
+    def wait(self):
+        """Waits until the last written setpoint is settled."""
+        ramp, self._ramp = self._ramp, None
+        if ramp is not None:
+            if not ramp.wait(self.timeout):
+                raise RuntimeError(
+                    'Axis {0!r} did not finish its ramp within {1} s.'.format(
+                        self.name, self.timeout))
+            if ramp.exception() is not None:
+                raise ramp.exception()
+        if self.settle is None:
+            return
+        if not callable(self.settle):
+            time.sleep(self.settle)
+            return
+        start = time.time()
+        while not self.settle():
+            if self.timeout is not None and time.time() - start > self.timeout:
+                raise RuntimeError(
+                    'Axis {0!r} did not settle within {1} s.'.format(
+                        self.name, self.timeout))
+            time.sleep(self.interval)
+
+    def __repr__(self):
+        return '<Axis({0!r}, points={1})>'.format(self.name, len(self))
+
+
+class Zip(object):
+    """Steps several axes, or nested :class:`Zip` and :class:`Nest` nodes,
+    together.
+
+    :param nodes: The axes or nodes. All of them must have the same length.
+
+    """
+    def __init__(self, *nodes):
+        if len(set(len(x) for x in nodes)) > 1:
+            raise ValueError('Zipped axes must have the same length.')
+        self.nodes = nodes
+
+    def __len__(self):
+        return len(self.nodes[0]) if self.nodes else 0
+
+    def steps(self, reverse=False):
+        for step in zip(*[x.steps(reverse) for x in self.nodes]):
+            yield sum(step, ())
+
+
+class Nest(object):
+    """Iterates over the cartesian product of several axes, or nested
+    :class:`Zip` and :class:`Nest` nodes.
+
+    :param nodes: The axes or nodes, the outermost first.
+    :param snake: If `True`, the inner axes reverse their direction on every
+        other outer point.
+
+    """
+    def __init__(self, *nodes, **kw):
+        self.nodes = nodes
+        self.snake = kw.pop('snake', False)
+        if kw:
+            raise TypeError('Unexpected keyword arguments {0}'.format(kw))
+
+    def __len__(self):
+        return int(np.prod([len(x) for x in self.nodes]))
+
+    def steps(self, reverse=False):
+        return self._steps(self.nodes, reverse)
+
+    def _steps(self, nodes, reverse):
+        if not nodes:
+            yield ()
+            return
+        outer, inner = nodes[0], nodes[1:]
+        for i, step in enumerate(outer.steps(reverse)):
+            inner_reverse = reverse != (self.snake and i % 2 == 1)
+            for rest in self._steps(inner, inner_reverse):
+                yield step + rest
+
+
+class SweepStatistics(object):
+    """The timing statistics of a sweep.
+
+    :ivar points: The number of measured points.
+    :ivar writes: The number of setpoint writes.
+    :ivar skipped: The number of setpoint writes skipped, because the setpoint
+        did not change.
+    :ivar durations: A numpy array with the duration of each point in seconds,
+        including setpoint writes, settling and the measurement.
+    :ivar write_time: The accumulated time spent writing setpoints.
+    :ivar settle_time: The accumulated time spent waiting for settling.
+    :ivar measure_time: The accumulated time spent measuring.
+
+    """
+    def __init__(self):
+        self.points = 0
+        self.writes = 0
+        self.skipped = 0
+        self.durations = np.zeros(0)
+        self.write_time = 0.
+        self.settle_time = 0.
+        self.measure_time = 0.
+
+    @property
+    def time_per_point(self):
+        """The mean duration of a point in seconds."""
+        return float(self.durations.mean()) if len(self.durations) else 0.
+
+    @property
+    def total(self):
+        """The total duration in seconds."""
+        return float(self.durations.sum())
+
+    def __repr__(self):
+        return ('<SweepStatistics(points={0}, writes={1}, skipped={2}, '
+                'time_per_point={3:.4f})>').format(
+                    self.points, self.writes, self.skipped,
+                    self.time_per_point)
+
+
+class Sweep(object):
+    """Writes the setpoints of an axis tree and measures every point.
+
+    :param node: An :class:`Axis`, :class:`Zip` or :class:`Nest` instance.
+    :param measurements: A sequence of callables called at every point, e.g.
+        :class:`~slave.misc.Measurement` instances.
+    :param timer: A callable returning the current time in seconds.
+
+    """
+    def __init__(self, node, measurements=(), timer=time.time):
+        self.node = node
+        self.measurements = list(measurements)
+        self._timer = timer
+
+    def __len__(self):
+        return len(self.node)
+
+    def plan(self):
+        """Returns a list with the setpoint writes of every point.
+
+        Each item is a list of *(<axis>, <setpoint>)* tuples, omitting
+        setpoints which are equal to the previous one of the same axis.
+
+        """
+        return [writes for writes, _ in self._plan()]
+
+    def _plan(self):
+        last = {}
+        for step in self.node.steps():
+            writes = []
+            for axis, value in step:
+                if axis in last and last[axis] == value:
+                    continue
+                last[axis] = value
+                writes.append((axis, value))
+            yield writes, len(step) - len(writes)
+
+    def run(self):
+        """Runs the sweep.
+
+        :returns: A :class:`SweepStatistics` instance.
+
+        """
+        statistics = SweepStatistics()
+        durations = []
+        for writes, skipped in self._plan():
+            start = self._timer()
+            for axis, value in writes:
+                axis.setter(value)
+                axis.value = value
+            wrote = self._timer()
+            for axis, _ in writes:
+                axis.wait()
+            settled = self._timer()
+            for measurement in self.measurements:
+                measurement()
+            end = self._timer()
+            statistics.points += 1
+            statistics.writes += len(writes)
+            statistics.skipped += skipped
+            statistics.write_time += wrote - start
+            statistics.settle_time += settled - wrote
+            statistics.measure_time += end - settled
+            durations.append(end - start)
+        statistics.durations = np.array(durations)
+        return statistics
@@ -0,0 +1,159 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+import multiprocessing
+import pickle
+import time
+
+import numpy as np
+import pytest
+
+from slave.acquisition import (Acquisition, SharedRingBuffer, TransportSpec,
+                               Worker, shared_memory)
+from slave.driver import Driver
+from slave.transport import SimulatedTransport
+
+pytestmark = pytest.mark.skipif(shared_memory is None,
+                                reason='Shared memory is not supported.')
+
+DTYPE = [('i', np.int64), ('x', float)]
+
+
+class Counter(Driver):
+    """Counts the acquisitions, constructed in the worker process."""
+    def __init__(self, transport, step=1):
+        super(Counter, self).__init__(transport)
+        self.step = step
+        self.count = 0
+
+
+def acquire(counter):
+    counter.count += 1
+    return [(counter.count, counter.count * counter.step)] * 2
+
+
+def write(buffer):
+    buffer.put([(i, 0.) for i in range(1, 7)], block=False)
+    buffer.close()
+
+
+def fail(counter):
+    raise ValueError('Acquisition failed.')
+
+
+@pytest.fixture
+def buffer():
+    buffer = SharedRingBuffer(4, DTYPE)
+    yield buffer
+    buffer.unlink()
+
+
+class TestSharedRingBuffer(object):
+    def test_views_wrap_around(self, buffer):
+        assert buffer.put([(0, 0.), (1, 1.), (2, 2.)]) == 3
+        assert buffer.release(2) == 2
+        buffer.put([(3, 3.), (4, 4.)])
+        views = buffer.views()
+        assert [list(x['i']) for x in views] == [[2, 3], [4]]
+        # The views share the memory of the buffer.
+        assert all(x.base is not None for x in views)
+        assert list(buffer.get()['i']) == [2, 3, 4]
+        assert len(buffer) == 0
+        assert (buffer.written, buffer.read) == (5, 5)
+
+    def test_release_keeps_records_written_after_views(self, buffer):
+        buffer.put([(0, 0.), (1, 1.)])
+        assert len(buffer.views()) == 1
+        buffer.put((2, 2.))
+        assert buffer.release() == 2
+        assert list(buffer.get()['i']) == [2]
+        assert buffer.release() == 0
+
+    def test_non_blocking_put_drops(self, buffer):
+        assert buffer.put([(i, 0.) for i in range(6)], block=False) == 4
+        assert buffer.dropped == 2
+        assert buffer.put((7, 0.), block=True, timeout=0.01) == 0
+        assert buffer.dropped == 3
+        assert list(buffer.get()['i']) == [0, 1, 2, 3]
+
+    def test_closed_buffer(self):
+        buffer = SharedRingBuffer(4, DTYPE)
+        buffer.put([(1, 1.), (2, 2.)], block=False)
+        views = buffer.views()
+        buffer.unlink()
+        # Referenced views keep the memory mapped.
+        assert list(views[0]['i']) == [1, 2]
+        assert (buffer.written, buffer.read, len(buffer)) == (2, 0, 2)
+        with pytest.raises(ValueError):
+            buffer.views()
+        with pytest.raises(ValueError):
+            buffer.put((3, 3.))
+        del views
+
+    def test_spawned_process_shares_memory(self):
+        # A spawned process receives the pickled buffer.
+        context = multiprocessing.get_context('spawn')
+        buffer = SharedRingBuffer(4, DTYPE, context)
+        try:
+            process = context.Process(target=write, args=(buffer,))
+            process.start()
+            process.join(30.)
+            assert process.exitcode == 0
+            assert list(buffer.get()['i']) == [1, 2, 3, 4]
+            assert buffer.dropped == 2
+        finally:
+            buffer.unlink()
+
+
+def test_transport_spec():
+    spec = TransportSpec('slave.transport.SimulatedTransport')
+    spec = pickle.loads(pickle.dumps(spec))
+    assert isinstance(spec.create(), SimulatedTransport)
+
+
+def test_worker_backpressure():
+    worker = Worker(Counter, TransportSpec(SimulatedTransport), acquire,
+                    DTYPE, size=8, step=2)
+    with Acquisition([worker]) as acquisition:
+        assert worker.buffer.wait(8, timeout=10.)
+        time.sleep(0.1)
+        # The worker blocks until space is released.
+        assert worker.buffer.written == 8
+        records = worker.buffer.get()
+        assert list(records['i']) == [1, 1, 2, 2, 3, 3, 4, 4]
+        assert list(records['x']) == [2, 2, 4, 4, 6, 6, 8, 8]
+        assert worker.buffer.wait(8, timeout=10.)
+        worker.stop()
+        assert not worker.alive
+        assert worker.error is None
+        written, dropped = acquisition.statistics()['Counter']
+        assert written >= 16
+    # The counters remain readable after the buffer was closed.
+    assert acquisition.statistics()['Counter'] == (written, dropped)
+    assert 'written={0}'.format(written) in repr(worker)
+
+
+def test_worker_drops_records():
+    worker = Worker(Counter, TransportSpec(SimulatedTransport), acquire,
+                    DTYPE, size=4, block=False, interval=0.001)
+    with Acquisition([worker]):
+        deadline = time.time() + 10.
+        while not worker.buffer.dropped and time.time() < deadline:
+            time.sleep(0.01)
+        worker.stop()
+        assert worker.buffer.dropped > 0
+        assert worker.buffer.written == 4
+
+
+def test_worker_reports_errors():
+    worker = Worker(Counter, TransportSpec(SimulatedTransport), fail, DTYPE)
+    try:
+        worker.start()
+        worker.join(10.)
+        assert not worker.alive
+        assert 'Acquisition failed.' in worker.error
+    finally:
+        worker.close()
@@ -0,0 +1,130 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+import collections
+
+import pytest
+
+from slave.configuration import ConfigurationManager
+from slave.driver import Command
+from slave.iec60488 import IEC60488, Learn, StoredSetting
+from slave.transport import Transport
+from slave.types import Float
+
+
+class DeviceTransport(Transport):
+    """Emulates a device with a single setting, stored settings and the learn
+    command.
+    """
+    def __init__(self):
+        self.state = {'VOLT': '1.0', 'CURR': '0.5'}
+        self.slots = {}
+        self.messages = []
+        self._response = collections.deque()
+        super(DeviceTransport, self).__init__()
+
+    def __write__(self, data):
+        message = data.decode('ascii').strip()
+        self.messages.append(message)
+        for unit in message.split(';'):
+            header, _, value = unit.partition(' ')
+            if header == '*IDN?':
+                self._respond('ACME,DEV1,123,1.0')
+            elif header == '*LRN?':
+                self._respond(';'.join(
+                    '{0} {1}'.format(k, v) for k, v in sorted(self.state.items())
+                ))
+            elif header == '*SAV':
+                self.slots[value] = dict(self.state)
+            elif header == '*RCL':
+                self.state = dict(self.slots[value])
+            elif header.endswith('?'):
+                self._respond(self.state[header[:-1]])
+            else:
+                self.state[header] = value
+
+    def _respond(self, response):
+        self._response.append(response.encode('ascii') + b'\n')
+
+    def __read__(self, num_bytes):
+        return self._response.popleft()
+
+
+class Device(IEC60488):
+    def __init__(self, transport):
+        super(Device, self).__init__(transport)
+        self.voltage = Command('VOLT?', 'VOLT', Float)
+        self.current = Command('CURR?', 'CURR', Float)
+
+
+class StoringDevice(Device, StoredSetting, Learn):
+    pass
+
+
+def test_store_and_recall_slot():
+    transport = DeviceTransport()
+    device = StoringDevice(transport)
+    manager = ConfigurationManager(device)
+    assert manager.identity == 'ACME,DEV1,123,1.0'
+    manager.store('low', slot=0)
+    device.voltage = 5.
+    manager.store('high', slot=1)
+
+    del transport.messages[:]
+    manager.switch('low')
+    assert transport.messages == ['*RCL 0']
+    assert device.voltage == 1.
+    assert manager.active == 'low'
+
+
+def test_storing_a_slot_replaces_previous_configuration():
+    manager = ConfigurationManager(StoringDevice(DeviceTransport()))
+    manager.store('low', slot=0)
+    manager.store('high', slot=0)
+    assert manager.names == ['high']
+
+
+def test_store_learned_setup():
+    transport = DeviceTransport()
+    device = StoringDevice(transport)
+    manager = ConfigurationManager(device)
+    device.current = 0.25
+    manager.store('setup')
+    assert manager.method('setup') == 'learn'
+    device.current = 0.75
+
+    del transport.messages[:]
+    manager.switch('setup')
+    assert transport.messages == ['CURR 0.25;VOLT 1.0']
+    assert device.current == 0.25
+
+
+def test_fallback_to_snapshot():
+    transport = DeviceTransport()
+    device = Device(transport)
+    manager = ConfigurationManager(device)
+    with pytest.raises(TypeError):
+        manager.store('slot', slot=0)
+    manager.store('setup')
+    assert manager.method('setup') == 'snapshot'
+    device.voltage = 2.
+
+    manager.switch('setup')
+    assert transport.messages[-1] == 'VOLT 1.0'
+    assert device.voltage == 1.
+
+
+def test_configurations_are_persisted(tmpdir):
+    filename = str(tmpdir.join('config.json'))
+    manager = ConfigurationManager(StoringDevice(DeviceTransport()), filename)
+    manager.store('low', slot=2)
+
+    transport = DeviceTransport()
+    transport.slots['2'] = {'VOLT': '3.0', 'CURR': '0.5'}
+    manager = ConfigurationManager(StoringDevice(transport), filename)
+    assert manager.names == ['low']
+    manager.switch('low')
+    assert transport.state['VOLT'] == '3.0'
@@ -4,13 +4,17 @@
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 from future.builtins import *
+import collections
 import itertools as it
+import json
 
 import pytest
 
-from slave.driver import Command, Driver, _dump, _load, _to_instance, _typelist
-from slave.types import Integer, String
-from slave.transport import SimulatedTransport
+from slave.driver import (Command, Driver, Lazy, LazySequence, _dump, _load,
+                          _to_instance, _typelist)
+from slave.protocol import IEC60488
+from slave.types import Boolean, Enum, Float, Integer, Stream, String
+from slave.transport import SimulatedTransport, Transport
 
 
 class MockProtocol(object):
@@ -170,6 +174,13 @@ class TestCommand(object):
         assert protocol.data == ()
         assert response == [1, 2, 3]
 
+    def test_query_with_array_stream_type(self):
+        protocol = MockProtocol(response=['1', '2', '3'])
+        transport = MockTransport()
+        cmd = Command(query=('HEADER', Stream(Float, as_array=True)))
+        response = cmd.query(transport, protocol)
+        assert response.tolist() == [1., 2., 3.]
+
     def test_simulation_with_query_and_writeable_cmd(self):
         protocol = MockProtocol()
         transport = SimulatedTransport()
@@ -206,7 +217,26 @@ class MockDriver(Driver):
         self.multiple_types_cmd = Command('QUERY', 'WRITE', [Integer, String])
 
 
+class PropertyDriver(Driver):
+    reads = 0
+
+    @property
+    def value(self):
+        PropertyDriver.reads += 1
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+
+
 class TestDriver(object):
+    def test_setting_property_does_not_call_getter(self):
+        driver = PropertyDriver(MockTransport(), MockProtocol())
+        driver.value = 1
+        assert PropertyDriver.reads == 0
+        assert driver.value == 1
+
     def test_getting_normal_attribute(self):
         transport, protocol = MockTransport(), MockProtocol()
         driver = MockDriver(transport, protocol)
@@ -256,3 +286,159 @@ class TestDriver(object):
         driver._write(('WRITE', [Integer, String]), 12, 'DATA')
         assert protocol.header == 'WRITE'
         assert protocol.data == ('12', 'DATA')
+
+
+class StateTransport(Transport):
+    """Emulates an instrument storing settings, which accepts compound
+    messages.
+    """
+    def __init__(self, state):
+        self.state = dict(state)
+        self.messages = []
+        self._response = collections.deque()
+        super(StateTransport, self).__init__()
+
+    def __write__(self, data):
+        message = data.decode('ascii').strip()
+        self.messages.append(message)
+        responses = []
+        for unit in message.split(';'):
+            if unit.endswith('?'):
+                responses.append(self.state[unit[:-1]])
+            else:
+                header, value = unit.split(' ', 1)
+                self.state[header] = value
+        if responses:
+            self._response.append(';'.join(responses).encode('ascii') + b'\n')
+
+    def __read__(self, num_bytes):
+        return self._response.popleft()
+
+
+class Channel(Driver):
+    def __init__(self, transport, protocol, idx):
+        super(Channel, self).__init__(transport, protocol)
+        self.value = Command('VAL{0}?'.format(idx), 'VAL{0}'.format(idx), Float)
+        self.reading = Command(('RDG{0}?'.format(idx), Float))
+
+
+class Instrument(Driver):
+    def __init__(self, transport, compound=False):
+        self._compound = compound
+        super(Instrument, self).__init__(transport)
+        self.level = Command('LEV?', 'LEV', Float)
+        self.mode = Command('MODE?', 'MODE', Enum('off', 'on'))
+        self.limits = Command('LIM?', 'LIM', [Integer, Boolean])
+        self.channels = tuple(Channel(transport, self._protocol, i) for i in range(2))
+
+
+STATE = {
+    'LEV': '1.5', 'MODE': '0', 'LIM': '3,1', 'VAL0': '0.1', 'VAL1': '0.2',
+    'RDG0': '9', 'RDG1': '9',
+}
+
+
+class TestSnapshot(object):
+    def test_snapshot(self):
+        transport = StateTransport(STATE)
+        doc = Instrument(transport).snapshot()
+        assert doc == {
+            'level': 1.5, 'mode': 'off', 'limits': [3, True],
+            'channels': {'0': {'value': 0.1}, '1': {'value': 0.2}},
+        }
+        assert json.loads(json.dumps(doc)) == doc
+        assert len(transport.messages) == 5
+
+    def test_snapshot_with_compound_messages(self):
+        transport = StateTransport(STATE)
+        driver = Instrument(transport, compound=True)
+        doc = driver.snapshot(batch_size=3)
+        assert doc['channels']['1'] == {'value': 0.2}
+        assert transport.messages == ['LEV?;MODE?;LIM?', 'VAL0?;VAL1?']
+
+    def test_restore_writes_differing_settings_only(self):
+        transport = StateTransport(STATE)
+        driver = Instrument(transport, compound=True)
+        doc = driver.snapshot()
+        doc['level'] = 2.5
+        doc['mode'] = 'on'
+        doc['channels']['1']['value'] = 0.3
+        del transport.messages[:]
+
+        statistics = driver.restore(json.loads(json.dumps(doc)))
+        # The mode is restored before the values.
+        assert transport.messages == [
+            'LEV?;MODE?;LIM?;VAL0?;VAL1?', 'MODE 1;LEV 2.5;VAL1 0.3'
+        ]
+        assert statistics.changed == 3
+        assert statistics.queries == 1
+        assert statistics.writes == 1
+        assert driver.snapshot() == doc
+
+    def test_restore_without_changes(self):
+        transport = StateTransport(STATE)
+        driver = Instrument(transport)
+        statistics = driver.restore(driver.snapshot())
+        assert statistics.changed == 0
+        assert statistics.writes == 0
+
+    def test_snapshot_with_simulated_transport(self):
+        driver = Instrument(SimulatedTransport(), compound=True)
+        doc = driver.snapshot()
+        assert isinstance(doc['level'], float)
+        assert set(doc['channels']) == set(['0', '1'])
+
+
+class LazyInstrument(Driver):
+    def __init__(self, transport):
+        super(LazyInstrument, self).__init__(transport)
+        self.level = Lazy(Command, 'LEV?', 'LEV', Float)
+        self.channel = Lazy(Channel, transport, self._protocol, 0)
+        self.channels = LazySequence(
+            lambda idx: Channel(transport, self._protocol, idx), range(2))
+
+
+class TestLazy(object):
+    def test_shared_type_instances(self):
+        assert _to_instance(Float) is _to_instance(Float)
+
+    def test_sub_driver_is_constructed_on_access(self):
+        driver = LazyInstrument(StateTransport(STATE))
+        assert isinstance(vars(driver)['channel'], Lazy)
+        channel = driver.channel
+        assert isinstance(channel, Channel)
+        assert vars(driver)['channel'] is channel
+        assert channel.value == 0.1
+
+    def test_command_is_queried_and_written(self):
+        transport = StateTransport(STATE)
+        driver = LazyInstrument(transport)
+        assert driver.level == 1.5
+        driver = LazyInstrument(transport)
+        driver.level = 2.5
+        assert transport.messages == ['LEV?', 'LEV 2.5']
+        assert isinstance(vars(driver)['level'], Command)
+
+    def test_sequence_constructs_items_on_access(self):
+        calls = []
+
+        def factory(key):
+            calls.append(key)
+            return key * 2
+
+        seq = LazySequence(factory, range(1, 4))
+        assert len(seq) == 3
+        assert calls == []
+        assert seq[1] == 4
+        assert seq[1] == 4
+        assert calls == [2]
+        assert seq[::2] == (2, 6)
+        assert list(seq) == [2, 4, 6]
+        assert calls == [2, 1, 3]
+
+    def test_snapshot(self):
+        driver = LazyInstrument(StateTransport(STATE))
+        assert driver.snapshot() == {
+            'level': 1.5, 'channel': {'value': 0.1},
+            'channels': {'0': {'value': 0.1}, '1': {'value': 0.2}},
+        }
@@ -0,0 +1,137 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+import collections
+import re
+
+import pytest
+
+from slave.driver import Command, Recording
+from slave.iec60488 import IEC60488, Macro, definite_length_block
+from slave.transport import SimulatedTransport, Transport
+from slave.types import Float, Integer
+
+
+class MacroTransport(Transport):
+    """Emulates an IEC 60488 device supporting macros."""
+    DMC = re.compile(r'^\*DMC "(\w+)",#(\d)(.*)$')
+
+    def __init__(self):
+        self.state = {'VOLT': '0.0', 'COUNT': '0'}
+        self.macros = {}
+        self.messages = []
+        self._response = collections.deque()
+        super(MacroTransport, self).__init__()
+
+    def __write__(self, data):
+        message = data.decode('ascii').rstrip('\n')
+        self.messages.append(message)
+        match = self.DMC.match(message)
+        if match:
+            label, digits, rest = match.groups()
+            length = int(rest[:int(digits)])
+            body = rest[int(digits):]
+            assert len(body) == length
+            self.macros[label] = body
+            return
+        responses = self._execute(message)
+        if responses:
+            self._response.append(';'.join(responses).encode('ascii') + b'\n')
+
+    def _execute(self, message):
+        responses = []
+        for unit in message.split(';'):
+            header, _, value = unit.partition(' ')
+            if header in self.macros:
+                responses.extend(self._execute(self.macros[header]))
+            elif header == 'INC':
+                self.state['COUNT'] = str(int(self.state['COUNT']) + 1)
+            elif header.endswith('?'):
+                responses.append(self.state[header[:-1]])
+            else:
+                self.state[header] = value
+        return responses
+
+    def __read__(self, num_bytes):
+        return self._response.popleft()
+
+
+class Device(IEC60488, Macro):
+    def __init__(self, transport):
+        super(Device, self).__init__(transport)
+        self.voltage = Command('VOLT?', 'VOLT', Float)
+        self.count = Command(('COUNT?', Integer))
+
+    def increment(self):
+        self._write('INC')
+
+
+def test_definite_length_block():
+    assert definite_length_block('HELLO') == '#15HELLO'
+    assert definite_length_block('x' * 12) == '#212' + 'x' * 12
+
+
+class TestMacroRecording(object):
+    def test_record_and_replay(self):
+        transport = MacroTransport()
+        device = Device(transport)
+        with device.record_macro('CYCLE') as cycle:
+            device.voltage = 1.5
+            device.increment()
+            assert device.count is None
+            device.voltage
+        assert transport.messages == [
+            '*DMC "CYCLE",#225VOLT 1.5;INC;COUNT?;VOLT?'
+        ]
+        assert transport.macros['CYCLE'] == 'VOLT 1.5;INC;COUNT?;VOLT?'
+        # Nothing was executed while recording.
+        assert transport.state['COUNT'] == '0'
+
+        assert cycle() == [1, 1.5]
+        assert cycle() == [2, 1.5]
+        assert transport.messages[-1] == 'CYCLE'
+
+    def test_replay_without_queries(self):
+        transport = MacroTransport()
+        device = Device(transport)
+        with device.record_macro('ARM') as arm:
+            device.increment()
+            device.increment()
+        assert arm() is None
+        assert transport.state['COUNT'] == '2'
+
+    def test_failing_recording_is_not_defined(self):
+        transport = MacroTransport()
+        device = Device(transport)
+        with pytest.raises(RuntimeError):
+            with device.record_macro('FAIL'):
+                device.increment()
+                raise RuntimeError()
+        assert transport.messages == []
+        # The recording is no longer active.
+        device.increment()
+        assert transport.state['COUNT'] == '1'
+
+    def test_invalid_label(self):
+        device = Device(MacroTransport())
+        with pytest.raises(ValueError):
+            device.record_macro('1ABC')
+        with pytest.raises(ValueError):
+            device.record_macro('A' * 13)
+
+    def test_other_transports_are_not_recorded(self):
+        transport, other = MacroTransport(), MacroTransport()
+        device, other_device = Device(transport), Device(other)
+        with Recording(transport) as recording:
+            other_device.voltage = 2.
+        assert recording.units == []
+        assert other.state['VOLT'] == '2.0'
+
+    def test_with_simulated_transport(self):
+        device = Device(SimulatedTransport())
+        with device.record_macro('SIM') as sim:
+            device.voltage = 1.
+        assert sim() is None
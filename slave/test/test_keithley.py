@@ -6,8 +6,11 @@ from __future__ import (absolute_import, division,
 from future.builtins import *
 import collections
 
+import numpy as np
+import pytest
+
 from slave.keithley import K2182, K6221
-from slave.transport import SimulatedTransport
+from slave.transport import SimulatedTransport, Timeout, Transport
 
 
 def test_K2182():
@@ -18,3 +21,133 @@ def test_K2182():
 def test_K6221():
     # Test if instantiation fails
     K6221(SimulatedTransport())
+
+
+class MockTransport(Transport):
+    def __init__(self, responses=[]):
+        self.responses = collections.deque(responses)
+        self.messages = collections.deque()
+        super(MockTransport, self).__init__()
+
+    def __write__(self, data):
+        self.messages.append(data)
+
+    def __read__(self, num_bytes):
+        # None emulates a response, which did not arrive in time.
+        if not self.responses or self.responses[0] is None:
+            if self.responses:
+                self.responses.popleft()
+            raise Timeout()
+        return self.responses.popleft()
+
+
+class TestSourceWaveArbitrary(object):
+    def test_upload_in_chunks(self):
+        transport = MockTransport()
+        arbitrary = K6221(transport).source.wave.arbitrary
+        points = np.linspace(-1, 1, 250)
+        arbitrary.upload(points)
+        messages = [m.decode('ascii') for m in transport.messages]
+        assert len(messages) == 3
+        assert messages[0].startswith(':SOUR:WAVE:ARB:DATA -1,')
+        assert messages[1].startswith(':SOUR:WAVE:ARB:APPEND ')
+        assert messages[2].count(',') == 49
+        assert arbitrary[-1] == 1.
+
+    def test_invalid_points(self):
+        arbitrary = K6221(MockTransport()).source.wave.arbitrary
+        with pytest.raises(ValueError):
+            arbitrary.upload([0., 1.5])
+        with pytest.raises(ValueError):
+            arbitrary.upload(np.zeros(arbitrary.MAX_POINTS + 1))
+
+    def test_update_without_readback(self):
+        transport = MockTransport([b'0,0.5,1\n'])
+        arbitrary = K6221(transport).source.wave.arbitrary
+        arbitrary.update(1, [-0.5])
+        assert list(transport.messages) == [
+            b':SOUR:WAVE:ARB:DATA?\n', b':SOUR:WAVE:ARB:DATA 0,-0.5,1\n'
+        ]
+        arbitrary[0] = 0.25
+        assert transport.messages[-1] == b':SOUR:WAVE:ARB:DATA 0.25,-0.5,1\n'
+
+
+class TestSourceList(object):
+    def test_load(self):
+        transport = MockTransport([b'300;300;300\n'])
+        source_list = K6221(transport).source.list
+        source_list.MAX_LENGTH = 256
+        source_list.load(np.linspace(-1e-3, 1e-3, 300), 1e-3, 0.1)
+        messages = [m.decode('ascii') for m in transport.messages]
+        assert messages[-1] == (':SOUR:LIST:CURR:POIN?;:SOUR:LIST:DEL:POIN?;'
+                                ':SOUR:LIST:COMP:POIN?\n')
+        assert all(len(m) <= 257 for m in messages)
+        commands = ';'.join(m.rstrip('\n') for m in messages[:-1]).split(';')
+        assert commands[0].startswith(':SOUR:LIST:CURR -0.001,')
+        assert sum(c.count(',') + 1 for c in commands) == 900
+        assert sum(c.startswith(':SOUR:LIST:DEL ') for c in commands) == 1
+
+    def test_failed_verification(self):
+        source_list = K6221(MockTransport([b'2\n'])).source.list
+        with pytest.raises(RuntimeError):
+            source_list.load([0., 1e-3, 2e-3])
+
+    def test_invalid_range(self):
+        source_list = K6221(MockTransport()).source.list
+        with pytest.raises(ValueError):
+            source_list.load([0., 1.])
+
+    def test_compliance_range(self):
+        transport = MockTransport([b'2;2\n'])
+        source_list = K6221(transport).source.list
+        # The compliance is a voltage.
+        source_list.load([0., 1e-3], compliances=10.)
+        assert transport.messages[0] == (
+            b':SOUR:LIST:CURR 0,0.001;:SOUR:LIST:COMP 10,10\n')
+        for compliance in (0.01, 110.):
+            with pytest.raises(ValueError):
+                source_list.load([0., 1e-3], compliances=compliance)
+
+
+class TestMediatorProtocol(object):
+    def test_batched_writes(self):
+        transport = MockTransport()
+        k2182 = K6221(transport).system.communicate.serial.k2182
+        with k2182.batch():
+            k2182.sample_count = 10
+            k2182.trace.points = 10
+            assert not transport.messages
+        assert list(transport.messages) == [
+            b'SYST:COMM:SER:SEND ":SAMP:COUN 10;:TRAC:POIN 10\n"\n'
+        ]
+
+    def test_query_sends_pending_writes(self):
+        transport = MockTransport([b'1\n\n'])
+        k2182 = K6221(transport).system.communicate.serial.k2182
+        with k2182.batch():
+            k2182.sample_count = 10
+            assert k2182.sample_count == 1
+        assert list(transport.messages) == [
+            b'SYST:COMM:SER:SEND ":SAMP:COUN 10;:SAMP:COUN?\n"\n;'
+            b'SYST:COMM:SER:ENT?\n'
+        ]
+
+    def test_partial_response_is_polled(self):
+        transport = MockTransport([
+            b'+1.0E-06,+2.0E\n', None, b'\n', None, b'-06\n\n'
+        ])
+        k2182 = K6221(transport).system.communicate.serial.k2182
+        k2182._protocol.poll_delay = 0.
+        data = k2182.trace.data()
+        np.testing.assert_array_equal(data, [1e-6, 2e-6])
+        assert list(transport.messages)[1:] == [b'SYST:COMM:SER:ENT?\n'] * 2
+        assert not transport.responses
+
+    def test_split_terminators_stay_in_step(self):
+        # The second terminator arrives in a separate read.
+        transport = MockTransport([b'+1.0E-06\n', b'\n', b'2\n', b'\n'])
+        k2182 = K6221(transport).system.communicate.serial.k2182
+        np.testing.assert_array_equal(k2182.trace.data(), [1e-6])
+        assert k2182.sample_count == 2
+        assert len(transport.messages) == 2
+        assert not transport.responses
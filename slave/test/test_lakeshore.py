@@ -4,9 +4,16 @@
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 from future.builtins import *
+import collections
+
+import numpy as np
 
 from slave.lakeshore import LS340, LS370
-from slave.transport import SimulatedTransport
+from slave.lakeshore.curve import Calibration, CurveCache, read_340
+from slave.lakeshore.ls370 import Curve
+from slave.lakeshore.scanner import ScanScheduler
+from slave.protocol import IEC60488
+from slave.transport import SimulatedTransport, Transport
 
 
 def test_ls340():
@@ -17,3 +24,115 @@ def test_ls340():
 def test_ls370():
     # Test if instantiation fails
     LS370(SimulatedTransport())
+
+
+class MockTransport(Transport):
+    def __init__(self, responses=[]):
+        self.responses = collections.deque(responses)
+        self.messages = collections.deque()
+        super(MockTransport, self).__init__()
+
+    def __write__(self, data):
+        self.messages.append(data)
+
+    def __read__(self, num_bytes):
+        return self.responses.popleft()
+
+
+class TestCurveTransfer(object):
+    def curve(self, responses=[]):
+        curve = Curve(MockTransport(responses), IEC60488(), 21, 4)
+        curve.chunk_size = 2
+        return curve
+
+    def test_read(self):
+        curve = self.curve([b'1.0,10.0;2.0,20.0\n', b'3.0,30.0;0,0\n'])
+        np.testing.assert_array_equal(curve.read(), [[1., 10.], [2., 20.], [3., 30.]])
+        assert list(curve._transport.messages) == [
+            b'CRVPT? 21,1;CRVPT? 21,2\n', b'CRVPT? 21,3;CRVPT? 21,4\n'
+        ]
+
+    def test_slice(self):
+        curve = self.curve([b'1.0,10.0;3.0,30.0\n'])
+        assert curve[::2] == [[1., 10.], [3., 30.]]
+
+    def test_write_only_changed_points(self):
+        curve = self.curve([b'1.0,10.0;2.0,20.0\n', b'3.0,30.0;4.0,40.0\n'])
+        assert curve.write([(1., 10.), (2.5, 20.)]) == 3
+        assert list(curve._transport.messages)[2:] == [
+            b'CRVPT 21,2,2.5,20.0;CRVPT 21,3,0.0,0.0\n',
+            b'CRVPT 21,4,0.0,0.0\n',
+        ]
+
+    def test_read_340(self, tmpdir):
+        path = tmpdir.join('X12345.340')
+        path.write(CURVE_FILE)
+        header, points = read_340(str(path))
+        assert header == ('RX-102A-AA', 'X12345', 'logOhm/K', 40., 'negative')
+        np.testing.assert_array_equal(points, [[3.0, 40.], [3.5, 1.5]])
+
+
+CURVE_FILE = """Sensor Model:   RX-102A-AA
+Serial Number:  X12345
+Data Format:    4      (Log Ohms/Kelvin)
+SetPoint Limit: 40.      (Kelvin)
+Temperature coefficient:  1 (Negative)
+Number of Breakpoints:   2
+
+No.   Units      Temperature (K)
+
+  1  3.0       40.0
+  2  3.5       1.5
+"""
+
+
+class TestCalibration(object):
+    def test_linear_format(self):
+        calibration = Calibration(
+            ('', '', 'Ohm/K', 300., 'negative'), [(200., 1.), (100., 10.)])
+        np.testing.assert_allclose(
+            calibration.kelvin([150., 100., 300.]), [5.5, 10., np.nan])
+
+    def test_logarithmic_format(self):
+        calibration = Calibration(
+            ('', '', 'logOhm/logK', 300., 'negative'), [(2., 0.), (3., 1.)])
+        np.testing.assert_allclose(calibration.kelvin(10 ** 2.5), 10 ** 0.5)
+
+    def test_cache(self, tmpdir):
+        curve = Curve(SimulatedTransport(), IEC60488(), 1, 4)
+        cache = CurveCache(str(tmpdir))
+        header = ['RX-102A-AA', 'X12345', 'logOhm/K', 40., 'negative']
+        curve.header = header
+        calibration = Calibration(header, [(3., 40.), (3.5, 1.5)])
+        path = cache.path('1234', header)
+        calibration.save(path)
+        assert cache.get(curve, '1234').header == tuple(header)
+        np.testing.assert_array_equal(
+            Calibration.from_file(path).points, calibration.points)
+
+
+class TestScanScheduler(object):
+    def test_poll(self):
+        clock = [0.]
+        transport = MockTransport([b'+1.5E+0;+2.0E+3;000\n', b'+2.5E+0;+3.0E+3;016\n'])
+        ls370 = LS370(transport, scanner='3716')
+        scheduler = ScanScheduler(
+            ls370, {0: (1., 2, 3.), 1: (1., 1, 3.)}, timer=lambda: clock[0])
+        assert scheduler.poll() is None
+        clock[0] = 2.
+        assert scheduler.poll() is None
+        clock[0] = 4.
+        assert scheduler.poll() == (0, 4., 1.5, 2000., 0)
+        clock[0] = 8.
+        assert scheduler.poll() == (1, 8., 2.5, 3000., 16)
+        assert list(transport.messages) == [
+            b'SCAN 1,0\n', b'RDGK? 1;RDGR? 1;RDGST? 1\n', b'SCAN 2,0\n',
+            b'RDGK? 2;RDGR? 2;RDGST? 2\n', b'SCAN 1,0\n',
+        ]
+        assert scheduler.rate == {0: 1 / 8., 1: 1 / 8.}
+        np.testing.assert_array_equal(scheduler.buffer.read()['channel'], [0, 1])
+
+    def test_priority(self):
+        ls370 = LS370(SimulatedTransport(), scanner='3716')
+        scheduler = ScanScheduler(ls370, {0: (0, 2, 0), 1: (0, 1, 0)})
+        assert [scheduler._next() for _ in range(6)] == [0, 1, 0, 0, 1, 0]
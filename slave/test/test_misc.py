@@ -5,9 +5,11 @@ from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 from future.builtins import *
 import os
+import numpy as np
 import pytest
 from slave.misc import (index, ForwardSequence, range_to_numeric, AutoRange,
-                        Measurement, LockInMeasurement, wrap_exception)
+                        Measurement, LockInMeasurement, RingBuffer,
+                        wrap_exception)
 
 
 class TestIndex(object):
@@ -87,6 +89,37 @@ class TestAutoRange(object):
         with pytest.raises(ValueError):
             AutoRange([1e-6, 1e-3, 1], names=['1 mV', '1 V'])
 
+    def test_hysteresis(self):
+        auto = AutoRange([1e-6, 1e-3, 1.], buffer_len=1, down=0.5)
+        assert auto.range(1.2e-6) == 1e-3
+        # Below the range boundary, but within the hysteresis.
+        assert auto.range(0.9e-6) == 1e-3
+        assert auto.range(0.4e-6) == 1e-6
+
+    def test_overload(self):
+        auto = AutoRange([1e-6, 1e-3, 1.], buffer_len=3)
+        auto.current = 1e-6
+        assert auto.range(0.5e-6, overload=True) == 1e-3
+        assert auto.mean == 0.
+        assert auto.range(0.5e-6) == 1e-6
+
+
+class TestRingBuffer(object):
+    def test_overwrites_oldest_records(self):
+        buffer = RingBuffer(3, [('x', 'i4')])
+        for x in range(5):
+            buffer.append((x,))
+        assert len(buffer) == 3
+        assert buffer.dropped == 2
+        np.testing.assert_array_equal(buffer.read()['x'], [2, 3, 4])
+        np.testing.assert_array_equal(buffer.read(2)['x'], [3, 4])
+
+    def test_clear(self):
+        buffer = RingBuffer(3, float)
+        buffer.append(1.)
+        buffer.clear()
+        assert len(buffer) == 0
+
 
 class TestMeasurement(object):
     def test_calling(self, tmpdir):
@@ -160,6 +193,54 @@ class TestLockInMeasurement(object):
         assert path.read() == 'X1,Y1,ENV\n1.3,1.4,env\n'
         assert lockins[0].sensitivity == 1.
 
+    def test_sensitivity_is_cached(self, tmpdir):
+        class CountingLockIn(MockLockIn):
+            reads = 0
+
+            def __getattribute__(self, name):
+                if name == 'sensitivity':
+                    type(self).reads += 1
+                return object.__getattribute__(self, name)
+
+        path = tmpdir.join('data.csv')
+        lockins = [CountingLockIn(1.3, 1.4, [1e-6, 1e-3, 1.])]
+        with LockInMeasurement(str(path), lockins, autorange=True) as measure:
+            measure()
+            measure()
+        assert CountingLockIn.reads == 1
+        assert lockins[0].sensitivity == 1.
+
+    def test_overload_byte_selects_larger_sensitivity(self, tmpdir):
+        class Protocol(object):
+            olb_callback = None
+
+        class OverloadLockIn(MockLockIn):
+            _protocol = Protocol()
+
+            def snap(self, *args):
+                # x1 overload
+                self._protocol.olb_callback(0x01)
+                return [0.5e-6, 0.]
+
+        path = tmpdir.join('data.csv')
+        lockin = OverloadLockIn(0., 0., [1e-6, 1e-3, 1.])
+        with LockInMeasurement(str(path), [lockin]) as measure:
+            measure()
+        assert lockin.sensitivity == 1e-3
+        assert OverloadLockIn._protocol.olb_callback is None
+
+    def test_uses_snap(self, tmpdir):
+        class SnapLockIn(MockLockIn):
+            def snap(self, *args):
+                assert args == ('x', 'y')
+                return [2.3, 2.4]
+
+        path = tmpdir.join('data.csv')
+        lockins = [SnapLockIn(1.3, 1.4, [1.])]
+        with LockInMeasurement(str(path), lockins, names=['X1', 'Y1'], autorange=False) as measure:
+            measure()
+        assert path.read() == 'X1,Y1\n2.3,2.4\n'
+
 
 def test_wrap_exception():
     @wrap_exception(exc=ValueError, new_exc=TypeError)
@@ -0,0 +1,262 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+import collections
+
+import numpy as np
+import pytest
+
+from slave.oxford import IPS120, ITC503, IsobusBus
+from slave.oxford.isobus import StatusCache
+from slave.ramp import Poller
+from slave.protocol import OxfordIsobus
+from slave.transport import SimulatedTransport, Transport, Timeout
+
+
+class MockTransport(Transport):
+    def __init__(self, responses=[]):
+        self.responses = collections.deque(responses)
+        self.messages = collections.deque()
+        super(MockTransport, self).__init__()
+
+    def __write__(self, data):
+        self.messages.append(data)
+
+    def __read__(self, num_bytes):
+        if not self.responses:
+            raise Timeout()
+        return self.responses.popleft()
+
+
+def test_ips120():
+    # Test if instantiation fails
+    IPS120(SimulatedTransport(), address=2)
+
+
+def test_itc503():
+    # Test if instantiation fails
+    ITC503(SimulatedTransport(), address=1)
+
+
+class TestIsobusBus(object):
+    def test_query_with_multiple_addresses(self):
+        transport = MockTransport(responses=[b'R1.5\r', b'R7\r'])
+        bus = IsobusBus(transport)
+        assert OxfordIsobus(address=1).query(bus, 'R1') == ['1.5']
+        assert OxfordIsobus(address=2).query(bus, 'R7') == ['7']
+        assert list(transport.messages) == [b'@1R1\r', b'@2R7\r']
+        assert bus.statistics[1].requests == 1
+        assert bus.statistics[2].requests == 1
+        assert bus.statistics[2].error_rate == 0.
+
+    def test_error_response_is_counted(self):
+        transport = MockTransport(responses=[b'?R1\r'] * 3)
+        bus = IsobusBus(transport)
+        with pytest.raises(OxfordIsobus.InvalidRequestError):
+            OxfordIsobus(address=1).query(bus, 'R1')
+        assert bus.statistics[1].requests == 3
+        assert bus.statistics[1].error_rate == 1.
+
+    def test_stale_bytes_are_discarded_after_error(self):
+        transport = MockTransport(responses=[b'R1'])
+        bus = IsobusBus(transport)
+        with pytest.raises(Timeout):
+            with bus:
+                bus.write(b'@1R1\r')
+                bus.read_until(b'\r')
+        assert not bus._buffer
+        assert bus.statistics[1].errors == 1
+
+    def test_late_bytes_are_drained_after_error(self):
+        transport = MockTransport(responses=[b'R1', b'.5\r'])
+        bus = IsobusBus(transport)
+        with pytest.raises(Timeout):
+            with bus:
+                bus.write(b'@1R1\r')
+                # The answer arrives after the transaction failed.
+                raise Timeout()
+        assert not transport.responses
+        transport.responses.append(b'R7\r')
+        assert OxfordIsobus(address=1).query(bus, 'R7') == ['7']
+
+    def test_pipelined_writes_are_sent_with_next_query(self):
+        transport = MockTransport(responses=[b'R1.5\r'])
+        bus = IsobusBus(transport, pipeline=True)
+        with bus:
+            bus.write(b'$@1T1.0\r')
+            bus.write(b'$@2J0.5\r')
+            assert not transport.messages
+            bus.write(b'@1R1\r')
+            assert bus.read_until(b'\r') == b'R1.5'
+        assert list(transport.messages) == [b'$@1T1.0\r$@2J0.5\r@1R1\r']
+
+    def test_pipelined_writes_are_flushed_on_idle_bus(self):
+        transport = MockTransport()
+        bus = IsobusBus(transport, pipeline=True)
+        OxfordIsobus(address=1, echo=False).write(bus, 'T', '1.0')
+        assert list(transport.messages) == [b'$@1T1.0\r']
+
+
+class TableDevice(Transport):
+    """Emulates the table pointer commands of the ITC503."""
+    def __init__(self, shape):
+        super(TableDevice, self).__init__()
+        self.table = np.zeros(shape)
+        self.pointer = [1, 1]
+        self.messages = []
+
+    def __write__(self, data):
+        message = data.decode('ascii').rstrip('\r')
+        self.messages.append(message)
+        header, value = message[0], message[1:]
+        if header in 'xy':
+            self.pointer['xy'.index(header)] = int(value)
+            response = header
+        elif header in 'ps':
+            self.table[self.pointer[0] - 1, self.pointer[1] - 1] = float(value)
+            response = header
+        else:
+            response = header + str(self.table[self.pointer[0] - 1, self.pointer[1] - 1])
+        self._buffer.extend((response + '\r').encode('ascii'))
+
+    def __read__(self, num_bytes):
+        raise Timeout()
+
+
+class TestTable(object):
+    def test_unchanged_pointers_are_not_written(self):
+        device = TableDevice((32, 4))
+        itc = ITC503(device)
+        itc.pid_table[0] = 1., 2., 3., 4.
+        assert device.messages == [
+            'x1', 'y1', 'p1.0', 'y2', 'p2.0', 'y3', 'p3.0', 'y4', 'p4.0'
+        ]
+        assert itc.pid_table[0, 3] == 4.
+        assert device.messages[-1] == 'q'
+
+    def test_tables_share_pointers(self):
+        device = TableDevice((32, 4))
+        device.table[0, 0], device.table[2, 2] = 7., 9.
+        itc = ITC503(device)
+        assert itc.pid_table[0, 0] == 7.
+        assert itc.sweep_table[2, 2] == 9.
+        assert itc.pid_table[0, 0] == 7.
+        itc.sweep_table[0, 1] = 3.
+        assert itc.pid_table[0, 1] == 3.
+        assert device.messages[-3:] == ['y2', 's3.0', 'q']
+
+    def test_failed_transfer_invalidates_pointers(self):
+        device = TableDevice((32, 4))
+        itc = ITC503(device)
+        itc.pid_table[0, 0] = 1.
+        with pytest.raises(ValueError):
+            itc.sweep_table[0, 0] = 'invalid'
+        del device.messages[:]
+        assert itc.pid_table[0, 0] == 1.
+        assert device.messages == ['x1', 'y1', 'q']
+
+    def test_read(self):
+        device = TableDevice((16, 3))
+        device.table[1, 2] = 5.
+        table = ITC503(device).sweep_table.read()
+        np.testing.assert_array_equal(table, device.table)
+        # One x pointer write per row, one y pointer write and read per cell.
+        assert len(device.messages) == 16 + 2 * 16 * 3
+
+    def test_diff_write(self):
+        device = TableDevice((16, 3))
+        itc = ITC503(device)
+        table = np.zeros((2, 3))
+        table[1] = 3., 2., 1.
+        assert itc.sweep_table.write(table) == 3
+        np.testing.assert_array_equal(device.table[:2], table)
+        del device.messages[:]
+        assert itc.sweep_table.write(table) == 0
+        assert not any(m.startswith('s') for m in device.messages)
+
+
+class TestStatusCache(object):
+    def test_status_is_reused_until_too_old(self):
+        now = [0.]
+        values = iter(range(10))
+        cache = StatusCache(lambda: next(values), max_age=1., timer=lambda: now[0])
+        assert cache.get() == 0
+        now[0] = 0.5
+        assert cache.get() == 0
+        now[0] = 1.6
+        assert cache.get() == 1
+        assert cache.refresh() == 2
+        cache.invalidate()
+        assert cache.get() == 3
+
+    def test_without_max_age(self):
+        values = iter(range(10))
+        cache = StatusCache(lambda: next(values), max_age=0)
+        assert cache.get() == 0
+        assert cache.get() == 1
+
+
+class TestIPS120Status(object):
+    def test_derived_properties_share_status(self):
+        transport = MockTransport(responses=[b'X00A1C3H1M10P03\r'])
+        ips = IPS120(transport, address=None, max_age=10.)
+        assert ips.activity == 'to setpoint'
+        assert ips.access_mode == 'remote unlocked'
+        assert ips.status['mode'] == 'at rest'
+        assert list(transport.messages) == [b'X\r']
+
+    def test_write_invalidates_status(self):
+        transport = MockTransport(responses=[
+            b'X00A1C3H1M10P03\r', b'A\r', b'X00A0C3H1M10P03\r'
+        ])
+        ips = IPS120(transport, address=None, max_age=10.)
+        assert ips.activity == 'to setpoint'
+        ips.activity = 'hold'
+        assert ips.activity == 'hold'
+
+    def test_poll(self):
+        transport = MockTransport(responses=[
+            b'X00A1C3H1M11P03\r', b'R1.5\r', b'R20.1\r'
+        ])
+        ips = IPS120(transport, address=None, max_age=10.)
+        result = ips.poll()
+        assert result['status']['mode'] == 'sweeping'
+        assert result['field'] == 1.5
+        assert result['current'] == 20.1
+        assert list(transport.messages) == [b'X\r', b'R7\r', b'R2\r']
+        # The polled status is cached.
+        assert ips.status['mode'] == 'sweeping'
+
+    def test_ramp_field(self):
+        transport = MockTransport(responses=[
+            b'R0.5\r', b'J\r', b'T\r', b'A\r', b'X00A1C3H1M10P03\r',
+            b'X00A1C3H1M11P03\r', b'X00A1C3H1M10P03\r',
+        ])
+        ips = IPS120(transport, address=None)
+        poller = Poller(autostart=False)
+        ramp = ips.ramp_field(1., 0.5, poller=poller)
+        assert ramp.duration == 60.
+        # The sweep did not start yet.
+        poller.tick()
+        assert not ramp.done()
+        poller.tick()
+        assert not ramp.done()
+        poller.tick()
+        assert ramp.done()
+        assert list(transport.messages)[:4] == [
+            b'R7\r', b'J1.00000\r', b'T0.5000\r', b'A1\r'
+        ]
+
+
+class TestITC503Status(object):
+    def test_poll_reads_control_sensor_temperature(self):
+        transport = MockTransport(responses=[b'X0A0C3S0H2L1\r', b'R4.2\r'])
+        itc = ITC503(transport, max_age=10.)
+        result = itc.poll()
+        assert result['temperature'] == 4.2
+        assert result['status']['auto_pid'] is True
+        assert itc.control_sensor == 2
+        assert list(transport.messages) == [b'X\r', b'R2\r']
@@ -8,8 +8,9 @@ import collections
 
 import pytest
 
-from slave.protocol import IEC60488, OxfordIsobus, Protocol, SignalRecovery
-from slave.transport import Transport
+from slave.protocol import (IEC60488, OxfordIsobus, Protocol, RetryPolicy,
+                            SignalRecovery)
+from slave.transport import Timeout, Transport
 
 
 class MockTransport(Transport):
@@ -177,3 +178,88 @@ class TestOxfordIsobus(object):
         protocol = OxfordIsobus(address=7)
         assert protocol.query(transport, 'R10') == ['1337']
         assert transport.messages[0] == b'@7R10\r'
+
+
+class FailingCall(object):
+    def __init__(self, failures, error=Timeout):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def __call__(self, protocol, transport):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error()
+        return 'RESULT'
+
+
+class MockProtocol(object):
+    def __init__(self):
+        self.cleared = 0
+
+    def clear(self, transport):
+        self.cleared += 1
+
+
+class TestRetryPolicy(object):
+    def test_success_after_failures(self):
+        policy = RetryPolicy(attempts=3, backoff=0.)
+        fn, protocol = FailingCall(failures=2), MockProtocol()
+        assert policy(fn, protocol, MockTransport()) == 'RESULT'
+        assert fn.calls == 3
+        assert protocol.cleared == 2
+
+    def test_attempts_exhausted(self):
+        policy = RetryPolicy(attempts=2, backoff=0.)
+        fn = FailingCall(failures=2)
+        with pytest.raises(Timeout):
+            policy(fn, MockProtocol(), MockTransport())
+        assert fn.calls == 2
+
+    def test_unhandled_errors_are_not_retried(self):
+        policy = RetryPolicy(attempts=3, backoff=0.)
+        fn = FailingCall(failures=1, error=KeyError)
+        with pytest.raises(KeyError):
+            policy(fn, MockProtocol(), MockTransport())
+        assert fn.calls == 1
+
+    def test_deadline(self):
+        policy = RetryPolicy(attempts=10, backoff=1., deadline=0.5)
+        fn = FailingCall(failures=10)
+        with pytest.raises(Timeout):
+            policy(fn, MockProtocol(), MockTransport())
+        assert fn.calls == 1
+
+    def test_resync_action(self):
+        policy = RetryPolicy(attempts=2, backoff=0.)
+        transport = MockTransport()
+        transport._buffer.extend(b'STALE')
+        fn = FailingCall(failures=1, error=Protocol.ParsingError)
+        assert policy(fn, MockProtocol(), transport) == 'RESULT'
+        assert not transport._buffer
+
+    def test_circuit_breaker(self):
+        policy = RetryPolicy(attempts=2, backoff=0., failure_threshold=1,
+                             reset_timeout=60.)
+        fn = FailingCall(failures=2)
+        with pytest.raises(Timeout):
+            policy(fn, MockProtocol(), MockTransport())
+        with pytest.raises(RetryPolicy.CircuitOpenError):
+            policy(fn, MockProtocol(), MockTransport())
+        assert fn.calls == 2
+
+    def test_half_open_circuit_closes_on_success(self):
+        policy = RetryPolicy(attempts=2, backoff=0., failure_threshold=1,
+                             reset_timeout=0.)
+        fn = FailingCall(failures=2)
+        with pytest.raises(Timeout):
+            policy(fn, MockProtocol(), MockTransport())
+        assert policy(fn, MockProtocol(), MockTransport()) == 'RESULT'
+        assert policy._opened is None
+
+    def test_protocol_uses_policy(self):
+        policy = RetryPolicy(attempts=1)
+        protocol = IEC60488(retry=policy)
+        transport = MockTransport(responses=[b'DATA\n'])
+        assert protocol.query(transport, 'HEADER') == ['DATA']
+        assert protocol.retry is policy
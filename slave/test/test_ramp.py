@@ -0,0 +1,136 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+
+import pytest
+
+from slave.ramp import Poller, Ramp, duration
+
+
+class Status(object):
+    def __init__(self, values):
+        self.values = list(values)
+        self.queries = 0
+
+    def __call__(self):
+        self.queries += 1
+        return self.values.pop(0)
+
+
+def test_duration():
+    assert duration(0., 10., 5.) == 120.
+    assert duration(10., 0., -5.) == 120.
+    assert duration(0., 10., 0.) is None
+
+
+class TestRamp(object):
+    def test_progress(self):
+        now = [0.]
+        ramp = Ramp(None, None, lambda s: now[0] >= 10., duration=10.,
+                    timer=lambda: now[0])
+        assert ramp.progress == 0.
+        now[0] = 5.
+        assert ramp.progress == 0.5
+        ramp.step(None)
+        assert not ramp.done()
+        now[0] = 10.
+        ramp.step(None)
+        assert ramp.done()
+        assert ramp.wait(0.)
+        assert ramp.progress == 1.
+
+    def test_unknown_progress(self):
+        ramp = Ramp(None, None, lambda s: False)
+        assert ramp.progress is None
+        assert not ramp.wait(0.001)
+
+    def test_holdoff(self):
+        now = [0.]
+        ramp = Ramp(None, None, lambda s: True, holdoff=10.,
+                    timer=lambda: now[0])
+        ramp.step(None)
+        assert not ramp.done()
+        now[0] = 10.
+        ramp.step(None)
+        assert ramp.done()
+
+    def test_idle_status_is_ignored_until_started(self):
+        now = [0.]
+        ramp = Ramp(None, None, lambda s: s == 'idle', holdoff=10.,
+                    started=lambda s: s != 'idle', timer=lambda: now[0])
+        ramp.step('idle')
+        assert not ramp.done()
+        ramp.step('sweeping')
+        assert not ramp.done()
+        ramp.step('idle')
+        assert ramp.done()
+
+    def test_idle_status_counts_after_holdoff(self):
+        now = [0.]
+        ramp = Ramp(None, None, lambda s: s == 'idle', holdoff=10.,
+                    started=lambda s: s != 'idle', timer=lambda: now[0])
+        ramp.step('idle')
+        now[0] = 10.
+        ramp.step('idle')
+        assert ramp.done()
+
+    def test_cancel(self):
+        cancelled = []
+        ramp = Ramp(None, None, lambda s: False,
+                    cancel=lambda: cancelled.append(True))
+        assert ramp.cancel()
+        assert ramp.done() and ramp.cancelled()
+        assert cancelled == [True]
+        assert not ramp.cancel()
+
+    def test_failing_update(self):
+        def update(status):
+            raise RuntimeError()
+        ramp = Ramp(None, None, update)
+        ramp.step(None)
+        assert ramp.done()
+        assert isinstance(ramp.exception(), RuntimeError)
+
+
+class TestPoller(object):
+    def test_ramps_share_status_query(self):
+        status = Status([
+            {'field': 'sweeping', 'temperature': 'tracking'},
+            {'field': 'stable', 'temperature': 'tracking'},
+            {'field': 'stable', 'temperature': 'stable'},
+        ])
+        poller = Poller(autostart=False)
+        field = poller.add(Ramp('ppms', status,
+                                lambda s: s['field'] == 'stable'))
+        temperature = poller.add(Ramp('ppms', status,
+                                      lambda s: s['temperature'] == 'stable'))
+        assert poller.tick() == 1
+        assert not field.done()
+        poller.tick()
+        assert field.done() and not temperature.done()
+        poller.tick()
+        assert temperature.done()
+        assert status.queries == 3
+        assert poller.tick() == 0
+        assert poller.ramps == []
+
+    def test_failing_query_fails_ramps(self):
+        def query():
+            raise IOError()
+        poller = Poller(autostart=False)
+        ramp = poller.add(Ramp('key', query, lambda s: False))
+        poller.tick()
+        assert ramp.done()
+        assert isinstance(ramp.exception(), IOError)
+
+    def test_background_thread(self):
+        status = Status([False, False, True])
+        poller = Poller(interval=0.001)
+        ramp = poller.add(Ramp('key', status, lambda s: s))
+        assert ramp.wait(5.)
+        assert ramp.exception() is None
+        poller._thread is None or poller._thread.join(5.)
+        assert poller._thread is None
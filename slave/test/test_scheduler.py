@@ -0,0 +1,87 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+import collections
+import threading
+import time
+
+import pytest
+
+from slave.scheduler import Scheduler, chunks
+from slave.srs import SR830
+from slave.transport import Transport
+
+
+class MockTransport(Transport):
+    def __init__(self, responses=[]):
+        self.responses = collections.deque(responses)
+        self.messages = collections.deque()
+        super(MockTransport, self).__init__()
+
+    def __write__(self, data):
+        self.messages.append(data)
+
+    def __read__(self, num_bytes):
+        return self.responses.popleft()
+
+
+class TestChunks(object):
+    def test_with_remainder(self):
+        assert list(chunks(10, 5, 2)) == [(10, 2), (12, 2), (14, 1)]
+
+    def test_without_size(self):
+        assert list(chunks(0, 5, None)) == [(0, 5)]
+
+    def test_with_invalid_size(self):
+        with pytest.raises(ValueError):
+            list(chunks(0, 5, 0))
+
+
+class TestScheduler(object):
+    def test_installs_itself_as_lock(self):
+        transport = MockTransport()
+        scheduler = Scheduler(transport)
+        assert transport.lock is scheduler
+
+    def test_high_priority_is_served_first(self):
+        transport = MockTransport()
+        scheduler = Scheduler(transport)
+        order = []
+
+        def request(priority, name):
+            with scheduler.priority(priority):
+                with transport:
+                    order.append(name)
+
+        threads = [
+            threading.Thread(target=request, args=(Scheduler.LOW, 'low')),
+            threading.Thread(target=request, args=(Scheduler.HIGH, 'high')),
+        ]
+        with transport:
+            for thread in threads:
+                thread.start()
+            # Wait until both requests are queued.
+            while len(scheduler._queue) < 2:
+                time.sleep(0.001)
+        for thread in threads:
+            thread.join()
+        assert order == ['high', 'low']
+        assert scheduler.statistics[Scheduler.HIGH].requests == 1
+        assert scheduler.statistics[Scheduler.LOW].requests == 1
+        assert scheduler.statistics[Scheduler.NORMAL].requests == 1
+
+    def test_priority_is_restored(self):
+        scheduler = Scheduler(MockTransport())
+        with scheduler.priority(Scheduler.HIGH):
+            assert scheduler._local.priority == Scheduler.HIGH
+        assert scheduler._local.priority == Scheduler.NORMAL
+
+
+def test_sr830_trace_is_read_in_chunks():
+    transport = MockTransport(responses=[b'1.0,2.0,\n', b'3.0,\n'])
+    lockin = SR830(transport)
+    assert lockin.trace(1, 0, 3, chunk_size=2) == [1., 2., 3.]
+    assert list(transport.messages) == [b'TRCA? 1,0,2\n', b'TRCA? 1,2,1\n']
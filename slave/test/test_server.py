@@ -0,0 +1,229 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+import socket
+import threading
+import time
+
+import pytest
+
+from slave.driver import Command, Driver
+from slave.protocol import IEC60488
+from slave.server import Client, Server
+from slave.transport import Timeout, Transport
+from slave.types import Float, Integer
+
+
+class DeviceTransport(Transport):
+    """Emulates a device answering each query with the queried value."""
+    def __init__(self):
+        self.state = {'VOLT': '0.0', 'STAT': '0', 'BLK': 'X'}
+        self.messages = []
+        self._response = bytearray()
+        super(DeviceTransport, self).__init__()
+
+    def __write__(self, data):
+        message = data.decode('ascii').strip()
+        self.messages.append(message)
+        for unit in message.split(';'):
+            header, _, value = unit.partition(' ')
+            if header == 'WAIT?':
+                # Responds after the client timed out.
+                time.sleep(0.5)
+                self._response += b'A\n'
+            elif header == 'BLK?':
+                # A block with a length header.
+                block = self.state['BLK']
+                self._response += '#{0}{1}\n'.format(len(block), block).encode()
+            elif header == 'SLOW?':
+                # Responds in two chunks, like a slow serial device.
+                self._response += b'1,'
+                self._response += b'2\n'
+            elif header.endswith('?'):
+                self._response += self.state[header[:-1]].encode() + b'\n'
+            else:
+                self.state[header] = value
+
+    def __read__(self, num_bytes):
+        if not self._response:
+            raise Timeout('No response.')
+        data, self._response = (self._response[:num_bytes],
+                                self._response[num_bytes:])
+        return data
+
+
+class Device(Driver):
+    def __init__(self, transport):
+        super(Device, self).__init__(transport, IEC60488())
+        self.voltage = Command('VOLT?', 'VOLT', Float)
+        self.status = Command(('STAT?', Integer))
+
+
+@pytest.fixture
+def device():
+    return DeviceTransport()
+
+
+@pytest.fixture
+def server(device):
+    server = Server(device, ('127.0.0.1', 0), coalesce=[b'STAT?\n'],
+                    window=60.)
+    with server:
+        yield server
+
+
+def test_query_and_write(server, device):
+    client = Device(Client(server.address, timeout=5.))
+    client.voltage = 1.5
+    assert client.voltage == 1.5
+    assert device.messages == ['VOLT 1.5', 'VOLT?']
+
+
+def test_transaction_is_atomic(server, device):
+    transport = Client(server.address, timeout=5.)
+    with transport:
+        transport.write(b'SLOW?\n')
+        assert transport.read_exactly(2) == b'1,'
+        # Another client is queued until the transaction ends.
+        other = Device(Client(server.address, timeout=5.))
+        thread = threading.Thread(target=lambda: other.voltage)
+        thread.start()
+        thread.join(0.2)
+        assert thread.is_alive()
+        assert transport.read_until(b'\n') == b'2'
+    thread.join(5.)
+    assert device.messages == ['SLOW?', 'VOLT?']
+
+
+def test_concurrent_clients(server, device):
+    errors = []
+
+    def run(idx):
+        transport = Client(server.address, timeout=5.)
+        try:
+            for i in range(20):
+                value = '{0}.0'.format(idx * 100 + i).encode()
+                with transport:
+                    transport.write(b'VOLT ' + value + b';VOLT?\n')
+                    if transport.read_until(b'\n') != value:
+                        errors.append((idx, i))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10.)
+    assert errors == []
+    assert len(device.messages) == 80
+
+
+def test_coalescing(server, device):
+    first = Device(Client(server.address, timeout=5.))
+    second = Device(Client(server.address, timeout=5.))
+    assert first.status == 0
+    assert second.status == 0
+    assert device.messages == ['STAT?']
+    assert server.coalesced == 1
+
+    # Any other message invalidates the coalesced responses.
+    device.state['STAT'] = '4'
+    first.voltage = 1.
+    assert second.status == 4
+    assert device.messages == ['STAT?', 'VOLT 1.0', 'STAT?']
+
+
+def test_coalesced_prefix_is_replayed(device):
+    server = Server(device, ('127.0.0.1', 0), window=60.,
+                    coalesce=lambda message: message.endswith(b'?\n'))
+    with server:
+        transport = Client(server.address, timeout=5.)
+        with transport:
+            transport.write(b'SLOW?\n')
+            transport.read_exactly(2)
+        # Discards the unread part of the response.
+        del device._response[:]
+        with transport:
+            transport.write(b'SLOW?\n')
+            assert transport.read_exactly(2) == b'1,'
+            # Not part of the first transaction, so the device has to answer.
+            assert transport.read_until(b'\n') == b'2'
+    assert device.messages == ['SLOW?', 'SLOW?']
+    assert server.coalesced == 1
+
+
+def test_errors_are_forwarded(server):
+    transport = Client(server.address, timeout=5.)
+    with pytest.raises(Client.Timeout):
+        with transport:
+            transport.write(b'VOLT 1\n')
+            transport.read_until(b'\n')
+    # The connection is still usable.
+    assert Device(transport).voltage == 1.
+
+
+def test_timeout_drops_late_response(server, device):
+    transport = Client(server.address, timeout=0.2)
+    with pytest.raises(Client.Timeout):
+        with transport:
+            transport.write(b'WAIT?\n')
+            transport.read_until(b'\n')
+    # Waits until the device answered the first request.
+    time.sleep(0.5)
+    with transport:
+        transport.write(b'VOLT?\n')
+        assert transport.read_until(b'\n') == b'0.0'
+
+
+def test_expired_responses_are_dropped(device):
+    now = [0.]
+    server = Server(device, ('127.0.0.1', 0), window=1.,
+                    coalesce=lambda message: message.endswith(b'?\n'),
+                    timer=lambda: now[0])
+    with server:
+        client = Device(Client(server.address, timeout=5.))
+        client.status
+        client.voltage
+        assert len(server._cache) == 2
+        now[0] = 2.
+        client.status
+        assert len(server._cache) == 1
+
+
+def test_transaction_is_served_from_one_device_transaction(device):
+    now = [0.]
+    server = Server(device, ('127.0.0.1', 0), window=1.,
+                    coalesce=[b'BLK?\n'], timer=lambda: now[0])
+
+    def read(delay=0.):
+        with transport:
+            transport.write(b'BLK?\n')
+            header = transport.read_exactly(2)
+            now[0] += delay
+            return header, transport.read_until(b'\n')
+
+    with server:
+        transport = Client(server.address, timeout=5.)
+        assert read(delay=0.9) == (b'#1', b'X')
+        device.state['BLK'] = 'YY'
+        # The cached header expired, the cached body did not.
+        now[0] = 1.2
+        assert read() == (b'#2', b'YY')
+        # Both parts are served from the second device transaction.
+        now[0] = 2.
+        assert read() == (b'#2', b'YY')
+    assert device.messages == ['BLK?', 'BLK?']
+    assert server.coalesced == 2
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'),
+                    reason='Unix domain sockets are not supported.')
+def test_unix_socket(tmpdir, device):
+    path = str(tmpdir.join('device.sock'))
+    with Server(device, path):
+        assert Device(Client(path, timeout=5.)).voltage == 0.
+    assert not tmpdir.join('device.sock').exists()
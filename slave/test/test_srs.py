@@ -6,8 +6,11 @@ from __future__ import (absolute_import, division,
 from future.builtins import *
 import collections
 
-from slave.srs import SR830, SR850
-from slave.transport import SimulatedTransport
+import numpy as np
+import pytest
+
+from slave.srs import SR830, SR850, analysis
+from slave.transport import SimulatedTransport, Transport
 
 
 def test_sr830():
@@ -18,3 +21,94 @@ def test_sr830():
 def test_sr850():
     # Test if instantiation fails
     SR850(SimulatedTransport())
+
+
+class MockTransport(Transport):
+    def __init__(self, responses=[]):
+        self.responses = collections.deque(responses)
+        self.messages = collections.deque()
+        super(MockTransport, self).__init__()
+
+    def __write__(self, data):
+        self.messages.append(data)
+
+    def __read__(self, num_bytes):
+        return self.responses.popleft()
+
+
+def test_sr830_snap():
+    transport = MockTransport([b'1.5e-3,-2e-4,0.5\n'])
+    lockin = SR830(transport)
+    assert lockin.snap('X', 'y', 'AuxIn1') == [1.5e-3, -2e-4, 0.5]
+    assert list(transport.messages) == [b'SNAP? 1,2,5\n']
+
+
+def test_sr850_snap():
+    transport = MockTransport([b'1.5e-3,45.0\n'])
+    lockin = SR850(transport)
+    assert lockin.snap('x', 'theta') == [1.5e-3, 45.]
+    assert list(transport.messages)[-1] == b'SNAP? 1,4\n'
+
+
+class TestAnalysis(object):
+    def setup_method(self, method):
+        self.t = analysis.time(200, 16)
+
+    def test_window(self):
+        t, data = analysis.window(self.t, np.arange(200), 0, 50)
+        assert len(t) == len(data) == 101
+        assert data[-1] == 100
+        with pytest.raises(ValueError):
+            analysis.window(self.t, np.arange(200), 50, 50)
+
+    def test_smooth_preserves_quadratics(self):
+        data = 1. + 0.5 * self.t - 0.25 * self.t ** 2
+        for window in analysis.WINDOWS:
+            assert np.allclose(analysis.smooth(data, window), data)
+        with pytest.raises(ValueError):
+            analysis.smooth(data, 7)
+
+    def test_smooth_reduces_noise(self):
+        noise = np.random.RandomState(0).normal(size=200)
+        assert analysis.smooth(noise, 25).std() < 0.5 * noise.std()
+
+    def test_fit_line(self):
+        t, data = analysis.window(self.t, 2. + 3. * self.t, 20, 100)
+        a, b, c, t0 = analysis.fit(t, data, 'line')
+        assert t0 == t[0]
+        assert np.allclose([a, b, c], [2. + 3. * t0, 3., 0.])
+
+    def test_fit_exp(self):
+        data = 2. * np.exp(-self.t / 1.5) + 0.5
+        params = analysis.fit(self.t, data, 'exp')
+        assert np.allclose(params, [2., 1.5, 0.5, 0.], atol=1e-6)
+
+    def test_fit_gauss(self):
+        noise = np.random.RandomState(1).normal(scale=0.01, size=200)
+        data = -3. * np.exp(-0.5 * ((self.t - 7.) / 0.8) ** 2) + 1. + noise
+        params = analysis.fit(self.t, data, 'gauss')
+        assert np.allclose(params, [-3., 0.8, 1., 7.], rtol=1e-2)
+
+    def test_statistics(self):
+        stats = analysis.statistics(self.t[:4], [1., 2., 3., 4.])
+        assert stats == (2.5, np.sqrt(1.25), 10., 3. / 16)
+
+    def test_calculate(self):
+        data = np.array([1., 10., 100.])
+        assert np.allclose(analysis.calculate(data, '*', 2.), 2. * data)
+        assert np.allclose(analysis.calculate(data, '-', data), 0.)
+        assert np.allclose(analysis.calculate(data, 'log'), [0., 1., 2.])
+        assert np.allclose(analysis.calculate([0., 1.], '10^x'), [1., 10.])
+        with pytest.raises(ValueError):
+            analysis.calculate(data, '+')
+        with pytest.raises(ValueError):
+            analysis.calculate(data, 'exp')
+
+
+def test_sr850_fit():
+    transport = MockTransport()
+    lockin = SR850(transport)
+    lockin.fit((0, 30))
+    assert list(transport.messages)[-1] == b'FITT 0,30\n'
+    lockin.calculate_statistics(10, 20)
+    assert list(transport.messages)[-1] == b'STAT 10,20\n'
@@ -0,0 +1,146 @@
+#  -*- coding: utf-8 -*-
+#
+# Slave, (c) 2015, see AUTHORS.  Licensed under the GNU GPL.
+from __future__ import (absolute_import, division,
+                        print_function, unicode_literals)
+from future.builtins import *
+
+import numpy as np
+import pytest
+
+from slave.driver import Command, Driver
+from slave.misc import Measurement
+from slave.ramp import Ramp
+from slave.sweep import Axis, Nest, Sweep, Zip, linear, log, step
+from slave.types import Float
+
+
+def record(writes, name):
+    return lambda value: writes.append((name, value))
+
+
+def test_point_generators():
+    np.testing.assert_allclose(linear(0., 1., 3), [0., 0.5, 1.])
+    np.testing.assert_allclose(log(1., 100., 3), [1., 10., 100.])
+    np.testing.assert_allclose(step(0., 1., 0.25), [0., 0.25, 0.5, 0.75, 1.])
+    with pytest.raises(ValueError):
+        log(0., 1., 3)
+
+
+class TestSweep(object):
+    def test_nested_sweep_skips_unchanged_setpoints(self):
+        writes = []
+        a = Axis(record(writes, 'a'), [1, 2])
+        b = Axis(record(writes, 'b'), [10, 20, 30])
+        statistics = Sweep(Nest(a, b)).run()
+        assert writes == [
+            ('a', 1), ('b', 10), ('b', 20), ('b', 30),
+            ('a', 2), ('b', 10), ('b', 20), ('b', 30),
+        ]
+        assert statistics.points == 6
+        assert statistics.writes == 8
+        assert statistics.skipped == 4
+
+    def test_snake(self):
+        writes = []
+        a = Axis(record(writes, 'a'), [1, 2])
+        b = Axis(record(writes, 'b'), [10, 20])
+        Sweep(Nest(a, b, snake=True)).run()
+        # The turning point 20 is not written again.
+        assert writes == [('a', 1), ('b', 10), ('b', 20), ('a', 2), ('b', 10)]
+
+    def test_zip(self):
+        a, b = Axis(None, [1, 2]), Axis(None, [3, 4])
+        assert [[v for _, v in x] for x in Sweep(Zip(a, b)).plan()] == [[1, 3], [2, 4]]
+        with pytest.raises(ValueError):
+            Zip(a, Axis(None, [1]))
+
+    def test_measurement_rows_contain_setpoints(self, tmpdir):
+        path = str(tmpdir.join('sweep.csv'))
+        a = Axis(lambda value: None, [1, 2], 'a')
+        with Measurement(path, [a, lambda: 'x'], ['a', 'x']) as measurement:
+            statistics = Sweep(a, [measurement]).run()
+        with open(path) as f:
+            assert f.read() == 'a,x\n1,x\n2,x\n'
+        assert len(statistics.durations) == 2
+        assert statistics.time_per_point >= 0.
+
+    def test_settle_callable(self):
+        calls = []
+        a = Axis(lambda v: None, [1], settle=lambda: calls.append(1) or len(calls) > 2,
+                 interval=0.)
+        Sweep(a).run()
+        assert len(calls) == 3
+
+    def test_settle_timeout(self):
+        a = Axis(lambda v: None, [1], settle=lambda: False, interval=0.,
+                 timeout=0.)
+        with pytest.raises(RuntimeError):
+            Sweep(a).run()
+
+
+class MockProtocol(object):
+    def __init__(self):
+        self.writes = []
+
+    def write(self, transport, header, *data):
+        self.writes.append((header,) + data)
+
+
+class Source(Driver):
+    def __init__(self, protocol):
+        super(Source, self).__init__(None, protocol)
+        self.level = Command('LEV?', 'LEV', Float)
+
+
+def test_command_axis():
+    protocol = MockProtocol()
+    source = Source(protocol)
+    Sweep(Axis.command(source, 'level', [1., 2.])).run()
+    assert protocol.writes == [('LEV', '1.0'), ('LEV', '2.0')]
+
+
+def test_ramp_axis():
+    ramps = []
+
+    def ramp_field(field, rate):
+        ramp = Ramp(None, None, lambda status: True)
+        ramp.step(None)
+        ramps.append((field, rate))
+        return ramp
+
+    Sweep(Axis.ramp(ramp_field, [1., 2.], args=(0.5,))).run()
+    assert ramps == [(1., 0.5), (2., 0.5)]
+
+
+def test_ramps_of_a_point_overlap():
+    log = []
+
+    class FakeRamp(object):
+        def __init__(self, name, value):
+            self.name = name
+            log.append(('start', name, value))
+
+        def wait(self, timeout=None):
+            log.append(('wait', self.name))
+            return True
+
+        def exception(self):
+            return None
+
+    field = Axis.ramp(lambda value: FakeRamp('field', value), [1., 2.])
+    temperature = Axis.ramp(lambda value: FakeRamp('temperature', value),
+                            [10., 20.])
+    Sweep(Zip(field, temperature)).run()
+    # Both ramps are started before any is awaited.
+    assert log[:4] == [
+        ('start', 'field', 1.), ('start', 'temperature', 10.),
+        ('wait', 'field'), ('wait', 'temperature'),
+    ]
+
+
+def test_ramp_timeout():
+    ramp = Axis.ramp(lambda value: Ramp(None, None, lambda status: False),
+                     [1.], timeout=0.01)
+    with pytest.raises(RuntimeError):
+        Sweep(ramp).run()
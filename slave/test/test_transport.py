@@ -5,10 +5,13 @@ from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 
 from future.builtins import *
+import socket
+import threading
+
 import pytest
 from mock import MagicMock
 
-from slave.transport import Transport
+from slave.transport import PersistentSocket, SocketPool, Transport
 
 
 @pytest.fixture
@@ -40,3 +43,136 @@ class TestTransport(object):
         assert transport.read_until(b'P') == b'RES'
         transport.__read__.assert_called_with(transport._max_bytes)
         assert transport._buffer == b'ONSE'
+
+
+class FakeInstrument(object):
+    """A local tcp server answering each line with `'ACK <line>'`.
+
+    The server closes the connection after `drop_after` responses.
+
+    """
+    def __init__(self, drop_after=None, term=b'\n'):
+        self.drop_after = drop_after
+        self.term = term
+        self.connections = 0
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(('127.0.0.1', 0))
+        self._server.listen(5)
+        self.address = self._server.getsockname()
+        self._thread = threading.Thread(target=self._serve)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                connection, _ = self._server.accept()
+            except socket.error:
+                return
+            self.connections += 1
+            self._handle(connection)
+
+    def _handle(self, connection):
+        buffer, responses = b'', 0
+        while self.drop_after is None or responses < self.drop_after:
+            data = connection.recv(1024)
+            if not data:
+                break
+            buffer += data
+            while self.term in buffer:
+                line, buffer = buffer.split(self.term, 1)
+                connection.sendall(b'ACK ' + line + self.term)
+                responses += 1
+        connection.close()
+
+    def close(self):
+        self._server.close()
+
+
+@pytest.fixture
+def instrument(request):
+    instrument = FakeInstrument(drop_after=1)
+    request.addfinalizer(instrument.close)
+    return instrument
+
+
+class TestPersistentSocket(object):
+    def query(self, transport, message, term=b'\n'):
+        with transport:
+            transport.write(message)
+            return transport.read_until(term)
+
+    def test_socket_options(self, instrument):
+        transport = PersistentSocket(instrument.address, timeout=1.)
+        sock = transport._socket
+        assert sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+        assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE)
+        assert sock.gettimeout() == 1.
+
+    def test_reconnect_on_dropped_connection(self, instrument):
+        transport = PersistentSocket(instrument.address, timeout=1.,
+                                     backoff=0.01)
+        assert self.query(transport, b'A?\n') == b'ACK A?'
+        # The instrument dropped the connection after the first response.
+        assert self.query(transport, b'B?\n') == b'ACK B?'
+        assert self.query(transport, b'C?;D?\n') == b'ACK C?;D?'
+        assert instrument.connections == 3
+
+    def test_writes_are_not_resent(self, instrument):
+        transport = PersistentSocket(instrument.address, timeout=1.,
+                                     backoff=0.01)
+        assert self.query(transport, b'A?\n') == b'ACK A?'
+        # The write might have been executed before the connection dropped.
+        with pytest.raises(PersistentSocket.Error):
+            self.query(transport, b'VOLT 1;B?\n')
+        # The connection is reestablished for the next transaction.
+        assert self.query(transport, b'C?\n') == b'ACK C?'
+        assert instrument.connections == 2
+
+    def test_idempotent_messages_are_resent(self, instrument):
+        transport = PersistentSocket(instrument.address, timeout=1.,
+                                     backoff=0.01, idempotent=lambda m: True)
+        assert self.query(transport, b'A\n') == b'ACK A'
+        assert self.query(transport, b'B\n') == b'ACK B'
+
+    def test_null_terminated_messages(self):
+        # Emulates a SignalRecovery instrument.
+        instrument = FakeInstrument(drop_after=1, term=b'\0')
+        try:
+            transport = PersistentSocket(instrument.address, timeout=1.,
+                                         backoff=0.01)
+            assert self.query(transport, b'*IDN?\0', b'\0') == b'ACK *IDN?'
+            assert self.query(transport, b'*IDN?\0', b'\0') == b'ACK *IDN?'
+            with pytest.raises(PersistentSocket.Error):
+                self.query(transport, b'X.\0', b'\0')
+            transport = PersistentSocket(
+                instrument.address, timeout=1., backoff=0.01,
+                idempotent=lambda message: message.rstrip(b'\0') == b'X.')
+            assert self.query(transport, b'X.\0', b'\0') == b'ACK X.'
+            assert self.query(transport, b'X.\0', b'\0') == b'ACK X.'
+        finally:
+            instrument.close()
+
+    def test_connection_failure(self):
+        # Reserve a free port without listening on it.
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(('127.0.0.1', 0))
+        address = sock.getsockname()
+        sock.close()
+        with pytest.raises(PersistentSocket.Error):
+            PersistentSocket(address, retries=1, backoff=0.01)
+
+    def test_close_resets_socket(self, instrument):
+        transport = PersistentSocket(instrument.address, timeout=1.)
+        transport.close()
+        assert transport._socket is None
+
+
+class TestSocketPool(object):
+    def test_transports_are_shared_by_address(self, instrument):
+        pool = SocketPool(timeout=1.)
+        transport = pool.get(instrument.address)
+        assert pool.get(list(instrument.address)) is transport
+        pool.close()
+        assert transport._socket is None
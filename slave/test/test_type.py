@@ -7,7 +7,10 @@ from future.builtins import *
 import itertools
 import unittest
 
-from slave.types import Boolean, Integer, Float, Mapping, Register, Set
+import numpy as np
+
+from slave.types import (Boolean, Enum, Integer, Float, Mapping, Register,
+                         Set, Stream, String)
 
 
 class TypeCheck(object):
@@ -91,5 +94,65 @@ class TestRegister(unittest.TestCase, TypeCheck):
             3: 'fourth'
         })
 
+    def test_load_is_immutable_and_cached(self):
+        value = self._type.load('9')
+        self.assertIs(value, self._type.load('09'))
+        self.assertEqual(int(value), 9)
+        with self.assertRaises(TypeError):
+            value['first'] = False
+
+    def test_dump_loaded_value(self):
+        self.assertEqual(self._type.dump(self._type.load('6')), '6')
+
+    def test_load_many(self):
+        flags = self._type.load_many([9, 6, 0])
+        np.testing.assert_array_equal(flags['first'], [True, False, False])
+        np.testing.assert_array_equal(flags['third'], [False, True, False])
+
+
+class TestEnum(unittest.TestCase, TypeCheck):
+    def setUp(self):
+        self._values = ('a', 'b', 'c')
+        self._serialized = ('1', '3', '5')
+        self._type = Enum('a', 'b', 'c', start=1, step=2)
+
+    def test_load_padded_value(self):
+        self.assertEqual(self._type.load('03'), 'b')
+
+    def test_load_invalid_value(self):
+        with self.assertRaises(TypeError):
+            self._type.load('2')
+
+
+class TestStreamArray(unittest.TestCase):
+    def test_load_single_type(self):
+        stream = Stream(Float, as_array=True)
+        array = stream.load_array(['1.5', '-2E-3', '+4.0E+01'])
+        self.assertEqual(array.dtype, np.dtype(float))
+        np.testing.assert_array_equal(array, [1.5, -2e-3, 40.])
+
+    def test_load_records(self):
+        stream = Stream(Float, Integer, Boolean, as_array=True,
+                        names=['value', 'index', 'flag'])
+        array = stream.load_array(['1.5', '1', '0', '2.5', '2', '1'])
+        np.testing.assert_array_equal(array['value'], [1.5, 2.5])
+        np.testing.assert_array_equal(array['index'], [1, 2])
+        np.testing.assert_array_equal(array['flag'], [False, True])
+
+    def test_load_incomplete_record(self):
+        stream = Stream(Float, Integer, as_array=True)
+        with self.assertRaises(ValueError):
+            stream.load_array(['1.5', '1', '2.5'])
+
+    def test_unsupported_type(self):
+        with self.assertRaises(TypeError):
+            Stream(String, as_array=True)
+
+    def test_simulate_complete_records(self):
+        stream = Stream(Float, Integer, as_array=True)
+        for i in range(10):
+            self.assertEqual(len(stream.simulate()) % 2, 0)
+
+
 if __name__ == '__main__':
     unittest.main()
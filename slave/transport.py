@@ -16,6 +16,7 @@ The following transports are already available:
 
  * :class:`Serial` - A wrapper of the pyserial library
  * :class:`Socket` - A wrapper around the standard socket library.
+ * :class:`PersistentSocket` - A socket keeping its connection alive.
  * :class:`LinuxGpib` - A wrapper of the linux-gpib library
  * :class:`Visa` - A wrapper of the pyvisa library. (Supports pyvisa 1.4 - 1.5).
 
@@ -27,6 +28,7 @@ from future.builtins import *
 from future.utils import raise_with_traceback
 import socket
 import threading
+import time
 import ctypes as ct
 import ctypes.util
 import pkg_resources
@@ -103,6 +105,10 @@ class Transport(object):
     def write(self, data):
         self.__write__(data)
 
+    def discard(self):
+        """Discards all buffered, unread bytes."""
+        self._buffer = bytearray()
+
     def __enter__(self):
         self.lock.acquire()
 
@@ -193,6 +199,7 @@ class Socket(Transport):
         if not self._socket:
             raise ValueError("Can't close socket. Not opened yet.")
         self._socket.close()
+        self._socket = None
 
     def __enter__(self):
         super(Socket, self).__enter__()
@@ -205,6 +212,206 @@ class Socket(Transport):
             self._socket = None
         super(Socket, self).__exit__(type, value, tb)
 
+
+# Whitespace and message terminators, e.g. the null byte of SignalRecovery
+# instruments.
+_WHITESPACE = b' \t\r\n\0'
+
+
+def _is_query(message):
+    """Returns `True` if all units of a message are queries."""
+    units = bytes(message).strip(_WHITESPACE).split(b';')
+    return all(unit.strip(_WHITESPACE).endswith(b'?') for unit in units)
+
+
+class PersistentSocket(Socket):
+    """A socket transport keeping its connection alive.
+
+    The connection is opened once and kept open. If the connection drops, it
+    is reestablished. The messages of the current transaction are sent again
+    only if resending is safe, i.e. no response was read back yet and all
+    messages are queries. Otherwise, the device might have executed them
+    already and a :class:`PersistentSocket.Error` is raised.
+
+    By default, only IEC60488 style queries ending with `'?'` are resent.
+    Queries of other protocols, e.g. of SignalRecovery or Oxford ISOBUS
+    instruments, don't and require an `idempotent` callable. E.g.::
+
+        from slave.signal_recovery import SR7230
+        from slave.transport import PersistentSocket
+
+        READ_ONLY = (b'X.', b'Y.', b'MAG.', b'PHA.')
+        transport = PersistentSocket(
+            ('192.168.178.1', 50000), timeout=1.,
+            idempotent=lambda message: message.rstrip(b'\\0') in READ_ONLY)
+        lockin = SR7230(transport)
+
+    :param address: The socket address a tuple of host string and port.
+    :param timeout: The read and write timeout in seconds. `None` blocks
+        forever.
+    :param connect_timeout: The timeout in seconds used to establish the
+        connection. `None` uses the global default timeout.
+    :param nodelay: If `True`, the nagle algorithm is disabled (TCP_NODELAY).
+        Small command messages are sent immediately.
+    :param keepalive: If `True`, tcp keepalive packets are enabled, so a dead
+        peer is eventually detected on idle connections.
+    :param retries: The number of reconnection attempts.
+    :param backoff: The delay in seconds before the first reconnection
+        attempt. It is doubled with every further attempt.
+    :param max_backoff: The maximum delay in seconds between two reconnection
+        attempts.
+    :param idempotent: A callable receiving a message and returning `True`
+        if it can safely be sent twice. By default, messages consisting of
+        queries ending with `'?'` only, e.g. `b'*IDN?;VOLT?\\n'`, are
+        resent.
+
+    """
+    def __init__(self, address, timeout=None, connect_timeout=None,
+                 nodelay=True, keepalive=True, retries=3, backoff=0.1,
+                 max_backoff=5., idempotent=None):
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.nodelay = nodelay
+        self.keepalive = keepalive
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.idempotent = idempotent or _is_query
+        self._messages = []
+        self._received = False
+        self._reconnects = 0
+        super(PersistentSocket, self).__init__(address, alwaysopen=True)
+
+    def open(self):
+        if self._socket:
+            raise ValueError('Socket is already open.')
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            try:
+                if self.connect_timeout is None:
+                    sock = socket.create_connection(self.address)
+                else:
+                    sock = socket.create_connection(self.address,
+                                                    self.connect_timeout)
+                break
+            except socket.error as e:
+                if attempt == self.retries:
+                    raise_with_traceback(PersistentSocket.Error(e))
+                time.sleep(delay)
+                delay = min(2 * delay, self.max_backoff)
+        sock.settimeout(self.timeout)
+        if self.nodelay:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.keepalive:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        self._socket = sock
+
+    def reconnect(self):
+        """Drops the connection and any buffered data and connects again."""
+        if self._socket:
+            try:
+                self._socket.close()
+            except socket.error:
+                pass
+            self._socket = None
+        self._buffer = bytearray()
+        self.open()
+
+    def _replay(self):
+        """Reconnects and resends the messages of the current transaction."""
+        if self._received or not all(map(self.idempotent, self._messages)):
+            # The device might have executed the messages already.
+            self._messages = []
+            self.reconnect()
+            raise PersistentSocket.Error(
+                'Connection lost, the transaction can not be resent.')
+        while True:
+            if self._reconnects >= self.retries:
+                raise PersistentSocket.Error('Connection lost.')
+            self._reconnects += 1
+            self.reconnect()
+            try:
+                for message in self._messages:
+                    self._socket.sendall(message)
+                return
+            except socket.timeout as e:
+                raise_with_traceback(PersistentSocket.Timeout(e))
+            except socket.error:
+                continue
+
+    def __write__(self, data):
+        self._messages.append(data)
+        try:
+            self._socket.sendall(data)
+        except socket.timeout as e:
+            raise_with_traceback(PersistentSocket.Timeout(e))
+        except socket.error:
+            self._replay()
+
+    def __read__(self, num_bytes):
+        while True:
+            try:
+                data = self._socket.recv(num_bytes)
+            except socket.timeout as e:
+                raise_with_traceback(PersistentSocket.Timeout(e))
+            except socket.error:
+                data = b''
+            if data:
+                self._received = True
+                return data
+            # An empty read means the peer closed the connection.
+            self._replay()
+
+    def __enter__(self):
+        super(PersistentSocket, self).__enter__()
+        self._messages = []
+        self._received = False
+        self._reconnects = 0
+
+
+class SocketPool(object):
+    """Shares persistent socket transports between several drivers.
+
+    Drivers using the same address share one :class:`PersistentSocket`
+    transport and therefore one connection, e.g.::
+
+        from slave.signal_recovery import SR7230
+        from slave.transport import SocketPool
+
+        pool = SocketPool(timeout=1.)
+        lockin = SR7230(pool.get(('192.168.178.1', 50000)))
+        # Uses the same connection.
+        monitor = SR7230(pool.get(('192.168.178.1', 50000)))
+
+    :param kw: Keyword arguments passed to the :class:`PersistentSocket`
+        constructor.
+
+    """
+    def __init__(self, **kw):
+        self._kw = kw
+        self._transports = {}
+        self._lock = threading.Lock()
+
+    def get(self, address):
+        """Returns the transport connected to address."""
+        address = tuple(address)
+        with self._lock:
+            try:
+                return self._transports[address]
+            except KeyError:
+                transport = PersistentSocket(address, **self._kw)
+                self._transports[address] = transport
+                return transport
+
+    def close(self):
+        """Closes all pooled connections."""
+        with self._lock:
+            for transport in self._transports.values():
+                with transport:
+                    transport.close()
+            self._transports.clear()
+
+
 # TODO:
 # 1. Implement trigger functionality
 try:
@@ -465,6 +672,8 @@ class LinuxGpib(Transport):
             ct.c_int(board), ct.c_int(primary), ct.c_int(secondary),
             ct.c_int(timeout), ct.c_int(send_eoi), ct.c_int(eos)
         )
+        # Imported here to avoid a circular import.
+        from slave.types import Register
         self._ibsta_parser = Register(LinuxGpib.STATUS)
 
     def __del__(self):
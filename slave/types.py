@@ -40,14 +40,18 @@ to modify the behaviour.
 from __future__ import (absolute_import, division,
                         print_function, unicode_literals)
 from future.builtins import *
+from future.utils import native_str
 
 from slave.driver import _to_instance
 
+import collections
 import random
 import string
 import sys
 import itertools
 
+import numpy as np
+
 
 
 
@@ -309,11 +313,53 @@ class Enum(Mapping):
         stop = len(args) * step + start
         map_ = dict((k, v) for k, v in zip(args, range(start, stop, step)))
         super(Enum, self).__init__(map_, **kw)
+        # Integer keyed inverse mapping, so that device values '4', '04'
+        # return the same user value.
+        self._int_inv = dict((int(v), k) for k, v in self._map.items())
 
     def load(self, value):
-        # XXX Nasty hack so that device values '4', '04' return the same
-        # user value.
-        return super(Enum, self).load(str(int(value)))
+        try:
+            return self._int_inv[int(value)]
+        except KeyError:
+            raise TypeError()
+
+
+class RegisterValue(collections.Mapping):
+    """An immutable, dictionary like view of a register value.
+
+    It maps the register keys to the state of the corresponding bits and
+    compares equal to a dictionary with the same items. The raw register
+    value is available via :func:`int`, e.g.::
+
+        >>> status = Register({0: 'first', 3: 'fourth'}).load('9')
+        >>> status['fourth']
+        True
+        >>> int(status)
+        9
+
+    Use :func:`dict` to get a mutable copy.
+
+    """
+    __slots__ = ('_value', '_masks')
+
+    def __init__(self, value, masks):
+        self._value = value
+        self._masks = masks
+
+    def __getitem__(self, key):
+        return bool(self._value & self._masks[key])
+
+    def __iter__(self):
+        return iter(self._masks)
+
+    def __len__(self):
+        return len(self._masks)
+
+    def __int__(self):
+        return self._value
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(type(self).__name__, dict(self.items()))
 
 
 class Register(SingleType):
@@ -328,25 +374,45 @@ class Register(SingleType):
             }
             reg = Register(mapping)
 
+    Loading a register value returns an immutable :class:`RegisterValue`.
+    These are cached, repeated loads of the same value return the same
+    object.
 
     """
     def __init__(self, mapping):
         super(Register, self).__init__()
         self._map = dict((str(key), int(bit)) for bit, key in mapping.items())
+        # We need to cast all integers with the int() function. Otherwise we
+        # would mix integer with int type of future package.
+        self._masks = dict((k, int(1) << int(i)) for k, i in self._map.items())
+        self._cache = {}
 
     def __convert__(self, value):
+        if isinstance(value, RegisterValue) and value._masks == self._masks:
+            return int(value)
         x = int(0)
         for k, v in value.items():
             if v:  # set bit
-                x |= int(1) << self._map[k]
+                x |= self._masks[k]
         return x
 
     def load(self, value):
-        # We need to cast all integers with the int() function. Otherwise we
-        # would mix integer with int type of future package.
-        bit = lambda x, i: bool(x & (int(1) << int(i)))
         value = int(value)
-        return dict((k, bit(value, i)) for k, i in self._map.items())
+        try:
+            return self._cache[value]
+        except KeyError:
+            reg = self._cache[value] = RegisterValue(value, self._masks)
+            return reg
+
+    def load_many(self, values):
+        """Loads a sequence of register values at once.
+
+        :param values: A sequence of register values.
+        :returns: A dictionary mapping each key to a boolean numpy array.
+
+        """
+        values = np.asarray(values, dtype=int)
+        return dict((k, (values & m) != 0) for k, m in self._masks.items())
 
     def simulate(self):
         """Returns a dictionary representing the mapped register with random
@@ -362,6 +428,12 @@ class Stream(object):
     """A type container for a variable number of types.
 
     :param args: A sequence of types.
+    :param as_array: If `True`, the complete response is converted at once
+        with numpy and returned as :class:`numpy.ndarray`, instead of loading
+        each value separately. Only :class:`Boolean`, :class:`Integer` and
+        :class:`Float` types are supported.
+    :param names: An optional sequence of field names. It is used if the
+        stream consists of several types and `as_array` is `True`.
 
     The :class:`Stream` class is a type container for variable numbers of types.
     Let's say a command returns the content of an internal buffer which can
@@ -374,14 +446,73 @@ class Stream(object):
 
         Command('QRY?', 'WRT', Stream(Float, Integer))
 
+    Large buffers are loaded a lot faster as numpy arrays. A stream of a
+    single type is loaded into a one dimensional array, a stream of several
+    types into a structured array with one record per cycle of types, e.g.::
+
+        Command(('QRY?', Stream(Float, as_array=True)))
+        Command(('QRY?', Stream(Float, Integer, as_array=True,
+                                names=['reading', 'index'])))
+
     """
-    def __init__(self, *types):
+    #: The numpy dtypes of the types supported in array mode.
+    DTYPES = [(Boolean, 'bool'), (Integer, 'int'), (Float, 'float')]
+
+    def __init__(self, *types, **kw):
+        self.as_array = kw.pop('as_array', False)
+        names = kw.pop('names', None)
+        if kw:
+            raise TypeError('Unexpected keyword arguments: {0}'.format(kw))
         self.types = [_to_instance(t) for t in types]
+        if self.as_array:
+            self.dtype = self._dtype(names)
+
+    def _dtype(self, names):
+        dtypes = []
+        for t in self.types:
+            try:
+                dtypes.append(next(d for cls, d in Stream.DTYPES if isinstance(t, cls)))
+            except StopIteration:
+                raise TypeError('{0!r} has no array representation.'.format(t))
+        if len(dtypes) == 1:
+            return np.dtype(dtypes[0])
+        names = names or ['f{0}'.format(i) for i in range(len(dtypes))]
+        if len(names) != len(dtypes):
+            raise ValueError('Unequal number of names and types.')
+        return np.dtype([(native_str(n), d) for n, d in zip(names, dtypes)])
+
+    def load_array(self, values):
+        """Loads a sequence of device values into a numpy array.
+
+        :raises: ValueError if the number of values is not a multiple of the
+            number of types.
+
+        """
+        num_types = len(self.types)
+        if len(values) % num_types:
+            raise ValueError('Incomplete record.')
+        if num_types == 1:
+            return self._column(self.dtype, values)
+        array = np.empty(len(values) // num_types, dtype=self.dtype)
+        for i, name in enumerate(self.dtype.names):
+            array[name] = self._column(self.dtype[name], values[i::num_types])
+        return array
+
+    @staticmethod
+    def _column(dtype, values):
+        if dtype.kind == 'b':
+            # Device values are '0' or '1'.
+            return np.array(values, dtype=int).astype(bool)
+        return np.array(values, dtype=dtype)
 
     def simulate(self):
         """Simulates a stream of types."""
         # Simulates zero to 10 types
-        return [t.simulate() for t in itertools.islice(self, random.choice(range(10)))]
+        num = random.choice(range(10))
+        if self.as_array:
+            # Only complete records are valid.
+            num *= len(self.types)
+        return [t.simulate() for t in itertools.islice(self, num)]
 
     def __iter__(self):
         return itertools.cycle(self.types)